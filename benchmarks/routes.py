@@ -0,0 +1,344 @@
+"""Route-level benchmarks with regression tracking.
+
+Every route of the app is driven through the Flask test client, logged in
+as the admin, against SQLite databases filled by :mod:`datagen` at several
+sizes. For each route the suite records:
+
+* ``p50_ms`` / ``p95_ms`` - request latency over ``--iterations`` runs
+* ``queries`` - SQL statements per request (the maximum seen)
+* ``peak_kib`` - peak Python memory allocated during one request
+  (measured in a separate pass, because tracemalloc slows everything down)
+
+Results are written as JSON. Given ``--baseline`` the run is compared with
+an earlier result file, regressions are listed and the exit status is 1::
+
+    python -m benchmarks.routes --sizes small,medium --output latest.json
+    python -m benchmarks.routes --baseline baseline.json
+
+Routes that change data get a fresh target on every iteration (the next
+scheduled appointment, the next pending bill, a free slot), so each run
+measures the same work.
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import namedtuple
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import event, func, select
+from werkzeug.security import generate_password_hash
+
+from app import create_app
+from datagen import generate
+from migrations import upgrade
+from models import db, User, Patient, Doctor, Appointment, Bill, Prescription
+from pagination import paginate_request
+from scheduling import SLOT_TIMES
+
+
+SIZES = {
+    'small': {'patients': 1000, 'doctors': 20},
+    'medium': {'patients': 20000, 'doctors': 100},
+    'large': {'patients': 200000, 'doctors': 500},
+}
+
+END_DATE = date(2026, 1, 1)
+
+# A route regresses when its p95 grows by more than this fraction *and* by
+# more than MIN_DELTA_MS, when it issues more queries, or when its peak
+# memory grows by more than MEMORY_TOLERANCE and MIN_DELTA_KIB.
+LATENCY_TOLERANCE = 0.25
+MIN_DELTA_MS = 1.0
+MEMORY_TOLERANCE = 0.5
+MIN_DELTA_KIB = 256
+
+# Routes that are not benchmarked: logging out ends the session, and the
+# delete routes would remove the rows every other route reads.
+SKIPPED_ENDPOINTS = {'main.logout', 'main.delete_patient', 'main.delete_doctor', 'main.login', 'static'}
+
+Case = namedtuple('Case', 'name endpoint method path data')
+
+
+def _cases(ids):
+    """Return the benchmark cases; ``path`` and ``data`` take the iteration number."""
+    far = END_DATE + timedelta(days=400)
+
+    def free_slot(i):
+        return {
+            'patient_id': ids['patient'], 'doctor_id': ids['doctors'][i // len(SLOT_TIMES) % len(ids['doctors'])],
+            'date': (far + timedelta(days=i // (len(SLOT_TIMES) * len(ids['doctors'])))).isoformat(),
+            'time': SLOT_TIMES[i % len(SLOT_TIMES)],
+        }
+
+    def batch(values, i, size=50):
+        start = size * i % len(values)
+        return values[start:start + size]
+
+    def get(name, endpoint, path):
+        return Case(name, endpoint, 'GET', path if callable(path) else (lambda i: path), None)
+
+    def post(name, endpoint, path, data):
+        return Case(name, endpoint, 'POST', lambda i: path, data)
+
+    return [
+        get('home', 'main.home', '/'),
+        get('app_index', 'main.app_index', '/app'),
+        get('dashboard', 'main.dashboard', '/dashboard'),
+        get('healthz', 'main.healthz', '/healthz'),
+        get('readyz', 'main.readyz', '/readyz'),
+        get('metrics', 'metrics', '/metrics'),
+        get('pool_stats', 'main.pool_stats', '/admin/pool'),
+        get('patients', 'main.patients', '/patients'),
+        get('patients_page2', 'main.patients', f"/patients?after={ids['patients_cursor']}"),
+        get('patients_search', 'main.patients', f"/patients?search={ids['search']}"),
+        get('view_patient', 'main.view_patient', f"/patients/view/{ids['patient']}"),
+        get('add_patient_form', 'main.add_patient', '/patients/add'),
+        post('add_patient', 'main.add_patient', '/patients/add',
+             lambda i: {'name': f'Bench Patient {i}', 'age': '40', 'gender': 'Female', 'phone': '555-0000', 'address': ''}),
+        get('edit_patient_form', 'main.edit_patient', f"/patients/edit/{ids['patient']}"),
+        post('edit_patient', 'main.edit_patient', f"/patients/edit/{ids['patient']}",
+             lambda i: {'name': 'Bench Edited', 'age': '41', 'gender': 'Female', 'phone': '555-0001', 'address': ''}),
+        get('import_form', 'main.bulk_import_patients', '/patients/import'),
+        get('lookup_patients', 'main.lookup_patients', f"/api/patients/lookup?q={ids['search'][:3]}"),
+        get('doctors', 'main.doctors', '/doctors'),
+        get('add_doctor_form', 'main.add_doctor', '/doctors/add'),
+        get('edit_doctor_form', 'main.edit_doctor', f"/doctors/edit/{ids['doctor']}"),
+        get('lookup_doctors', 'main.lookup_doctors', '/api/doctors/lookup?q=Dr'),
+        get('availability', 'main.availability', f"/api/availability?doctor_id={ids['doctor']}&date={END_DATE}"),
+        get('appointments', 'main.appointments', '/appointments'),
+        get('book_form', 'main.book_appointment', '/appointments/book'),
+        post('book_appointment', 'main.book_appointment', '/appointments/book', free_slot),
+        get('cancel_appointment', 'main.cancel_appointment',
+            lambda i: f"/appointments/cancel/{ids['scheduled'][2 * i % len(ids['scheduled'])]}"),
+        get('complete_appointment', 'main.complete_appointment',
+            lambda i: f"/appointments/complete/{ids['scheduled'][(2 * i + 1) % len(ids['scheduled'])]}"),
+        post('bulk_complete', 'main.bulk_appointments', '/appointments/bulk',
+             lambda i: {'action': 'complete', 'ids': batch(ids['scheduled'], i)}),
+        get('bills', 'main.bills', '/bills'),
+        get('generate_bill_form', 'main.generate_bill', '/bills/generate'),
+        post('generate_bill', 'main.generate_bill', '/bills/generate',
+             lambda i: {'patient_id': ids['patient'], 'amount': '125.50'}),
+        get('pay_bill', 'main.pay_bill', lambda i: f"/bills/pay/{ids['pending_bills'][i % len(ids['pending_bills'])]}"),
+        post('bulk_pay', 'main.bulk_bills', '/bills/bulk', lambda i: {'action': 'pay', 'ids': batch(ids['pending_bills'], i)}),
+        get('print_receipt', 'main.print_receipt', f"/bills/receipt/{ids['bill']}"),
+        get('revenue', 'main.revenue', '/reports/revenue?period=month'),
+        get('revenue_api', 'main.revenue_api', '/api/reports/revenue?period=year'),
+        get('prescriptions', 'main.prescriptions', '/prescriptions'),
+        get('add_prescription_form', 'main.add_prescription', '/prescriptions/add'),
+        post('add_prescription', 'main.add_prescription', '/prescriptions/add',
+             lambda i: {'patient_id': ids['patient'], 'doctor_id': ids['doctor'], 'medicine': 'Bench', 'dosage': '1x'}),
+        get('view_prescription', 'main.view_prescription', f"/prescriptions/view/{ids['prescription']}"),
+        get('export_bills', 'main.export', f"/export/bills.csv?from={END_DATE - timedelta(days=7)}"),
+    ]
+
+
+def percentile(values, pct):
+    """Return the ``pct`` percentile of ``values`` (nearest rank)."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _scalar(statement):
+    return db.session.execute(statement).scalar()
+
+
+def build_dataset(path, patients, doctors, seed=0):
+    """Create a seeded database at ``path`` and return the app and route targets."""
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}',
+        'SECRET_KEY': 'benchmark',
+        'QUERY_BUDGET_ENFORCE': False,
+    })
+    with app.app_context():
+        upgrade()
+        db.session.add(User(username='admin', password=generate_password_hash('admin123'), role='admin'))
+        db.session.commit()
+        generate(patients=patients, doctors=doctors, years=1, seed=seed, end_date=END_DATE)
+
+        busiest_patient = _scalar(select(Appointment.patient_id).group_by(Appointment.patient_id)
+                                  .order_by(func.count().desc()).limit(1))
+        busiest_doctor = _scalar(select(Appointment.doctor_id).group_by(Appointment.doctor_id)
+                                 .order_by(func.count().desc()).limit(1))
+        patient_name = _scalar(select(Patient.name).where(Patient.patient_id == busiest_patient))
+        with app.test_request_context('/patients'):
+            cursor = paginate_request(Patient.query, [(Patient.patient_id, False)]).next_cursor
+        ids = {
+            'patient': busiest_patient,
+            'patients_cursor': cursor,
+            'search': patient_name.split()[-1],
+            'doctor': busiest_doctor,
+            'doctors': list(db.session.execute(select(Doctor.doctor_id).order_by(Doctor.doctor_id)).scalars()),
+            'bill': _scalar(select(func.min(Bill.bill_id))),
+            'prescription': _scalar(select(func.min(Prescription.presc_id))),
+            'scheduled': list(db.session.execute(
+                select(Appointment.appoint_id).where(Appointment.status == 'scheduled').limit(2000)).scalars()),
+            'pending_bills': list(db.session.execute(
+                select(Bill.bill_id).where(Bill.status == 'pending').limit(1000)).scalars()),
+        }
+    return app, ids
+
+
+def run_routes(app, ids, iterations=20, warmup=2):
+    """Benchmark every case and return ``{case name: metrics}``."""
+    client = app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+
+    statements = [0]
+
+    def count(*args):
+        statements[0] += 1
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'after_cursor_execute', count)
+    results = {}
+    try:
+        counter = 0
+        for case in _cases(ids):
+            def request():
+                nonlocal counter
+                counter += 1
+                data = case.data(counter) if case.data else None
+                response = client.open(case.path(counter), method=case.method, data=data)
+                # Drain streamed bodies so their cost is measured and their
+                # contexts are closed before the next request.
+                response.get_data()
+                response.close()
+                return response
+
+            for _ in range(warmup):
+                request()
+            timings, queries, status = [], 0, None
+            for _ in range(iterations):
+                statements[0] = 0
+                start = time.perf_counter()
+                response = request()
+                timings.append((time.perf_counter() - start) * 1000)
+                queries = max(queries, statements[0])
+                status = response.status_code
+
+            tracemalloc.start()
+            request()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            results[case.name] = {
+                'endpoint': case.endpoint,
+                'method': case.method,
+                'status': status,
+                'p50_ms': round(percentile(timings, 50), 3),
+                'p95_ms': round(percentile(timings, 95), 3),
+                'queries': queries,
+                'peak_kib': round(peak / 1024, 1),
+            }
+    finally:
+        event.remove(engine, 'after_cursor_execute', count)
+    return results
+
+
+def uncovered_endpoints(app, ids):
+    """Return endpoints of the app that no benchmark case exercises."""
+    covered = {case.endpoint for case in _cases(ids)} | SKIPPED_ENDPOINTS
+    return sorted(rule.endpoint for rule in app.url_map.iter_rules() if rule.endpoint not in covered)
+
+
+def compare(current, baseline):
+    """Return human-readable regressions of ``current`` against ``baseline``."""
+    regressions = []
+    for size, routes in current['results'].items():
+        for name, now in routes.items():
+            before = baseline.get('results', {}).get(size, {}).get(name)
+            if not before:
+                continue
+            label = f'{size}/{name}'
+            if (now['p95_ms'] > before['p95_ms'] * (1 + LATENCY_TOLERANCE)
+                    and now['p95_ms'] - before['p95_ms'] > MIN_DELTA_MS):
+                regressions.append(f"{label}: p95 {before['p95_ms']:.1f} -> {now['p95_ms']:.1f} ms")
+            if now['queries'] > before['queries']:
+                regressions.append(f"{label}: queries {before['queries']} -> {now['queries']}")
+            if (now['peak_kib'] > before['peak_kib'] * (1 + MEMORY_TOLERANCE)
+                    and now['peak_kib'] - before['peak_kib'] > MIN_DELTA_KIB):
+                regressions.append(f"{label}: peak memory {before['peak_kib']:.0f} -> {now['peak_kib']:.0f} KiB")
+    return regressions
+
+
+def run(sizes, iterations=20, seed=0, workdir=None, echo=print):
+    """Benchmark every size in ``sizes`` and return the result document."""
+    document = {
+        'meta': {
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'iterations': iterations,
+            'seed': seed,
+            'sizes': {size: SIZES[size] for size in sizes},
+        },
+        'results': {},
+    }
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        for size in sizes:
+            echo(f'Building {size} dataset {SIZES[size]} ...')
+            app, ids = build_dataset(os.path.join(tmp, f'{size}.db'), seed=seed, **SIZES[size])
+            missing = uncovered_endpoints(app, ids)
+            if missing:
+                echo(f"! No benchmark for: {', '.join(missing)}")
+            results = run_routes(app, ids, iterations=iterations)
+            document['results'][size] = results
+            echo(format_table(size, results))
+            with app.app_context():
+                db.engine.dispose()
+    return document
+
+
+def format_table(size, results):
+    lines = [f'\n{size}', f"{'route':<24} {'status':>6} {'p50 ms':>9} {'p95 ms':>9} {'queries':>8} {'peak KiB':>9}"]
+    for name, r in results.items():
+        lines.append(f"{name:<24} {r['status']:>6} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['queries']:>8} {r['peak_kib']:>9.1f}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', default='small,medium', help=f"Comma separated; any of {', '.join(SIZES)}.")
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='benchmarks/results/latest.json')
+    parser.add_argument('--baseline', help='Earlier result file to compare against.')
+    args = parser.parse_args(argv)
+
+    sizes = [size.strip() for size in args.sizes.split(',') if size.strip()]
+    unknown = [size for size in sizes if size not in SIZES]
+    if unknown:
+        parser.error(f"unknown size: {', '.join(unknown)}")
+
+    document = run(sizes, iterations=args.iterations, seed=args.seed)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(document, f, indent=2)
+    print(f'\nResults written to {args.output}')
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(document, json.load(f))
+        if regressions:
+            print(f'\n{len(regressions)} regression(s) against {args.baseline}:')
+            for line in regressions:
+                print(f'  {line}')
+            return 1
+        print(f'No regressions against {args.baseline}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,192 @@
+"""Throughput of the development server against gunicorn.
+
+Both servers are started as real processes on a seeded SQLite database and
+driven over HTTP by ``--concurrency`` client threads, each logged in with
+its own session, cycling through the read-heavy pages for ``--duration``
+seconds::
+
+    python -m benchmarks.serving --size small --duration 20 --concurrency 16
+
+For each server the run reports requests per second, p50/p95 latency and
+the number of failed requests, and writes them as JSON. The client shares
+the machine with the server, so absolute numbers depend on the host;
+compare servers within one run.
+"""
+
+import argparse
+import http.cookiejar
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.routes import SIZES, build_dataset, percentile
+from models import db
+
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def _paths(ids):
+    return [
+        '/dashboard',
+        '/patients',
+        f"/patients/view/{ids['patient']}",
+        '/appointments',
+        '/bills',
+        f"/bills/receipt/{ids['bill']}",
+        '/prescriptions',
+        '/api/doctors/lookup?q=Dr',
+    ]
+
+
+def server_commands(port, workers, threads):
+    """Return ``{name: (argv, extra environment)}`` for each server under test."""
+    return {
+        'dev': ([sys.executable, '-c', f'from app import create_app; create_app().run(port={port})'], {}),
+        'gunicorn': ([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+                      '--bind', f'127.0.0.1:{port}', 'wsgi:app'],
+                     {'WEB_CONCURRENCY': str(workers), 'GUNICORN_THREADS': str(threads),
+                      'GUNICORN_ACCESS_LOG': ''}),
+    }
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _wait_until_up(base, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'server exited with status {process.returncode}')
+        try:
+            urllib.request.urlopen(base + '/healthz', timeout=1).read()
+            return
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.2)
+    raise RuntimeError('server did not start')
+
+
+def _login(base):
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+    data = urllib.parse.urlencode({'username': 'admin', 'password': 'admin123'}).encode()
+    opener.open(base + '/login', data=data, timeout=10).read()
+    return opener
+
+
+def drive(base, paths, concurrency, duration):
+    """Request ``paths`` round-robin from ``concurrency`` threads for ``duration`` seconds."""
+    openers = [_login(base) for _ in range(concurrency)]
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client(number, opener):
+        mine, failed, i = [], 0, number
+        while time.monotonic() < stop_at:
+            path = paths[i % len(paths)]
+            i += 1
+            start = time.perf_counter()
+            try:
+                opener.open(base + path, timeout=30).read()
+                mine.append((time.perf_counter() - start) * 1000)
+            except (urllib.error.URLError, ConnectionError, TimeoutError):
+                failed += 1
+        with lock:
+            latencies.extend(mine)
+            errors[0] += failed
+
+    started = time.monotonic()
+    clients = [threading.Thread(target=client, args=(n, opener)) for n, opener in enumerate(openers)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    elapsed = time.monotonic() - started
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50), 2) if latencies else None,
+        'p95_ms': round(percentile(latencies, 95), 2) if latencies else None,
+    }
+
+
+def run(size='small', duration=20, concurrency=16, workers=None, threads=4, servers=None, echo=print):
+    """Benchmark each server in ``servers`` (default all) and return the result document."""
+    workers = workers or (os.cpu_count() or 1) * 2 + 1
+    document = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'size': size,
+            'duration_s': duration,
+            'concurrency': concurrency,
+            'gunicorn_workers': workers,
+            'gunicorn_threads': threads,
+        },
+        'results': {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'serving.db')
+        echo(f'Building {size} dataset {SIZES[size]} ...')
+        app, ids = build_dataset(path, **SIZES[size])
+        with app.app_context():
+            db.engine.dispose()
+
+        port = _free_port()
+        base = f'http://127.0.0.1:{port}'
+        for name, (argv, extra_env) in server_commands(port, workers, threads).items():
+            if servers and name not in servers:
+                continue
+            env = dict(os.environ, DATABASE_URL=f'sqlite:///{path}', **extra_env)
+            process = subprocess.Popen(argv, cwd=ROOT, env=env,
+                                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                _wait_until_up(base, process)
+                result = drive(base, _paths(ids), concurrency, duration)
+            finally:
+                process.terminate()
+                process.wait(timeout=60)
+            document['results'][name] = result
+            echo(f"{name:<10} {result['rps']:>8.1f} req/s  p50 {result['p50_ms']} ms  "
+                 f"p95 {result['p95_ms']} ms  errors {result['errors']}")
+    return document
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--size', default='small', choices=list(SIZES))
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--workers', type=int, help='Gunicorn workers (default 2 x CPUs + 1).')
+    parser.add_argument('--threads', type=int, default=4, help='Gunicorn threads per worker.')
+    parser.add_argument('--servers', help='Comma separated; any of dev, gunicorn.')
+    parser.add_argument('--output', default='benchmarks/results/serving.json')
+    args = parser.parse_args(argv)
+
+    servers = [name.strip() for name in args.servers.split(',')] if args.servers else None
+    document = run(args.size, args.duration, args.concurrency, args.workers, args.threads, servers)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(document, f, indent=2)
+    print(f'\nResults written to {args.output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
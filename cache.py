@@ -0,0 +1,200 @@
+"""Versioned cache for rendered fragments and query results.
+
+Cached values live under keys of the form ``<namespace>:v<version>:<parts>``.
+Each namespace has a version number that is bumped after any commit that
+inserts, updates or deletes one of its models (see :data:`NAMESPACES`), so
+stale entries are never read again. Nothing has to be deleted; old entries
+simply age out of the backend.
+
+Two backends are available, chosen by ``CACHE_URL``:
+
+* empty (the default) - :class:`LocalCache`, a bounded in-process LRU. A
+  change made in one worker process is seen by the others once their
+  entries expire after ``CACHE_TIMEOUT`` seconds.
+* ``redis://...`` - :class:`RedisCache`, shared by every worker, so a bump
+  is seen everywhere at once. Needs the optional ``redis`` package.
+"""
+
+import logging
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, has_app_context
+from markupsafe import Markup
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
+
+from models import db, Doctor
+
+
+# Models whose changes invalidate each namespace.
+NAMESPACES = {
+    'doctors': (Doctor,),
+}
+
+log = logging.getLogger('hospital.cache')
+
+
+class LocalCache:
+    """Bounded in-process LRU with per-entry expiry."""
+
+    def __init__(self, max_size=1024):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._versions = {}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + timeout)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def version(self, namespace):
+        with self._lock:
+            return self._versions.get(namespace, 0)
+
+    def bump(self, namespace):
+        with self._lock:
+            self._versions[namespace] = self._versions.get(namespace, 0) + 1
+
+
+class RedisCache:
+    """Cache shared by all workers through Redis.
+
+    Connection errors are logged and treated as cache misses, so an
+    unavailable Redis slows pages down but never breaks them.
+    """
+
+    def __init__(self, url, prefix='hms:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('CACHE_URL points at Redis but the redis package is not installed '
+                               '(pip install redis)')
+        self._error = redis.RedisError
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        try:
+            data = self.client.get(self.prefix + key)
+        except self._error as e:
+            log.warning('Cache read failed: %s', e)
+            return None
+        return pickle.loads(data) if data is not None else None
+
+    def set(self, key, value, timeout):
+        try:
+            self.client.set(self.prefix + key, pickle.dumps(value), ex=timeout)
+        except self._error as e:
+            log.warning('Cache write failed: %s', e)
+
+    def version(self, namespace):
+        try:
+            return int(self.client.get(f'{self.prefix}version:{namespace}') or 0)
+        except self._error as e:
+            log.warning('Cache version read failed: %s', e)
+            return None
+
+    def bump(self, namespace):
+        try:
+            self.client.incr(f'{self.prefix}version:{namespace}')
+        except self._error as e:
+            log.warning('Cache version bump failed: %s', e)
+
+
+def make_backend(url=None, max_size=1024):
+    """Return the backend for ``url`` (``None`` or empty for the local LRU)."""
+    if not url:
+        return LocalCache(max_size)
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisCache(url)
+    raise ValueError(f'Unsupported CACHE_URL: {url}')
+
+
+def get_backend():
+    """Return the cache backend of the current app."""
+    backend = current_app.extensions.get('cache')
+    if backend is None:
+        backend = make_backend(current_app.config.get('CACHE_URL'), current_app.config.get('CACHE_SIZE', 1024))
+        current_app.extensions['cache'] = backend
+    return backend
+
+
+def cached(namespace, key, loader, timeout=None):
+    """Return the cached value for ``key`` in ``namespace``, calling ``loader`` on a miss.
+
+    ``key`` is a tuple of the values the result depends on.
+    """
+    backend = get_backend()
+    version = backend.version(namespace)
+    if version is None:
+        return loader()
+    full_key = f"{namespace}:v{version}:{':'.join(str(part) for part in key)}"
+    value = backend.get(full_key)
+    if value is None:
+        value = loader()
+        backend.set(full_key, value, timeout or current_app.config.get('CACHE_TIMEOUT', 300))
+    return value
+
+
+def cached_fragment(namespace, key, render):
+    """Cache the HTML returned by ``render()`` and return it as safe markup."""
+    return Markup(cached(namespace, key, lambda: str(render())))
+
+
+def _namespaces_of(model):
+    return [namespace for namespace, models in NAMESPACES.items() if issubclass(model, models)]
+
+
+def _mark_changed(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('cache_bump', set()).update(_namespaces_of(type(target)))
+
+
+for _models in NAMESPACES.values():
+    for _model in _models:
+        for _event in ('after_insert', 'after_update', 'after_delete'):
+            event.listen(_model, _event, _mark_changed)
+
+
+@event.listens_for(db.session, 'do_orm_execute')
+def _mark_bulk_statement(orm_execute_state):
+    if orm_execute_state.is_select:
+        return
+    mapper = orm_execute_state.bind_arguments.get('mapper')
+    if mapper is not None:
+        namespaces = _namespaces_of(mapper.class_)
+        if namespaces:
+            orm_execute_state.session.info.setdefault('cache_bump', set()).update(namespaces)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _bump_after_commit(session):
+    namespaces = session.info.pop('cache_bump', None)
+    if namespaces and has_app_context():
+        backend = get_backend()
+        for namespace in namespaces:
+            backend.bump(namespace)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _forget_after_rollback(session):
+    session.info.pop('cache_bump', None)
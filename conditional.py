@@ -0,0 +1,61 @@
+"""Conditional GET for detail pages.
+
+A view computes a validator - an ETag and a Last-Modified time - from one
+cheap query of modification stamps, and passes it to :func:`conditional`
+together with a function that renders the page. When the browser's
+``If-None-Match`` or ``If-Modified-Since`` shows it already has the
+current version, a bodiless 304 goes back and the page is never loaded or
+rendered. Pages built from several tables send only the ETag, as a
+deleted row leaves no newer stamp for a Last-Modified time to pick up.
+
+The ETag also covers the logged-in user, because pages show their name and
+role-dependent actions. Responses are marked ``private, no-cache``: the
+browser may keep a copy of the patient data but must check it on every
+use, and shared caches must not store it.
+"""
+
+import hashlib
+from datetime import timezone
+
+from flask import make_response, request, session
+from flask_login import current_user
+
+
+def make_etag(*parts):
+    """Return a strong ETag for the values the page depends on."""
+    user = current_user.get_id() if current_user.is_authenticated else None
+    raw = repr((user,) + parts).encode()
+    return hashlib.sha1(raw).hexdigest()[:32]
+
+
+def latest(*stamps):
+    """Return the newest of ``stamps``, ignoring missing ones."""
+    stamps = [stamp for stamp in stamps if stamp is not None]
+    return max(stamps) if stamps else None
+
+
+def is_not_modified(etag, last_modified=None):
+    """Whether the request's validators match; ``If-None-Match`` wins when present."""
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if request.if_modified_since and last_modified is not None:
+        return last_modified.replace(microsecond=0, tzinfo=timezone.utc) <= request.if_modified_since
+    return False
+
+
+def conditional(etag, last_modified, render):
+    """Answer 304 when the client is up to date, otherwise ``render()`` the page.
+
+    Pending flash messages always get a full page so they are not lost.
+    """
+    if '_flashes' not in session and is_not_modified(etag, last_modified):
+        response = make_response('', 304)
+    else:
+        response = make_response(render())
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified.replace(tzinfo=timezone.utc)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.vary.add('Cookie')
+    return response
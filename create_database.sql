@@ -2,6 +2,6 @@
 CREATE DATABASE IF NOT EXISTS hospital_db;
 USE hospital_db;
 
--- The tables will be created automatically by Flask-SQLAlchemy
+-- Tables and indexes are created by the migration runner (migrations.py)
 -- Just make sure the database exists before running the app
 
@@ -0,0 +1,279 @@
+"""Synthetic data for load testing.
+
+:func:`generate` fills the database with realistic volumes of patients,
+doctors, appointments, bills and prescriptions:
+
+* doctor load follows a Zipf distribution, so a few doctors are very busy
+  and most see a handful of patients a week;
+* weekdays are busier than weekends;
+* past appointments are mostly completed with some cancellations, future
+  ones mostly scheduled;
+* completed visits usually produce a bill (old bills are mostly paid,
+  recent ones often pending) and often a prescription.
+
+Rows are built as plain dicts and written with one executemany per batch,
+the same way :mod:`importer` does it, so a million patients take minutes
+rather than hours. All randomness comes from one seeded
+:class:`random.Random`, so a given seed and ``end_date`` always produce
+the same data.
+"""
+
+import random
+from datetime import date, datetime, time, timedelta
+from itertools import accumulate
+
+from sqlalchemy import func, insert, select
+
+from models import db, Patient, Doctor, Appointment, Bill, Prescription
+from dedupe import blocking_keys
+from revenue import rebuild as rebuild_revenue
+from scheduling import SLOT_TIMES
+
+
+FIRST_NAMES = (
+    'James', 'Mary', 'John', 'Patricia', 'Robert', 'Jennifer', 'Michael', 'Linda', 'David', 'Elizabeth',
+    'William', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica', 'Thomas', 'Sarah', 'Charles', 'Karen',
+    'Bola', 'Adeyemi', 'Kolade', 'Olaiya', 'Amara', 'Chidi', 'Fatima', 'Ibrahim', 'Ngozi', 'Tunde',
+    'Wei', 'Mei', 'Hiroshi', 'Yuki', 'Arjun', 'Priya', 'Carlos', 'Sofia', 'Ahmed', 'Leila',
+)
+
+LAST_NAMES = (
+    'Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez', 'Martinez',
+    'Anderson', 'Taylor', 'Thomas', 'Moore', 'Jackson', 'Martin', 'Lee', 'Thompson', 'White', 'Harris',
+    'Akinbode', 'Mohammed', 'Okafor', 'Adebayo', 'Eze', 'Bello', 'Chen', 'Wang', 'Tanaka', 'Sato',
+    'Patel', 'Sharma', 'Lopez', 'Gonzalez', 'Hernandez', 'Khan', 'Ali', 'Nguyen', 'Kim', 'Silva',
+)
+
+STREETS = ('Main St', 'Oak Ave', 'Pine Rd', 'Elm Blvd', 'Maple Dr', 'Cedar Ln', 'Park Way', 'Lake Rd', 'Hill St')
+
+# (specialty, relative share of doctors)
+SPECIALTIES = (
+    ('General Medicine', 30), ('Pediatrics', 12), ('Cardiology', 8), ('Orthopedics', 8),
+    ('Dermatology', 6), ('Obstetrics', 6), ('Psychiatry', 6), ('Neurology', 5),
+    ('Ophthalmology', 5), ('ENT', 5), ('Oncology', 4), ('Radiology', 5),
+)
+
+MEDICINES = (
+    ('Amoxicillin 500mg', '1 tablet 3 times daily for 7 days'),
+    ('Ibuprofen 400mg', '1 tablet as needed for pain'),
+    ('Paracetamol 500mg', '2 tablets every 6 hours'),
+    ('Metformin 500mg', '1 tablet twice daily with meals'),
+    ('Lisinopril 10mg', '1 tablet daily'),
+    ('Atorvastatin 20mg', '1 tablet at night'),
+    ('Omeprazole 20mg', '1 capsule before breakfast'),
+    ('Salbutamol inhaler', '2 puffs when needed'),
+    ('Cetirizine 10mg', '1 tablet daily'),
+    ('Amlodipine 5mg', '1 tablet daily'),
+)
+
+# Zipf exponent for how appointments spread over doctors.
+DOCTOR_SKEW = 1.1
+
+# Share of appointments that fall on a Saturday or Sunday day, relative to
+# a weekday.
+WEEKEND_LOAD = 0.3
+
+# Days after today that future appointments are booked into.
+BOOKING_HORIZON_DAYS = 30
+
+BILL_RATE = 0.75
+PRESCRIPTION_RATE = 0.55
+
+
+class _BatchWriter:
+    """Collects rows for one model and inserts them a batch at a time."""
+
+    def __init__(self, model, batch_size, progress=None):
+        self.model = model
+        self.batch_size = batch_size
+        self.progress = progress
+        self.rows = []
+        self.count = 0
+
+    def add(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        db.session.execute(insert(self.model), self.rows)
+        db.session.commit()
+        self.count += len(self.rows)
+        self.rows = []
+        if self.progress:
+            self.progress(self.model.__tablename__, self.count)
+
+
+def _next_id(column):
+    return db.session.execute(select(func.coalesce(func.max(column), 0))).scalar() + 1
+
+
+def _phone(rng):
+    return f'555-{rng.randrange(10 ** 7):07d}'
+
+
+def _random_datetime(rng, day):
+    return datetime.combine(day, time(rng.randrange(8, 18), rng.randrange(60), rng.randrange(60)))
+
+
+def generate_doctors(rng, count, writer):
+    """Write ``count`` doctors and return their ids."""
+    first_id = _next_id(Doctor.doctor_id)
+    specialties = [name for name, _ in SPECIALTIES]
+    shares = [share for _, share in SPECIALTIES]
+    for doctor_id in range(first_id, first_id + count):
+        writer.add({
+            'doctor_id': doctor_id,
+            'name': f'Dr. {rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+            'specialty': rng.choices(specialties, shares)[0],
+            'phone': _phone(rng),
+            'available': rng.random() < 0.9,
+        })
+    writer.flush()
+    return list(range(first_id, first_id + count))
+
+
+def generate_patients(rng, count, start, end, writer):
+    """Write ``count`` patients registered between ``start`` and ``end``; return their ids."""
+    first_id = _next_id(Patient.patient_id)
+    days = (end - start).days + 1
+    for patient_id in range(first_id, first_id + count):
+        row = {
+            'patient_id': patient_id,
+            'name': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+            # Roughly the age mix of a general hospital: many adults, a
+            # tail of children and elderly patients.
+            'age': min(100, max(0, int(rng.triangular(0, 95, 45)))),
+            'gender': rng.choice(('Male', 'Female')),
+            'phone': _phone(rng),
+            'address': f'{rng.randrange(1, 2000)} {rng.choice(STREETS)}',
+            'reg_date': _random_datetime(rng, start + timedelta(days=rng.randrange(days))),
+        }
+        writer.add({**row, **blocking_keys(row['name'], row['phone'], row['age'])})
+    writer.flush()
+    return list(range(first_id, first_id + count))
+
+
+def _day_weights(start, end):
+    days = []
+    day = start
+    while day <= end:
+        days.append((day, WEEKEND_LOAD if day.weekday() >= 5 else 1.0))
+        day += timedelta(days=1)
+    return days
+
+
+def _appointment_status(rng, day, today):
+    roll = rng.random()
+    if day < today:
+        return 'completed' if roll < 0.85 else 'cancelled' if roll < 0.97 else 'scheduled'
+    return 'scheduled' if roll < 0.92 else 'cancelled'
+
+
+def _bill_status(rng, day, today):
+    paid_rate = 0.95 if (today - day).days > 30 else 0.4
+    return 'paid' if rng.random() < paid_rate else 'pending'
+
+
+def generate_visits(rng, count, doctor_ids, patient_ids, start, today, writers):
+    """Write about ``count`` appointments between ``start`` and the booking horizon.
+
+    Completed appointments also produce bills and prescriptions. Each doctor
+    slot is used at most once, and slots already held by appointments in the
+    database are skipped, so the slot constraint is never violated.
+    """
+    appointments, bills, prescriptions = writers
+    end = today + timedelta(days=BOOKING_HORIZON_DAYS)
+    existing = db.session.execute(
+        select(Appointment.appoint_id).where(Appointment.date.between(start, end), Appointment.slot_held.is_(True))
+        .limit(1)
+    ).first() is not None
+    ranked = doctor_ids[:]
+    rng.shuffle(ranked)
+    cum_weights = list(accumulate(1 / rank ** DOCTOR_SKEW for rank in range(1, len(ranked) + 1)))
+    capacity = len(ranked) * len(SLOT_TIMES)
+
+    days = _day_weights(start, end)
+    total_weight = sum(weight for _, weight in days)
+    carry = 0.0
+    for day, weight in days:
+        carry += count * weight / total_weight
+        wanted = min(int(carry), capacity)
+        carry -= int(carry)
+        booked = set()
+        if existing:
+            booked.update((doctor_id, slot) for doctor_id, slot in db.session.execute(
+                select(Appointment.doctor_id, Appointment.time)
+                .where(Appointment.date == day, Appointment.slot_held.is_(True))
+            ))
+        for doctor_id in rng.choices(ranked, cum_weights=cum_weights, k=wanted):
+            slot = rng.choice(SLOT_TIMES)
+            # Busy doctors fill up; move the visit to another doctor rather
+            # than double book.
+            attempts = 0
+            while (doctor_id, slot) in booked and attempts < 10:
+                doctor_id = rng.choice(ranked)
+                slot = rng.choice(SLOT_TIMES)
+                attempts += 1
+            if (doctor_id, slot) in booked:
+                continue
+            booked.add((doctor_id, slot))
+
+            patient_id = rng.choice(patient_ids)
+            status = _appointment_status(rng, day, today)
+            appointments.add({
+                'patient_id': patient_id, 'doctor_id': doctor_id, 'date': day, 'time': slot,
+                'status': status, 'slot_held': None if status == 'cancelled' else True,
+            })
+            if status != 'completed':
+                continue
+            visited_at = datetime.combine(day, time.fromisoformat(slot))
+            if rng.random() < BILL_RATE:
+                bills.add({
+                    'patient_id': patient_id,
+                    'amount': round(rng.lognormvariate(4.6, 0.6), 2),
+                    'date': visited_at,
+                    'status': _bill_status(rng, day, today),
+                })
+            if rng.random() < PRESCRIPTION_RATE:
+                medicine, dosage = rng.choice(MEDICINES)
+                prescriptions.add({
+                    'patient_id': patient_id, 'doctor_id': doctor_id,
+                    'medicine': medicine, 'dosage': dosage, 'date': visited_at,
+                })
+    for writer in writers:
+        writer.flush()
+
+
+def generate(patients=10000, doctors=50, appointments=None, years=1, seed=0,
+             end_date=None, batch_size=5000, progress=None):
+    """Populate the database and return the number of rows written per table.
+
+    ``appointments`` defaults to two per patient, spread over ``years``
+    years up to ``end_date`` (default today) plus a month of future
+    bookings. ``progress(table, rows_so_far)`` is called after each batch.
+    """
+    rng = random.Random(seed)
+    today = end_date or date.today()
+    start = today - timedelta(days=int(365 * years))
+    if appointments is None:
+        appointments = patients * 2
+
+    writers = {model: _BatchWriter(model, batch_size, progress)
+               for model in (Doctor, Patient, Appointment, Bill, Prescription)}
+
+    doctor_ids = generate_doctors(rng, doctors, writers[Doctor]) if doctors else \
+        list(db.session.execute(select(Doctor.doctor_id)).scalars())
+    patient_ids = generate_patients(rng, patients, start, today, writers[Patient]) if patients else \
+        list(db.session.execute(select(Patient.patient_id)).scalars())
+
+    if appointments and doctor_ids and patient_ids:
+        generate_visits(rng, appointments, doctor_ids, patient_ids, start, today,
+                        (writers[Appointment], writers[Bill], writers[Prescription]))
+    if writers[Bill].count:
+        # Bulk inserts skip the ORM events that keep the daily totals.
+        rebuild_revenue(start, today)
+
+    return {model.__tablename__: writer.count for model, writer in writers.items()}
@@ -0,0 +1,137 @@
+"""Database connection pool configuration and statistics.
+
+Pool sizing, recycling and pre-ping come from the environment so they can be
+tuned per deployment:
+
+==================  =======  ===========================================
+Variable            Default  Meaning
+==================  =======  ===========================================
+DB_POOL_SIZE        10       Connections kept open per worker process
+DB_MAX_OVERFLOW     20       Extra connections allowed under burst load
+DB_POOL_RECYCLE     1800     Seconds before a connection is replaced;
+                             keep below MySQL's ``wait_timeout``
+DB_POOL_PRE_PING    1        Test connections on checkout so ones the
+                             server dropped while idle are replaced
+DB_POOL_TIMEOUT     30       Seconds to wait for a free connection
+DB_CONNECT_TIMEOUT  5        Seconds to wait when opening a connection,
+                             so ``/readyz`` fails fast if MySQL is down
+==================  =======  ===========================================
+
+The pool is an :class:`InstrumentedQueuePool`, which additionally records
+how long each checkout waited, for the ``/admin/pool`` endpoint.
+"""
+
+import os
+import threading
+import time
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+from models import db
+
+
+class PoolStats:
+    """Checkout wait-time counters for one pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, waited, timed_out=False):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+            if timed_out:
+                self.timeouts += 1
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'avg_wait_ms': round(self.total_wait / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                'max_wait_ms': round(self.max_wait * 1000, 3),
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """A ``QueuePool`` that times how long callers wait for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - start)
+        return connection
+
+
+def _env_bool(environ, name, default):
+    value = environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def engine_options(uri, environ=None):
+    """Build ``SQLALCHEMY_ENGINE_OPTIONS`` for ``uri`` from the environment.
+
+    SQLite gets no pool settings: its in-memory and file databases use
+    pools of their own that do not accept sizing options.
+    """
+    environ = os.environ if environ is None else environ
+    if uri.startswith('sqlite'):
+        return {}
+    options = {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': int(environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(environ.get('DB_MAX_OVERFLOW', 20)),
+        'pool_recycle': int(environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': _env_bool(environ, 'DB_POOL_PRE_PING', True),
+        'pool_timeout': int(environ.get('DB_POOL_TIMEOUT', 30)),
+    }
+    if uri.startswith('mysql'):
+        options['connect_args'] = {'connect_timeout': int(environ.get('DB_CONNECT_TIMEOUT', 5))}
+    return options
+
+
+def pool_status(engine):
+    """Return a JSON-friendly snapshot of ``engine``'s pool."""
+    pool = engine.pool
+    status = {'pool': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            'size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'idle': pool.checkedin(),
+            'overflow': max(pool.overflow(), 0),
+            'max_overflow': pool._max_overflow,
+            'timeout': pool.timeout(),
+        })
+    if isinstance(pool, InstrumentedQueuePool):
+        status.update(pool.stats.as_dict())
+    return status
+
+
+def dispose_engines(app, close=True):
+    """Empty the connection pools of every engine of ``app``.
+
+    A pre-fork server calls this with ``close=False`` in each new worker:
+    the worker starts with fresh pools and never touches sockets inherited
+    from the master, which stay the master's to close. On shutdown it is
+    called with ``close=True`` to close the worker's own connections.
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=close)
@@ -0,0 +1,234 @@
+"""Duplicate patient detection.
+
+Every patient carries three blocking keys, computed from the registration
+details whenever the row is inserted or updated:
+
+* ``phone_key``: the last ten digits of the phone number, so
+  ``555-100-1001``, ``(555) 100 1001`` and ``+1 555 100 1001`` agree.
+  Numbers with fewer than seven digits are too weak to block on and get
+  no key.
+* ``name_key``: the Soundex codes of the first and last name, sorted, so
+  ``Jon Smyth`` matches ``Smith, John``.
+* ``age_band``: the age in :data:`AGE_BAND_YEARS` year bands.
+
+A registration looks like an existing patient when their phone keys agree,
+or when their name keys agree and their age bands are the same or
+neighbours. Both keys are indexed, so checking a new registration is one
+index lookup per key rather than a scan of the table, and
+:func:`find_clusters` groups the whole registry with two ordered index
+scans and a union-find instead of comparing every pair.
+
+Writes that bypass the ORM unit of work (the importer and the data
+generator use bulk ``insert()``) must add :func:`blocking_keys` to their
+rows themselves.
+"""
+
+import re
+import unicodedata
+from collections import defaultdict
+
+from sqlalchemy import and_, bindparam, case, event, or_, select, update
+
+from models import db, Patient
+
+
+AGE_BAND_YEARS = 5
+MIN_PHONE_DIGITS = 7
+PHONE_KEY_DIGITS = 10
+MAX_MATCHES = 10
+
+# Vowels code as '0': they separate repeated consonant codes but are dropped.
+_SOUNDEX_CODES = {letter: str(code) for code, letters in enumerate(
+    ('aeiouy', 'bfpv', 'cgjkqsxz', 'dt', 'l', 'mn', 'r')) for letter in letters}
+
+
+def soundex(word):
+    """Return the American Soundex code of ``word`` (letters only)."""
+    word = word.lower()
+    code, last = word[0].upper(), _SOUNDEX_CODES.get(word[0])
+    for letter in word[1:]:
+        digit = _SOUNDEX_CODES.get(letter)
+        if digit is None:
+            # h and w do not separate letters with the same code.
+            continue
+        if digit != '0' and digit != last:
+            code += digit
+        last = digit
+    return (code + '000')[:4]
+
+
+def name_key(name):
+    """Return the phonetic key of a full name, or ``None`` if it has no letters."""
+    ascii_name = unicodedata.normalize('NFKD', name or '').encode('ascii', 'ignore').decode()
+    words = re.findall(r'[a-z]+', ascii_name.lower())
+    if not words:
+        return None
+    return ' '.join(sorted({soundex(words[0]), soundex(words[-1])}))
+
+
+def phone_key(phone):
+    """Return the normalised digits of a phone number, or ``None`` if too short."""
+    digits = re.sub(r'\D', '', phone or '')
+    if len(digits) < MIN_PHONE_DIGITS:
+        return None
+    return digits[-PHONE_KEY_DIGITS:]
+
+
+def age_band(age):
+    """Return the age band of ``age``."""
+    return None if age is None else age // AGE_BAND_YEARS
+
+
+def blocking_keys(name, phone, age):
+    """Return the blocking key columns for a patient's details."""
+    return {'phone_key': phone_key(phone), 'name_key': name_key(name), 'age_band': age_band(age)}
+
+
+@event.listens_for(Patient, 'before_insert')
+@event.listens_for(Patient, 'before_update')
+def _sync_blocking_keys(mapper, connection, target):
+    for column, value in blocking_keys(target.name, target.phone, target.age).items():
+        setattr(target, column, value)
+
+
+def _neighbours(band):
+    return [band - 1, band, band + 1]
+
+
+def find_duplicates(name, phone, age, exclude=None, limit=MAX_MATCHES):
+    """Return existing patients that look like the given details, strongest matches first.
+
+    ``exclude`` is a patient id to leave out (the patient being edited).
+    """
+    keys = blocking_keys(name, phone, age)
+    by_phone = Patient.phone_key == keys['phone_key'] if keys['phone_key'] else None
+    by_name = None
+    if keys['name_key'] and keys['age_band'] is not None:
+        by_name = and_(Patient.name_key == keys['name_key'], Patient.age_band.in_(_neighbours(keys['age_band'])))
+    conditions = [c for c in (by_phone, by_name) if c is not None]
+    if not conditions:
+        return []
+
+    score = sum(case((c, 1), else_=0) for c in conditions)
+    query = Patient.query.filter(or_(*conditions))
+    if exclude is not None:
+        query = query.filter(Patient.patient_id != exclude)
+    return query.order_by(score.desc(), Patient.patient_id).limit(limit).all()
+
+
+class BlockingIndex:
+    """In-memory blocking index for checking many rows at once."""
+
+    def __init__(self):
+        self.by_phone = defaultdict(list)
+        self.by_name = defaultdict(list)
+
+    def add(self, item, keys):
+        if keys['phone_key']:
+            self.by_phone[keys['phone_key']].append(item)
+        if keys['name_key'] and keys['age_band'] is not None:
+            self.by_name[(keys['name_key'], keys['age_band'])].append(item)
+
+    def matches(self, keys):
+        """Return the items that look like ``keys``, in the order they were added."""
+        found = list(self.by_phone.get(keys['phone_key'], ())) if keys['phone_key'] else []
+        if keys['name_key'] and keys['age_band'] is not None:
+            for band in _neighbours(keys['age_band']):
+                found.extend(self.by_name.get((keys['name_key'], band), ()))
+        return list(dict.fromkeys(found))
+
+
+def existing_index(keys):
+    """Return a :class:`BlockingIndex` of the patient ids that could match any of ``keys``.
+
+    One query however many rows are checked, loading only patients with one
+    of the phone keys or one of the name keys in a neighbouring age band.
+    """
+    index = BlockingIndex()
+    phones = {k['phone_key'] for k in keys if k['phone_key']}
+    # Name keys grouped by the age bands they may match in, so a common name
+    # only loads the patients of its neighbouring bands, not every age.
+    names_by_band = defaultdict(set)
+    for k in keys:
+        if k['name_key'] and k['age_band'] is not None:
+            for band in _neighbours(k['age_band']):
+                names_by_band[band].add(k['name_key'])
+    conditions = []
+    if phones:
+        conditions.append(Patient.phone_key.in_(phones))
+    for band, names in sorted(names_by_band.items()):
+        conditions.append(and_(Patient.age_band == band, Patient.name_key.in_(names)))
+    if conditions:
+        statement = select(Patient.patient_id, Patient.phone_key, Patient.name_key, Patient.age_band) \
+            .where(or_(*conditions)).order_by(Patient.patient_id)
+        for patient_id, phone, name, band in db.session.execute(statement):
+            index.add(patient_id, {'phone_key': phone, 'name_key': name, 'age_band': band})
+    return index
+
+
+def find_clusters(batch_size=5000):
+    """Return groups of patient ids that look like the same person, largest first.
+
+    Patients are linked when they share a phone key, or a name key and age
+    band; a cluster is everything linked directly or through others. Unlike
+    :func:`find_duplicates`, neighbouring bands are not linked: across a
+    whole registry that would chain every age of a common name into one
+    cluster. Each rule is one scan of its index in key order, with only
+    neighbouring rows compared.
+    """
+    parent = {}
+
+    def find(x):
+        parent.setdefault(x, x)
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(a, b):
+        a, b = find(a), find(b)
+        if a != b:
+            parent[max(a, b)] = min(a, b)
+
+    def scan(statement, linked):
+        previous = None
+        for row in db.session.execute(statement.execution_options(yield_per=batch_size)):
+            if previous is not None and linked(previous, row):
+                union(previous[0], row[0])
+            previous = row
+
+    scan(select(Patient.patient_id, Patient.phone_key).where(Patient.phone_key.isnot(None))
+         .order_by(Patient.phone_key, Patient.patient_id),
+         lambda a, b: a[1] == b[1])
+    scan(select(Patient.patient_id, Patient.name_key, Patient.age_band)
+         .where(Patient.name_key.isnot(None), Patient.age_band.isnot(None))
+         .order_by(Patient.name_key, Patient.age_band, Patient.patient_id),
+         lambda a, b: a[1:] == b[1:])
+
+    clusters = defaultdict(list)
+    for patient_id in parent:
+        clusters[find(patient_id)].append(patient_id)
+    return sorted((sorted(ids) for ids in clusters.values() if len(ids) > 1), key=lambda ids: (-len(ids), ids[0]))
+
+
+def backfill_keys(connection, batch_size=1000):
+    """Compute the blocking keys of every patient; return how many rows were updated."""
+    table = Patient.__table__
+    statement = update(table).where(table.c.patient_id == bindparam('id')).values(
+        phone_key=bindparam('p_key'), name_key=bindparam('n_key'), age_band=bindparam('band'))
+    updated, last_id = 0, 0
+    while True:
+        rows = connection.execute(
+            select(table.c.patient_id, table.c.name, table.c.phone, table.c.age)
+            .where(table.c.patient_id > last_id).order_by(table.c.patient_id).limit(batch_size)
+        ).all()
+        if not rows:
+            return updated
+        params = []
+        for patient_id, name, phone, age in rows:
+            keys = blocking_keys(name, phone, age)
+            params.append({'id': patient_id, 'p_key': keys['phone_key'], 'n_key': keys['name_key'],
+                           'band': keys['age_band']})
+        connection.execute(statement, params)
+        updated += len(rows)
+        last_id = rows[-1][0]
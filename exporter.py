@@ -0,0 +1,125 @@
+"""Streaming CSV / JSON Lines export of bills, appointments and prescriptions.
+
+Exports select plain columns (no ORM objects) and read them through a
+server-side cursor with ``yield_per``, so rows are encoded and sent as they
+arrive from the database. Memory use is bounded by one chunk of rows however
+large the extract is, and the first bytes go out before the query finishes.
+"""
+
+import csv
+import io
+import json
+from datetime import timedelta
+
+from sqlalchemy import select
+
+from models import db, Patient, Doctor, Appointment, Bill, Prescription
+
+
+# Rows fetched from the cursor and encoded per chunk.
+CHUNK_ROWS = 1000
+
+FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+def _bills():
+    return Bill, select(
+        Bill.bill_id, Bill.patient_id, Patient.name.label('patient_name'),
+        Bill.amount, Bill.date, Bill.status,
+    ).join(Patient, Patient.patient_id == Bill.patient_id).order_by(Bill.bill_id)
+
+
+def _appointments():
+    return Appointment, select(
+        Appointment.appoint_id, Appointment.patient_id, Patient.name.label('patient_name'),
+        Appointment.doctor_id, Doctor.name.label('doctor_name'),
+        Appointment.date, Appointment.time, Appointment.status,
+    ).join(Patient, Patient.patient_id == Appointment.patient_id) \
+     .join(Doctor, Doctor.doctor_id == Appointment.doctor_id) \
+     .order_by(Appointment.appoint_id)
+
+
+def _prescriptions():
+    return Prescription, select(
+        Prescription.presc_id, Prescription.patient_id, Patient.name.label('patient_name'),
+        Prescription.doctor_id, Doctor.name.label('doctor_name'),
+        Prescription.medicine, Prescription.dosage, Prescription.date,
+    ).join(Patient, Patient.patient_id == Prescription.patient_id) \
+     .join(Doctor, Doctor.doctor_id == Prescription.doctor_id) \
+     .order_by(Prescription.presc_id)
+
+
+EXPORTS = {
+    'bills': _bills,
+    'appointments': _appointments,
+    'prescriptions': _prescriptions,
+}
+
+
+def build_export_query(kind, start=None, end=None, status=None):
+    """Return the select statement for an export.
+
+    ``start`` and ``end`` are inclusive dates; ``status`` only applies to
+    kinds that have one. Raises ``ValueError`` for an unknown kind or a
+    status filter on prescriptions.
+    """
+    if kind not in EXPORTS:
+        raise ValueError(f'Unknown export: {kind}')
+    model, statement = EXPORTS[kind]()
+
+    date_column = model.date
+    if start:
+        statement = statement.where(date_column >= start)
+    if end:
+        # DateTime columns hold a time of day, so compare against the next
+        # midnight rather than the end date itself.
+        if isinstance(date_column.type, db.DateTime):
+            statement = statement.where(date_column < end + timedelta(days=1))
+        else:
+            statement = statement.where(date_column <= end)
+    if status:
+        if not hasattr(model, 'status'):
+            raise ValueError(f'{kind} cannot be filtered by status')
+        statement = statement.where(model.status == status)
+    return statement
+
+
+def _stream(statement):
+    result = db.session.execute(statement.execution_options(stream_results=True, yield_per=CHUNK_ROWS))
+    return result.keys(), result.partitions()
+
+
+def _encode(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def iter_csv(statement):
+    """Yield CSV text chunks for ``statement``, header first."""
+    keys, partitions = _stream(statement)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(keys)
+    yield buffer.getvalue()
+    for rows in partitions:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_encode(v) for v in row] for row in rows)
+        yield buffer.getvalue()
+
+
+def iter_jsonl(statement):
+    """Yield JSON Lines text chunks for ``statement``."""
+    keys, partitions = _stream(statement)
+    keys = list(keys)
+    for rows in partitions:
+        yield ''.join(
+            json.dumps(dict(zip(keys, (_encode(v) for v in row)))) + '\n' for row in rows
+        )
+
+
+def iter_export(statement, fmt):
+    """Yield text chunks of ``statement`` in ``fmt`` (``'csv'`` or ``'jsonl'``)."""
+    return iter_csv(statement) if fmt == 'csv' else iter_jsonl(statement)
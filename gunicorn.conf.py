@@ -0,0 +1,44 @@
+"""Gunicorn settings for production.
+
+The app is imported once in the master (``preload_app``) and forked into
+``WEB_CONCURRENCY`` worker processes, each serving ``GUNICORN_THREADS``
+requests at a time. Every worker empties its inherited SQLAlchemy pools
+right after the fork, so no two processes ever share a database socket.
+
+On SIGTERM (``docker stop``) workers stop accepting connections, finish
+the requests in flight for up to ``GUNICORN_GRACEFUL_TIMEOUT`` seconds and
+close their database connections before exiting.
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5001')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_class = 'gthread'
+preload_app = True
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# Recycle workers now and then so slow leaks cannot accumulate; the jitter
+# keeps them from all restarting at once.
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 5000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 500))
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-') or None
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    from dbpool import dispose_engines
+    from wsgi import app
+    dispose_engines(app, close=False)
+
+
+def worker_exit(server, worker):
+    from dbpool import dispose_engines
+    from wsgi import app
+    dispose_engines(app)
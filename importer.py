@@ -0,0 +1,212 @@
+"""Streaming bulk import of patients from CSV or JSON Lines.
+
+Rows are read one at a time, validated against the ``Patient`` columns and
+inserted in batches with a single executemany round trip per batch. A bad
+row is reported with its line number and skipped; it never aborts the run.
+Only the current batch and the first :data:`MAX_REPORTED_ERRORS` errors are
+held in memory, so file size does not matter.
+
+Open the stream with ``errors='replace'``: a field holding bytes that are
+not UTF-8 then fails validation on its own line. A strict stream that hits
+one stops the run there, after the rows read so far are inserted.
+
+Each batch is checked for likely duplicates of existing patients, and of
+earlier rows in the same batch, with one blocking-key query (see
+:mod:`dedupe`). Matches are reported and, with ``skip_duplicates``, left out.
+"""
+
+import csv
+import json
+
+from sqlalchemy import insert
+from sqlalchemy.exc import DBAPIError
+
+from models import db, Patient
+import dedupe
+
+
+IMPORT_COLUMNS = ('name', 'age', 'gender', 'phone', 'address')
+
+MAX_REPORTED_ERRORS = 100
+
+# What ``errors='replace'`` decodes a byte that is not UTF-8 to.
+REPLACEMENT_CHARACTER = '\ufffd'
+
+
+class ImportReport:
+    """Outcome of an import run."""
+
+    def __init__(self):
+        self.inserted = 0
+        self.error_count = 0
+        self.errors = []
+        self.duplicate_count = 0
+        self.duplicates = []
+        self.skipped = 0
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+    def add_duplicate(self, line, name, matches):
+        self.duplicate_count += 1
+        if len(self.duplicates) < MAX_REPORTED_ERRORS:
+            self.duplicates.append((line, name, matches))
+
+
+def detect_format(filename):
+    """Return ``'jsonl'`` or ``'csv'`` from a file name."""
+    return 'jsonl' if filename.lower().endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+
+
+def read_rows(stream, fmt):
+    """Yield ``(line_number, row_dict_or_error)`` pairs from a text stream.
+
+    A line that cannot be parsed yields a ``ValueError`` instead of a dict.
+    """
+    if fmt == 'jsonl':
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_number, ValueError(f'invalid JSON: {e}')
+                continue
+            if not isinstance(row, dict):
+                yield line_number, ValueError('expected a JSON object')
+                continue
+            yield line_number, row
+    else:
+        reader = csv.DictReader(stream)
+        try:
+            fieldnames = reader.fieldnames
+        except csv.Error as e:
+            yield reader.line_num, ValueError(f'invalid CSV header: {e}')
+            return
+        if fieldnames:
+            reader.fieldnames = [f.strip().lower() for f in fieldnames]
+        while True:
+            try:
+                row = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                # DictReader only updates its own line_num for good rows.
+                yield reader.reader.line_num, ValueError(f'invalid CSV: {e}')
+                continue
+            yield reader.line_num, row
+
+
+def validate_row(row):
+    """Check a row against the ``Patient`` columns.
+
+    Returns a dict of column values ready to insert, or raises ``ValueError``
+    describing the first problem found.
+    """
+    values = {}
+    columns = Patient.__table__.columns
+    for name in IMPORT_COLUMNS:
+        column = columns[name]
+        raw = row.get(name)
+        raw = raw.strip() if isinstance(raw, str) else raw
+        if raw is None or raw == '':
+            if not column.nullable:
+                raise ValueError(f'{name} is required')
+            values[name] = None
+            continue
+        if isinstance(column.type, db.Integer):
+            # JSON true and 33.9 would otherwise pass as 1 and 33.
+            if isinstance(raw, bool) or (isinstance(raw, float) and not raw.is_integer()):
+                raise ValueError(f'{name} must be a whole number')
+            try:
+                raw = int(raw)
+            except (TypeError, ValueError):
+                raise ValueError(f'{name} must be a whole number')
+            if raw < 0:
+                raise ValueError(f'{name} must not be negative')
+        else:
+            raw = str(raw)
+            if REPLACEMENT_CHARACTER in raw:
+                raise ValueError(f'{name} is not valid UTF-8')
+            if '\x00' in raw:
+                raise ValueError(f'{name} contains a NUL byte')
+            length = getattr(column.type, 'length', None)
+            if length and len(raw) > length:
+                raise ValueError(f'{name} is longer than {length} characters')
+        values[name] = raw
+    return values
+
+
+def _describe(match):
+    return f'line {match[1]}' if isinstance(match, tuple) else f'patient #{match}'
+
+
+def _check_duplicates(batch, report, skip):
+    keys = [dedupe.blocking_keys(values['name'], values['phone'], values['age']) for _, values in batch]
+    index = dedupe.existing_index(keys)
+    kept = []
+    for (line, values), row_keys in zip(batch, keys):
+        matches = index.matches(row_keys)
+        if matches:
+            report.add_duplicate(line, values['name'], ', '.join(_describe(m) for m in matches))
+            if skip:
+                report.skipped += 1
+                continue
+        index.add(('line', line), row_keys)
+        kept.append((line, {**values, **row_keys}))
+    return kept
+
+
+def _flush_batch(batch, report, skip_duplicates=False):
+    if not batch:
+        return
+    batch = _check_duplicates(batch, report, skip_duplicates)
+    if not batch:
+        return
+    try:
+        db.session.execute(insert(Patient), [values for _, values in batch])
+        db.session.commit()
+        report.inserted += len(batch)
+    except DBAPIError:
+        # Something in the batch was rejected by the database. Retry row by
+        # row so only the offending rows are reported.
+        db.session.rollback()
+        for line, values in batch:
+            try:
+                db.session.execute(insert(Patient), [values])
+                db.session.commit()
+                report.inserted += 1
+            except DBAPIError as e:
+                db.session.rollback()
+                report.add_error(line, str(e.orig))
+
+
+def import_patients(stream, fmt='csv', batch_size=1000, skip_duplicates=False):
+    """Import patients from a text stream and return an :class:`ImportReport`.
+
+    Rows that look like an existing patient are imported and reported, or
+    skipped when ``skip_duplicates`` is set.
+    """
+    report = ImportReport()
+    batch = []
+    line = 0
+    try:
+        for line, row in read_rows(stream, fmt):
+            if isinstance(row, Exception):
+                report.add_error(line, str(row))
+                continue
+            try:
+                batch.append((line, validate_row(row)))
+            except ValueError as e:
+                report.add_error(line, str(e))
+                continue
+            if len(batch) >= batch_size:
+                _flush_batch(batch, report, skip_duplicates)
+                batch = []
+    except UnicodeDecodeError as e:
+        # A strict stream cannot be read past this point.
+        report.add_error(line + 1, f'not valid UTF-8, import stopped: {e.reason}')
+    _flush_batch(batch, report, skip_duplicates)
+    return report
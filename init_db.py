@@ -1,12 +1,16 @@
-from app import app, db
-from models import User, Patient, Doctor, Appointment, Bill, Prescription
+from app import create_app
+from models import db, User, Patient, Doctor, Appointment, Bill, Prescription
+from migrations import upgrade
 from werkzeug.security import generate_password_hash
 from datetime import datetime, date, timedelta
 
+app = create_app()
+
 def init_database():
     with app.app_context():
-        db.create_all()
-        print("✓ Database tables created")
+        for version in upgrade():
+            print(f"✓ Applied migration {version}")
+        print("✓ Database schema up to date")
         
         if User.query.first():
             print("! Database already contains data. Skipping initialization.")
@@ -0,0 +1,192 @@
+"""Per-endpoint request and SQL metrics in Prometheus text format.
+
+``init_app(app)`` installs request hooks and SQLAlchemy engine events that
+record, per endpoint:
+
+* ``hms_http_request_duration_seconds`` - latency histogram
+* ``hms_http_requests_total`` - requests by method and status code
+* ``hms_sql_statements_total`` / ``hms_sql_duration_seconds_total`` - how
+  many statements the endpoint ran and how long they took
+
+and serves them from ``/metrics``. Requests slower than ``SLOW_REQUEST_MS``
+are logged to the ``hospital.slow_requests`` logger together with their
+slowest statements. Recording is a few dictionary updates under a lock, so
+it is cheap enough to leave on in production.
+"""
+
+import logging
+import threading
+import time
+import weakref
+from collections import defaultdict
+
+from flask import Response, abort, current_app, g, has_request_context, request
+from sqlalchemy import event
+
+from models import db
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Statements kept per request for the slow-request log.
+MAX_TRACKED_STATEMENTS = 200
+
+slow_request_log = logging.getLogger('hospital.slow_requests')
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+class MetricsRegistry:
+    """Thread-safe store of the metrics for one app."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency = defaultdict(Histogram)
+        self.requests = defaultdict(int)
+        self.sql_statements = defaultdict(int)
+        self.sql_seconds = defaultdict(float)
+
+    def record_request(self, endpoint, method, status, duration, sql_count, sql_seconds):
+        with self._lock:
+            self.latency[(endpoint, method)].observe(duration)
+            self.requests[(endpoint, method, status)] += 1
+            self.sql_statements[endpoint] += sql_count
+            self.sql_seconds[endpoint] += sql_seconds
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            lines.append('# HELP hms_http_request_duration_seconds Request latency by endpoint.')
+            lines.append('# TYPE hms_http_request_duration_seconds histogram')
+            for (endpoint, method), hist in sorted(self.latency.items()):
+                labels = f'endpoint="{endpoint}",method="{method}"'
+                for bound, count in zip(hist.buckets, hist.counts):
+                    lines.append(f'hms_http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'hms_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {hist.count}')
+                lines.append(f'hms_http_request_duration_seconds_sum{{{labels}}} {hist.sum:.6f}')
+                lines.append(f'hms_http_request_duration_seconds_count{{{labels}}} {hist.count}')
+
+            lines.append('# HELP hms_http_requests_total Requests by endpoint, method and status.')
+            lines.append('# TYPE hms_http_requests_total counter')
+            for (endpoint, method, status), count in sorted(self.requests.items()):
+                lines.append(f'hms_http_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} {count}')
+
+            lines.append('# HELP hms_sql_statements_total SQL statements executed by endpoint.')
+            lines.append('# TYPE hms_sql_statements_total counter')
+            for endpoint, count in sorted(self.sql_statements.items()):
+                lines.append(f'hms_sql_statements_total{{endpoint="{endpoint}"}} {count}')
+
+            lines.append('# HELP hms_sql_duration_seconds_total Time spent in SQL by endpoint.')
+            lines.append('# TYPE hms_sql_duration_seconds_total counter')
+            for endpoint, seconds in sorted(self.sql_seconds.items()):
+                lines.append(f'hms_sql_duration_seconds_total{{endpoint="{endpoint}"}} {seconds:.6f}')
+        return '\n'.join(lines) + '\n'
+
+
+class RequestSQL:
+    """SQL activity of the request in progress."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = []
+
+
+_instrumented_engines = weakref.WeakSet()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('_metrics_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('_metrics_start')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    if not has_request_context():
+        return
+    sql = g.get('_metrics_sql')
+    if sql is None:
+        return
+    sql.count += 1
+    sql.seconds += elapsed
+    if len(sql.statements) < MAX_TRACKED_STATEMENTS:
+        sql.statements.append((elapsed, statement))
+
+
+def _instrument_engines():
+    for engine in db.engines.values():
+        if engine not in _instrumented_engines:
+            event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+            _instrumented_engines.add(engine)
+
+
+def get_registry():
+    """Return the metrics registry of the current app."""
+    return current_app.extensions.setdefault('metrics', MetricsRegistry())
+
+
+def _start_request():
+    _instrument_engines()
+    g._metrics_start = time.perf_counter()
+    g._metrics_sql = RequestSQL()
+
+
+def _capture_status(response):
+    g._metrics_status = response.status_code
+    return response
+
+
+def _finish_request(exc):
+    start = g.pop('_metrics_start', None)
+    sql = g.pop('_metrics_sql', None)
+    if start is None or sql is None:
+        return
+    duration = time.perf_counter() - start
+    endpoint = request.endpoint or 'unmatched'
+    status = g.pop('_metrics_status', 500)
+    get_registry().record_request(endpoint, request.method, status, duration, sql.count, sql.seconds)
+
+    threshold = current_app.config.get('SLOW_REQUEST_MS', 500)
+    if duration * 1000 >= threshold:
+        slowest = sorted(sql.statements, key=lambda s: s[0], reverse=True)[:5]
+        slow_request_log.warning(
+            'Slow request %s %s (%s) took %.1f ms with %d SQL statements (%.1f ms in SQL)%s',
+            request.method, request.path, endpoint, duration * 1000, sql.count, sql.seconds * 1000,
+            ''.join(f'\n  {elapsed * 1000:.1f} ms: {statement}' for elapsed, statement in slowest)
+        )
+
+
+def metrics_view():
+    """Serve metrics; requires ``Authorization: Bearer <METRICS_TOKEN>`` when set."""
+    token = current_app.config.get('METRICS_TOKEN')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        abort(401)
+    return Response(get_registry().render(), mimetype='text/plain; version=0.0.4')
+
+
+def init_app(app):
+    """Install request hooks and the ``/metrics`` endpoint on ``app``."""
+    app.extensions['metrics'] = MetricsRegistry()
+    app.before_request(_start_request)
+    app.after_request(_capture_status)
+    app.teardown_request(_finish_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
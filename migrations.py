@@ -0,0 +1,219 @@
+"""Versioned schema migrations.
+
+Each migration is a function registered with ``@migration(version, ...)``
+that receives an open connection. Applied versions are recorded in the
+``schema_migrations`` table, so running :func:`upgrade` against an existing
+database only applies what is missing.
+
+Migrations must be safe to run against a database that was created by
+``db.create_all()`` from the current models (fresh installs and the test
+suite do exactly that), so they check before they create.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select
+
+from models import db, User, Patient, Doctor, Appointment, Bill, BillDailyTotal, Prescription
+from dedupe import backfill_keys
+from revenue import rebuild as rebuild_revenue
+from search import install_search_index
+
+
+metadata = MetaData()
+
+schema_migrations = Table(
+    'schema_migrations', metadata,
+    Column('version', Integer, primary_key=True, autoincrement=False),
+    Column('description', String(200), nullable=False),
+    Column('applied_at', DateTime, nullable=False),
+)
+
+MIGRATIONS = []
+
+
+def migration(version, description):
+    """Register a migration function under ``version``."""
+    def decorator(fn):
+        MIGRATIONS.append((version, description, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return decorator
+
+
+def create_indexes_if_missing(conn, table, *names):
+    """Create the named model indexes on ``table`` that do not exist yet.
+
+    Indexes are named explicitly rather than taken wholesale from the model,
+    because the model may already declare indexes on columns that a later
+    migration has not added yet.
+    """
+    existing = {ix['name'] for ix in inspect(conn).get_indexes(table)}
+    for index in db.metadata.tables[table].indexes:
+        if index.name in names and index.name not in existing:
+            index.create(bind=conn)
+
+
+def add_column_if_missing(conn, table, column):
+    """Add ``column`` (a model column) to ``table`` unless it is already there."""
+    existing = {c['name'] for c in inspect(conn).get_columns(table)}
+    if column.name not in existing:
+        column_type = column.type.compile(dialect=conn.dialect)
+        ddl = f'ALTER TABLE {table} ADD COLUMN {column.name} {column_type}'
+        if column.server_default is not None:
+            ddl += f' DEFAULT {column.server_default.arg}'
+        if not column.nullable:
+            ddl += ' NOT NULL'
+        conn.exec_driver_sql(ddl)
+
+
+@migration(1, 'Initial schema')
+def _initial_schema(conn):
+    db.metadata.create_all(bind=conn)
+
+
+@migration(2, 'Indexes for list, dashboard and foreign-key access paths')
+def _hot_path_indexes(conn):
+    create_indexes_if_missing(
+        conn, 'appointments',
+        'ix_appointments_doctor_id_date', 'ix_appointments_date',
+        'ix_appointments_status', 'ix_appointments_patient_id',
+    )
+    create_indexes_if_missing(conn, 'bills', 'ix_bills_date', 'ix_bills_status', 'ix_bills_patient_id')
+    create_indexes_if_missing(
+        conn, 'prescriptions',
+        'ix_prescriptions_doctor_id_date', 'ix_prescriptions_date', 'ix_prescriptions_patient_id',
+    )
+
+
+@migration(3, 'Patient name index and full-text search index')
+def _patient_search(conn):
+    create_indexes_if_missing(conn, 'patients', 'ix_patients_name')
+    install_search_index(conn)
+
+
+@migration(4, 'Appointment slot uniqueness')
+def _appointment_slots(conn):
+    add_column_if_missing(conn, 'appointments', Appointment.__table__.c.slot_held)
+
+    # Keep the earliest live booking of any double-booked slot; later
+    # duplicates stay visible but no longer hold the slot. The inner derived
+    # table is required by MySQL, which refuses to read the table it updates.
+    conn.exec_driver_sql("""
+        UPDATE appointments SET slot_held = 1
+        WHERE appoint_id IN (
+            SELECT keep_id FROM (
+                SELECT MIN(appoint_id) AS keep_id FROM appointments
+                WHERE COALESCE(status, 'scheduled') != 'cancelled'
+                GROUP BY doctor_id, date, time
+            ) AS keep
+        )
+    """)
+
+    inspector = inspect(conn)
+    existing = {c['name'] for c in inspector.get_unique_constraints('appointments')}
+    existing |= {ix['name'] for ix in inspector.get_indexes('appointments')}
+    if 'uq_appointments_doctor_slot' not in existing:
+        quote = conn.dialect.identifier_preparer.quote
+        columns = ', '.join(quote(c) for c in ('doctor_id', 'date', 'time', 'slot_held'))
+        conn.exec_driver_sql(f'CREATE UNIQUE INDEX uq_appointments_doctor_slot ON appointments ({columns})')
+
+
+@migration(5, 'User version stamp for cached logins')
+def _user_version(conn):
+    add_column_if_missing(conn, 'users', User.__table__.c.version)
+
+
+@migration(6, 'Modification stamps for conditional GET')
+def _updated_at(conn):
+    # Existing rows get their creation time where the table has one.
+    for model, created in ((Patient, 'reg_date'), (Appointment, None), (Bill, 'date'), (Prescription, 'date')):
+        table = model.__tablename__
+        add_column_if_missing(conn, table, model.__table__.c.updated_at)
+        stamp = f'COALESCE({created}, CURRENT_TIMESTAMP)' if created else 'CURRENT_TIMESTAMP'
+        conn.exec_driver_sql(f'UPDATE {table} SET updated_at = {stamp} WHERE updated_at IS NULL')
+
+
+@migration(7, 'Daily billing totals')
+def _bill_daily_totals(conn):
+    BillDailyTotal.__table__.create(bind=conn, checkfirst=True)
+    rebuild_revenue(connection=conn)
+
+
+@migration(8, 'Version stamps for appointment and bill status changes')
+def _status_versions(conn):
+    add_column_if_missing(conn, 'appointments', Appointment.__table__.c.version)
+    add_column_if_missing(conn, 'bills', Bill.__table__.c.version)
+
+
+@migration(9, 'Blocking keys for duplicate patient detection')
+def _patient_blocking_keys(conn):
+    for column in ('phone_key', 'name_key', 'age_band'):
+        add_column_if_missing(conn, 'patients', Patient.__table__.c[column])
+    backfill_keys(conn)
+    create_indexes_if_missing(conn, 'patients', 'ix_patients_phone_key', 'ix_patients_name_key_age_band')
+
+
+@migration(10, 'Per-patient date indexes for the patient timeline')
+def _timeline_indexes(conn):
+    create_indexes_if_missing(conn, 'appointments', 'ix_appointments_patient_id_date_time')
+    create_indexes_if_missing(conn, 'bills', 'ix_bills_patient_id_date')
+    create_indexes_if_missing(conn, 'prescriptions', 'ix_prescriptions_patient_id_date')
+
+
+@migration(11, 'Case-insensitive name indexes for prefix lookups on SQLite')
+def _nocase_name_indexes(conn):
+    create_indexes_if_missing(conn, 'patients', 'ix_patients_name_nocase')
+    create_indexes_if_missing(conn, 'doctors', 'ix_doctors_name_nocase', 'ix_doctors_specialty_nocase')
+
+
+@migration(12, 'Doctor modification stamps for conditional GET')
+def _doctor_updated_at(conn):
+    add_column_if_missing(conn, 'doctors', Doctor.__table__.c.updated_at)
+    conn.exec_driver_sql('UPDATE doctors SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL')
+
+
+def applied_versions(conn):
+    metadata.create_all(bind=conn)
+    return set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+
+def pending_versions(conn):
+    """Return the versions not yet applied, without creating anything."""
+    done = set(conn.execute(select(schema_migrations.c.version)).scalars())
+    return [version for version, _, _ in MIGRATIONS if version not in done]
+
+
+def current_version(engine=None):
+    """Return the highest applied migration version (0 if none)."""
+    engine = engine or db.engine
+    with engine.begin() as conn:
+        return max(applied_versions(conn), default=0)
+
+
+def upgrade(engine=None):
+    """Apply all pending migrations in order and return their versions."""
+    engine = engine or db.engine
+    with engine.begin() as conn:
+        done = applied_versions(conn)
+
+    applied = []
+    for version, description, fn in MIGRATIONS:
+        if version in done:
+            continue
+        with engine.begin() as conn:
+            fn(conn)
+            conn.execute(schema_migrations.insert().values(
+                version=version, description=description, applied_at=datetime.utcnow()
+            ))
+        applied.append(version)
+    return applied
+
+
+if __name__ == '__main__':
+    from app import create_app
+
+    with create_app().app_context():
+        for version in upgrade():
+            print(f"✓ Applied migration {version}")
+        print(f"Schema is at version {current_version()}")
@@ -1,8 +1,16 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, inspect
+from sqlalchemy.dialects.mysql import DATETIME
 from flask_login import UserMixin
 from datetime import datetime
 
-db = SQLAlchemy()
+from replicas import RoutingSession
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+# Modification stamps need sub-second precision to tell apart two edits made
+# within the same second; MySQL's plain DATETIME drops it.
+Timestamp = db.DateTime().with_variant(DATETIME(fsp=6), 'mysql')
 
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
@@ -12,12 +20,23 @@ class User(UserMixin, db.Model):
     password = db.Column(db.String(255), nullable=False)
     role = db.Column(db.String(20), nullable=False)  # admin, doctor, receptionist
     doctor_id = db.Column(db.Integer, db.ForeignKey('doctors.doctor_id'), nullable=True)
+    # Bumped by SQLAlchemy on every UPDATE; cached logins compare against it.
+    version = db.Column(db.Integer, nullable=False, server_default='1')
     
     doctor = db.relationship('Doctor', backref='user', uselist=False)
 
+    __mapper_args__ = {'version_id_col': version}
+
 
 class Patient(db.Model):
     __tablename__ = 'patients'
+    __table_args__ = (
+        db.Index('ix_patients_name', 'name'),
+        # SQLite only range-seeks a case-insensitive LIKE on a NOCASE index.
+        db.Index('ix_patients_name_nocase', db.text('name COLLATE NOCASE')).ddl_if(dialect='sqlite'),
+        db.Index('ix_patients_phone_key', 'phone_key'),
+        db.Index('ix_patients_name_key_age_band', 'name_key', 'age_band'),
+    )
     
     patient_id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -26,6 +45,11 @@ class Patient(db.Model):
     phone = db.Column(db.String(15), nullable=False)
     address = db.Column(db.String(200))
     reg_date = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(Timestamp, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Blocking keys for duplicate detection, kept up to date by dedupe.py.
+    phone_key = db.Column(db.String(15))
+    name_key = db.Column(db.String(20))
+    age_band = db.Column(db.Integer)
     
     appointments = db.relationship('Appointment', backref='patient', lazy=True)
     bills = db.relationship('Bill', backref='patient', lazy=True)
@@ -34,12 +58,17 @@ class Patient(db.Model):
 
 class Doctor(db.Model):
     __tablename__ = 'doctors'
+    __table_args__ = (
+        db.Index('ix_doctors_name_nocase', db.text('name COLLATE NOCASE')).ddl_if(dialect='sqlite'),
+        db.Index('ix_doctors_specialty_nocase', db.text('specialty COLLATE NOCASE')).ddl_if(dialect='sqlite'),
+    )
     
     doctor_id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     specialty = db.Column(db.String(100), nullable=False)
     phone = db.Column(db.String(15), nullable=False)
     available = db.Column(db.Boolean, default=True)
+    updated_at = db.Column(Timestamp, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     appointments = db.relationship('Appointment', backref='doctor', lazy=True)
     prescriptions = db.relationship('Prescription', backref='doctor', lazy=True)
@@ -47,6 +76,14 @@ class Doctor(db.Model):
 
 class Appointment(db.Model):
     __tablename__ = 'appointments'
+    __table_args__ = (
+        db.Index('ix_appointments_doctor_id_date', 'doctor_id', 'date'),
+        db.Index('ix_appointments_date', 'date'),
+        db.Index('ix_appointments_status', 'status'),
+        db.Index('ix_appointments_patient_id', 'patient_id'),
+        db.Index('ix_appointments_patient_id_date_time', 'patient_id', 'date', 'time'),
+        db.UniqueConstraint('doctor_id', 'date', 'time', 'slot_held', name='uq_appointments_doctor_slot'),
+    )
     
     appoint_id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(db.Integer, db.ForeignKey('patients.patient_id'), nullable=False)
@@ -54,20 +91,81 @@ class Appointment(db.Model):
     date = db.Column(db.Date, nullable=False)
     time = db.Column(db.String(10), nullable=False)
     status = db.Column(db.String(20), default='scheduled')  # scheduled, completed, cancelled
+    # True while the appointment occupies its doctor's time slot, NULL once
+    # cancelled. NULLs never collide in a unique index, so the constraint
+    # above allows any number of cancelled bookings for a slot but only one
+    # live one. Maintained from ``status`` by the events below.
+    slot_held = db.Column(db.Boolean)
+    updated_at = db.Column(Timestamp, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Bumped on every UPDATE so a status change made from a stale page is
+    # refused instead of overwriting a newer one (see transitions.py).
+    version = db.Column(db.Integer, nullable=False, server_default='1')
+
+    __mapper_args__ = {'version_id_col': version}
+
+
+@event.listens_for(Appointment.status, 'set', active_history=True)
+def _load_old_status(target, value, oldvalue, initiator):
+    # Loads the previous status of an expired appointment for the check below.
+    pass
+
+
+@event.listens_for(Appointment, 'before_insert')
+def _hold_new_slot(mapper, connection, target):
+    target.slot_held = None if target.status == 'cancelled' else True
+
+
+@event.listens_for(Appointment, 'before_update')
+def _sync_slot_held(mapper, connection, target):
+    # Only a move into or out of 'cancelled' touches the slot. Double
+    # bookings left over from before migration 4 keep a NULL slot_held, and
+    # completing one must not try to claim the slot again.
+    history = inspect(target).attrs.status.history
+    if not history.deleted:
+        return
+    was_cancelled = history.deleted[0] == 'cancelled'
+    if was_cancelled != (target.status == 'cancelled'):
+        target.slot_held = None if target.status == 'cancelled' else True
 
 
 class Bill(db.Model):
     __tablename__ = 'bills'
+    __table_args__ = (
+        db.Index('ix_bills_date', 'date'),
+        db.Index('ix_bills_status', 'status'),
+        db.Index('ix_bills_patient_id', 'patient_id'),
+        db.Index('ix_bills_patient_id_date', 'patient_id', 'date'),
+    )
     
     bill_id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(db.Integer, db.ForeignKey('patients.patient_id'), nullable=False)
     amount = db.Column(db.Float, nullable=False)
     date = db.Column(db.DateTime, default=datetime.utcnow)
     status = db.Column(db.String(20), default='pending')  # pending, paid
+    updated_at = db.Column(Timestamp, default=datetime.utcnow, onupdate=datetime.utcnow)
+    version = db.Column(db.Integer, nullable=False, server_default='1')
+
+    __mapper_args__ = {'version_id_col': version}
+
+
+class BillDailyTotal(db.Model):
+    """Number and sum of bills per billing day and status, kept by revenue.py."""
+    __tablename__ = 'bill_daily_totals'
+
+    day = db.Column(db.Date, primary_key=True)
+    status = db.Column(db.String(20), primary_key=True)
+    bill_count = db.Column(db.Integer, nullable=False, default=0)
+    amount = db.Column(db.Float, nullable=False, default=0.0)
 
 
 class Prescription(db.Model):
     __tablename__ = 'prescriptions'
+    __table_args__ = (
+        db.Index('ix_prescriptions_doctor_id_date', 'doctor_id', 'date'),
+        db.Index('ix_prescriptions_date', 'date'),
+        db.Index('ix_prescriptions_patient_id', 'patient_id'),
+        db.Index('ix_prescriptions_patient_id_date', 'patient_id', 'date'),
+    )
     
     presc_id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(db.Integer, db.ForeignKey('patients.patient_id'), nullable=False)
@@ -75,4 +173,5 @@ class Prescription(db.Model):
     medicine = db.Column(db.String(200), nullable=False)
     dosage = db.Column(db.String(100), nullable=False)
     date = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(Timestamp, default=datetime.utcnow, onupdate=datetime.utcnow)
 
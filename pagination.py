@@ -0,0 +1,163 @@
+"""Keyset (cursor) pagination for the list views.
+
+Offset pagination gets slower the deeper you page because the database still
+has to walk every skipped row. Keyset pagination instead remembers the sort
+key of the last row shown and asks for rows strictly after it, so every page
+is a short index range scan no matter how large the table grows.
+"""
+
+import base64
+import json
+
+from flask import abort, current_app, request, url_for
+from sqlalchemy import and_, or_
+
+
+class Page:
+    """One page of results plus the cursors needed to move around."""
+
+    def __init__(self, items, per_page, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.next_url = None
+        self.prev_url = None
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def encode_cursor(values):
+    """Encode a tuple of sort-key values into an opaque URL-safe token."""
+    raw = json.dumps([v.isoformat() if hasattr(v, 'isoformat') else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, order_by):
+    """Decode a cursor token back into typed values for the given ordering.
+
+    Raises ``ValueError`` if the token is malformed.
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        raw = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except Exception as e:
+        raise ValueError(f'Invalid cursor: {e}')
+
+    if not isinstance(raw, list) or len(raw) != len(order_by):
+        raise ValueError('Invalid cursor: wrong number of values')
+
+    values = []
+    for (column, _), value in zip(order_by, raw):
+        if value is None or isinstance(value, (list, dict)):
+            raise ValueError('Invalid cursor: bad value')
+        python_type = column.type.python_type
+        try:
+            if hasattr(python_type, 'fromisoformat'):
+                values.append(python_type.fromisoformat(value))
+            else:
+                values.append(python_type(value))
+        except (ValueError, TypeError) as e:
+            raise ValueError(f'Invalid cursor: {e}')
+    return values
+
+
+def _cursor_for(item, order_by):
+    return encode_cursor([getattr(item, column.key) for column, _ in order_by])
+
+
+def _seek_condition(order_by, values, backwards):
+    """Build ``(a, b) > (x, y)`` style row comparisons as portable SQL.
+
+    Expanded to ``a > x OR (a = x AND b > y)`` so MySQL and SQLite can both
+    use the composite index behind the ordering.
+    """
+    clauses = []
+    for i, (column, descending) in enumerate(order_by):
+        if descending != backwards:
+            step = column < values[i]
+        else:
+            step = column > values[i]
+        equal = [order_by[j][0] == values[j] for j in range(i)]
+        clauses.append(and_(*equal, step))
+    return or_(*clauses)
+
+
+def keyset_paginate(query, order_by, after=None, before=None, per_page=50):
+    """Return a :class:`Page` of ``query`` ordered by ``order_by``.
+
+    ``order_by`` is a sequence of ``(column, descending)`` pairs and must end
+    with a unique column (normally the primary key) so that ties are broken
+    deterministically. ``after`` and ``before`` are cursor tokens taken from
+    a previous page; at most one of them should be given.
+    """
+    backwards = before is not None and after is None
+    token = before if backwards else after
+
+    if token is not None:
+        values = decode_cursor(token, order_by)
+        if hasattr(query, 'seek'):
+            # Queries that can push the seek further in (timeline.py) do it themselves.
+            query = query.seek(values, backwards)
+        else:
+            query = query.filter(_seek_condition(order_by, values, backwards))
+
+    ordering = []
+    for column, descending in order_by:
+        ordering.append(column.asc() if descending == backwards else column.desc())
+    rows = query.order_by(*ordering).limit(per_page + 1).all()
+
+    has_more = len(rows) > per_page
+    items = rows[:per_page]
+
+    if backwards:
+        items.reverse()
+        next_cursor = _cursor_for(items[-1], order_by) if items else None
+        prev_cursor = _cursor_for(items[0], order_by) if items and has_more else None
+    else:
+        next_cursor = _cursor_for(items[-1], order_by) if items and has_more else None
+        prev_cursor = _cursor_for(items[0], order_by) if items and token is not None else None
+
+    return Page(items, per_page, next_cursor=next_cursor, prev_cursor=prev_cursor)
+
+
+def get_per_page():
+    """Page size from ``?per_page=``, falling back to ``PER_PAGE`` config."""
+    default = current_app.config.get('PER_PAGE', 50)
+    maximum = current_app.config.get('MAX_PER_PAGE', 200)
+    per_page = request.args.get('per_page', default, type=int)
+    return max(1, min(per_page, maximum))
+
+
+def paginate_request(query, order_by):
+    """Paginate ``query`` using the cursor and page size in the current request.
+
+    The returned page carries ``next_url``/``prev_url`` links that keep the
+    rest of the query string (search terms, page size) intact.
+    """
+    after = request.args.get('after') or None
+    before = request.args.get('before') or None
+    try:
+        page = keyset_paginate(query, order_by, after=after, before=before, per_page=get_per_page())
+    except ValueError:
+        abort(400)
+
+    args = {k: v for k, v in request.args.items() if k not in ('after', 'before')}
+    args.update(request.view_args or {})
+    if page.has_next:
+        page.next_url = url_for(request.endpoint, after=page.next_cursor, **args)
+    if page.has_prev:
+        page.prev_url = url_for(request.endpoint, before=page.prev_cursor, **args)
+    return page
@@ -0,0 +1,86 @@
+"""Per-request SQL statement counting and query budgets.
+
+Routes declare how many statements they are allowed to issue with the
+``@query_budget(n)`` decorator. The budget is enforced when
+``QUERY_BUDGET_ENFORCE`` is set (it defaults to on under ``TESTING``) so an
+accidental lazy load inside a template loop fails the test suite instead of
+quietly turning into one query per row in production.
+"""
+
+import functools
+import weakref
+from contextlib import contextmanager
+
+from flask import current_app, g, has_app_context
+from sqlalchemy import event
+
+from models import db
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """Raised when a view issues more SQL statements than its budget allows."""
+
+
+class QueryCounter:
+    """Counts statements executed while it is active."""
+
+    def __init__(self):
+        self.count = 0
+        self.statements = []
+
+
+_instrumented_engines = weakref.WeakSet()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if not has_app_context():
+        return
+    for counter in g.get('_query_counters', ()):
+        counter.count += 1
+        counter.statements.append(statement)
+
+
+def _instrument_engines():
+    for engine in db.engines.values():
+        if engine not in _instrumented_engines:
+            event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+            _instrumented_engines.add(engine)
+
+
+@contextmanager
+def count_queries():
+    """Count SQL statements executed inside the ``with`` block.
+
+    Must be used inside an application context.
+    """
+    _instrument_engines()
+    counter = QueryCounter()
+    counters = g.setdefault('_query_counters', [])
+    counters.append(counter)
+    try:
+        yield counter
+    finally:
+        counters.remove(counter)
+
+
+def query_budget(max_queries):
+    """Fail a view that issues more than ``max_queries`` SQL statements.
+
+    Place it below ``@login_required`` so that only the view's own work
+    (including template rendering) counts against the budget.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if not current_app.config.get('QUERY_BUDGET_ENFORCE', current_app.testing):
+                return view(*args, **kwargs)
+            with count_queries() as counter:
+                response = view(*args, **kwargs)
+            if counter.count > max_queries:
+                raise QueryBudgetExceeded(
+                    f'{view.__name__} issued {counter.count} queries '
+                    f'(budget {max_queries}):\n' + '\n'.join(counter.statements)
+                )
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,96 @@
+"""Read-replica routing.
+
+Replica databases are configured with ``REPLICA_URLS`` (comma separated)
+and registered as ``SQLALCHEMY_BINDS`` named ``replica_1``, ``replica_2``
+and so on. Views that only read are decorated with :func:`read_only`;
+their queries go to one replica picked at random for the request. Every
+other request, and any flush or ``INSERT``/``UPDATE``/``DELETE`` issued
+inside a read-only view, uses the primary.
+
+Replicas lag behind the primary, so after a user's own commit their
+requests stay on the primary for ``REPLICA_STICKY_SECONDS`` (kept in the
+session cookie). Someone who pays a bill sees it paid on the list they are
+redirected to, while everyone else's list traffic stays on the replicas.
+"""
+
+import functools
+import random
+import time
+
+from flask import current_app, g, has_request_context, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.sql.expression import UpdateBase
+
+
+REPLICA_PREFIX = 'replica_'
+STICKY_KEY = '_primary_until'
+
+
+def replica_binds(urls, options=None):
+    """Return ``SQLALCHEMY_BINDS`` entries for ``urls``; ``options(url)`` gives engine options."""
+    return {f'{REPLICA_PREFIX}{number}': {'url': url, **(options(url) if options else {})}
+            for number, url in enumerate(urls, start=1)}
+
+
+def replica_keys(engines):
+    """Return the bind keys of the configured replicas."""
+    return [key for key in engines if key and key.startswith(REPLICA_PREFIX)]
+
+
+def read_only(view):
+    """Route the view's queries to a replica unless the user just wrote."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        g.read_only = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def _sticky():
+    return session.get(STICKY_KEY, 0) > time.time()
+
+
+class RoutingSession(Session):
+    """Session that sends the reads of :func:`read_only` views to a replica."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context() and g.get('read_only'):
+            if self._flushing or isinstance(clause, UpdateBase):
+                # Anything after a write in this request must see it.
+                g.read_only = False
+            elif not _sticky():
+                engine = self._replica()
+                if engine is not None:
+                    return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _replica(self):
+        if 'replica' not in g:
+            keys = replica_keys(self._db.engines)
+            g.replica = random.choice(keys) if keys else None
+        return self._db.engines[g.replica] if g.replica else None
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _mark_flush(session, flush_context):
+    session.info['wrote'] = True
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _mark_bulk_statement(orm_execute_state):
+    if not orm_execute_state.is_select:
+        orm_execute_state.session.info['wrote'] = True
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _stick_after_commit(db_session):
+    if db_session.info.pop('wrote', False) and has_request_context():
+        window = current_app.config.get('REPLICA_STICKY_SECONDS', 5)
+        if window > 0:
+            session[STICKY_KEY] = time.time() + window
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _forget_after_rollback(db_session):
+    db_session.info.pop('wrote', None)
@@ -0,0 +1,183 @@
+"""Daily billing totals and revenue reports.
+
+``bill_daily_totals`` holds one row per billing day and status with the
+number of bills and their sum. Mapper events on :class:`Bill` apply the
+difference each insert, update or delete makes, in the same transaction as
+the change, with a single upsert per affected day and status. Revenue for
+a month or a year is then a read of a few hundred rows however many bills
+there are.
+
+Writes that bypass the ORM unit of work (bulk ``insert()``/``update()``
+statements) must call :func:`refresh_days` or :func:`rebuild` themselves.
+:func:`rebuild` also backs the ``backfill-revenue`` command.
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, event, func, inspect, insert, literal, select, update
+
+from models import db, Bill, BillDailyTotal
+
+
+PERIODS = ('day', 'month', 'year')
+
+
+def _day(value):
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _status(value):
+    return value or 'pending'
+
+
+def _upsert(connection, day, status, count, amount):
+    table = BillDailyTotal.__table__
+    values = {'day': day, 'status': status, 'bill_count': count, 'amount': amount}
+    increments = {'bill_count': table.c.bill_count + count, 'amount': table.c.amount + amount}
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+        connection.execute(sqlite_insert(table).values(values)
+                           .on_conflict_do_update(index_elements=['day', 'status'], set_=increments))
+    elif dialect == 'mysql':
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+        connection.execute(mysql_insert(table).values(values).on_duplicate_key_update(**increments))
+    else:
+        result = connection.execute(update(table).where(table.c.day == day, table.c.status == status)
+                                    .values(increments))
+        if result.rowcount == 0:
+            connection.execute(insert(table).values(values))
+
+
+def apply_deltas(connection, deltas):
+    """Add ``{(day, status): (count, amount)}`` to the totals."""
+    for (day, status), (count, amount) in deltas.items():
+        if day is not None and (count or amount):
+            _upsert(connection, day, status, count, amount)
+
+
+def status_change_deltas(bills, old_status, new_status):
+    """Return the deltas for moving ``(date, amount)`` bills from one status to another."""
+    deltas = {}
+    for bill_date, amount in bills:
+        day = _day(bill_date)
+        for status, sign in ((old_status, -1), (new_status, 1)):
+            count, total = deltas.get((day, status), (0, 0.0))
+            deltas[(day, status)] = (count + sign, total + sign * amount)
+    return deltas
+
+
+def _keep_old_value(target, value, oldvalue, initiator):
+    return value
+
+
+# Load the previous value when one of these is assigned on an expired bill,
+# so after_update can take it back out of the totals.
+for _attribute in (Bill.date, Bill.status, Bill.amount):
+    event.listen(_attribute, 'set', _keep_old_value, active_history=True, retval=True)
+
+
+def _old_value(target, attribute):
+    history = inspect(target).attrs[attribute].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(target, attribute)
+
+
+@event.listens_for(Bill, 'after_insert')
+def _bill_inserted(mapper, connection, target):
+    apply_deltas(connection, {(_day(target.date), _status(target.status)): (1, target.amount)})
+
+
+@event.listens_for(Bill, 'after_delete')
+def _bill_deleted(mapper, connection, target):
+    apply_deltas(connection, {(_day(target.date), _status(target.status)): (-1, -target.amount)})
+
+
+@event.listens_for(Bill, 'after_update')
+def _bill_updated(mapper, connection, target):
+    old = (_day(_old_value(target, 'date')), _status(_old_value(target, 'status')), _old_value(target, 'amount'))
+    new = (_day(target.date), _status(target.status), target.amount)
+    if old == new:
+        return
+    deltas = {(old[0], old[1]): (-1, -old[2])}
+    count, amount = deltas.get((new[0], new[1]), (0, 0.0))
+    deltas[(new[0], new[1])] = (count + 1, amount + new[2])
+    apply_deltas(connection, deltas)
+
+
+def _recompute(connection, condition_totals, condition_bills):
+    connection.execute(delete(BillDailyTotal).where(*condition_totals))
+    day = func.date(Bill.date)
+    status = func.coalesce(Bill.status, literal('pending'))
+    source = select(day, status, func.count(), func.sum(Bill.amount)) \
+        .where(Bill.date.isnot(None), *condition_bills).group_by(day, status)
+    return connection.execute(
+        insert(BillDailyTotal).from_select(['day', 'status', 'bill_count', 'amount'], source)
+    ).rowcount
+
+
+def rebuild(start=None, end=None, connection=None):
+    """Recompute the totals from ``bills`` for ``start``..``end`` (inclusive, default all days).
+
+    Returns the number of total rows written.
+    """
+    totals, bills = [], []
+    if start:
+        totals.append(BillDailyTotal.day >= start)
+        bills.append(Bill.date >= datetime.combine(start, datetime.min.time()))
+    if end:
+        totals.append(BillDailyTotal.day <= end)
+        bills.append(Bill.date < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+    if connection is not None:
+        return _recompute(connection, totals, bills)
+    written = _recompute(db.session.connection(), totals, bills)
+    db.session.commit()
+    return written
+
+
+def refresh_days(connection, days):
+    """Recompute the totals of the given days after a bulk change to their bills."""
+    for day in sorted(set(days)):
+        _recompute(connection, [BillDailyTotal.day == day],
+                   [Bill.date >= datetime.combine(day, datetime.min.time()),
+                    Bill.date < datetime.combine(day + timedelta(days=1), datetime.min.time())])
+
+
+def _period_key(day, period):
+    if period == 'year':
+        return str(day.year)
+    if period == 'month':
+        return f'{day.year}-{day.month:02d}'
+    return day.isoformat()
+
+
+def revenue_report(start=None, end=None, period='month'):
+    """Return billed, collected and outstanding amounts per ``period``, oldest first."""
+    if period not in PERIODS:
+        raise ValueError(f'Unknown period: {period}')
+    statement = select(BillDailyTotal.day, BillDailyTotal.status,
+                       BillDailyTotal.bill_count, BillDailyTotal.amount).order_by(BillDailyTotal.day)
+    if start:
+        statement = statement.where(BillDailyTotal.day >= start)
+    if end:
+        statement = statement.where(BillDailyTotal.day <= end)
+
+    rows = {}
+    for day, status, count, amount in db.session.execute(statement):
+        key = _period_key(day, period)
+        row = rows.setdefault(key, {'period': key, 'bills': 0, 'billed': 0.0, 'collected': 0.0,
+                                    'outstanding': 0.0, 'paid_bills': 0, 'pending_bills': 0})
+        row['bills'] += count
+        row['billed'] += amount
+        if status == 'paid':
+            row['collected'] += amount
+            row['paid_bills'] += count
+        else:
+            row['outstanding'] += amount
+            row['pending_bills'] += count
+    report = [row for row in rows.values() if row['bills']]
+    for row in report:
+        for field in ('billed', 'collected', 'outstanding'):
+            row[field] = round(row[field], 2)
+    return report
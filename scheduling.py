@@ -0,0 +1,120 @@
+"""Appointment slots: conflict checks and availability search.
+
+Every doctor's day is divided into the fixed :data:`SLOT_TIMES`. A slot is
+taken while an appointment for it has ``slot_held`` set, and the
+``uq_appointments_doctor_slot`` unique constraint makes the database the
+final arbiter, so two workers booking the same slot at the same moment
+cannot both succeed.
+
+For availability search the booked slots of the doctors and days in question
+are loaded with one range scan over ``ix_appointments_doctor_id_date`` into
+a :class:`SlotIndex`, which answers "is this slot taken?" with a binary
+search over each doctor's sorted day.
+"""
+
+from bisect import bisect_left, insort
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import exists, select
+
+from models import db, Doctor, Appointment
+
+
+SLOT_TIMES = [
+    '09:00', '09:30', '10:00', '10:30', '11:00', '11:30', '12:00',
+    '14:00', '14:30', '15:00', '15:30', '16:00', '16:30',
+]
+
+# Days of booked slots loaded per query while searching for free slots.
+SEARCH_CHUNK_DAYS = 7
+
+
+class SlotIndex:
+    """Booked slot times per ``(doctor_id, day)`` kept as sorted lists."""
+
+    def __init__(self):
+        self._taken = defaultdict(list)
+
+    def add(self, doctor_id, day, time):
+        times = self._taken[(doctor_id, day)]
+        i = bisect_left(times, time)
+        if i == len(times) or times[i] != time:
+            insort(times, time)
+
+    def is_taken(self, doctor_id, day, time):
+        times = self._taken.get((doctor_id, day), ())
+        i = bisect_left(times, time)
+        return i < len(times) and times[i] == time
+
+    @classmethod
+    def load(cls, doctor_ids, start, end):
+        """Load booked slots for ``doctor_ids`` between ``start`` and ``end`` inclusive."""
+        index = cls()
+        rows = db.session.execute(
+            select(Appointment.doctor_id, Appointment.date, Appointment.time).where(
+                Appointment.doctor_id.in_(doctor_ids),
+                Appointment.date.between(start, end),
+                Appointment.slot_held.is_(True),
+            )
+        )
+        for doctor_id, day, time in rows:
+            index.add(doctor_id, day, time)
+        return index
+
+
+def is_slot_free(doctor_id, day, time):
+    """Check a single slot with one lookup on the slot unique index."""
+    taken = db.session.execute(select(exists().where(
+        Appointment.doctor_id == doctor_id,
+        Appointment.date == day,
+        Appointment.time == time,
+        Appointment.slot_held.is_(True),
+    ))).scalar()
+    return not taken
+
+
+def next_free_slots(doctors, start=None, limit=5, horizon_days=None):
+    """Return up to ``limit`` free ``(doctor, day, time)`` slots, earliest first.
+
+    ``doctors`` is a list of :class:`Doctor` rows; slots in the past are
+    skipped. The search gives up after ``horizon_days`` (``SLOT_SEARCH_DAYS``
+    config, 60 by default).
+    """
+    if horizon_days is None:
+        horizon_days = current_app.config.get('SLOT_SEARCH_DAYS', 60)
+    now = datetime.now()
+    start = max(start or now.date(), now.date())
+    doctor_ids = [d.doctor_id for d in doctors]
+    results = []
+    if not doctor_ids:
+        return results
+
+    offset = 0
+    while offset < horizon_days and len(results) < limit:
+        chunk_start = start + timedelta(days=offset)
+        chunk_days = min(SEARCH_CHUNK_DAYS, horizon_days - offset)
+        index = SlotIndex.load(doctor_ids, chunk_start, chunk_start + timedelta(days=chunk_days - 1))
+        for day_offset in range(chunk_days):
+            day = chunk_start + timedelta(days=day_offset)
+            for time in SLOT_TIMES:
+                if day == now.date() and time <= now.strftime('%H:%M'):
+                    continue
+                for doctor in doctors:
+                    if not index.is_taken(doctor.doctor_id, day, time):
+                        results.append((doctor, day, time))
+                        if len(results) >= limit:
+                            return results
+        offset += chunk_days
+    return results
+
+
+def available_doctors(doctor_id=None, specialty=None):
+    """Doctors eligible for an availability search."""
+    query = Doctor.query.filter_by(available=True)
+    if doctor_id:
+        query = query.filter_by(doctor_id=doctor_id)
+    if specialty:
+        query = query.filter_by(specialty=specialty)
+    return query.order_by(Doctor.doctor_id).all()
@@ -0,0 +1,164 @@
+"""Indexed patient search over name and phone.
+
+``ilike('%term%')`` cannot use a B-tree index, so every search scanned the
+whole ``patients`` table. Instead the search terms go to a full-text index
+that the database keeps up to date on every insert, update and delete:
+
+* SQLite: an external-content FTS5 table (``patients_fts``) using the
+  trigram tokenizer, so any substring of three or more characters matches,
+  kept in sync by triggers on ``patients``.
+* MySQL: a ``FULLTEXT`` index on ``(name, phone)`` queried in boolean mode
+  with prefix terms.
+
+Other databases fall back to the old substring scan. Results are ranked by
+the engine's relevance score and capped at ``SEARCH_LIMIT``.
+"""
+
+import re
+
+from flask import current_app
+from sqlalchemy import event, text
+
+from models import db, Patient
+
+
+FTS_TABLE = 'patients_fts'
+FULLTEXT_INDEX = 'ft_patients_name_phone'
+
+SQLITE_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, phone, content='patients', content_rowid='patient_id', tokenize='trigram'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON patients BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, phone) VALUES (new.patient_id, new.name, new.phone);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON patients BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, phone) VALUES ('delete', old.patient_id, old.name, old.phone);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name, phone ON patients BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, phone) VALUES ('delete', old.patient_id, old.name, old.phone);
+        INSERT INTO {FTS_TABLE}(rowid, name, phone) VALUES (new.patient_id, new.name, new.phone);
+    END""",
+]
+
+# Trigrams need at least three characters to match anything.
+MIN_TRIGRAM_LENGTH = 3
+
+
+def install_search_index(conn):
+    """Create the full-text index for ``conn``'s dialect and fill it."""
+    dialect = conn.dialect.name
+    if dialect == 'sqlite':
+        for ddl in SQLITE_DDL:
+            conn.exec_driver_sql(ddl)
+        conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    elif dialect == 'mysql':
+        exists = conn.execute(
+            text('SHOW INDEX FROM patients WHERE Key_name = :name'), {'name': FULLTEXT_INDEX}
+        ).first()
+        if not exists:
+            conn.exec_driver_sql(f'ALTER TABLE patients ADD FULLTEXT INDEX {FULLTEXT_INDEX} (name, phone)')
+
+
+@event.listens_for(Patient.__table__, 'after_create')
+def _create_search_index(target, conn, **kw):
+    install_search_index(conn)
+
+
+@event.listens_for(Patient.__table__, 'before_drop')
+def _drop_search_index(target, conn, **kw):
+    if conn.dialect.name == 'sqlite':
+        conn.exec_driver_sql(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def _tokens(term):
+    return [t for t in re.split(r'[^\w]+', term) if t]
+
+
+def _search_sqlite(term, limit):
+    # Quote each whitespace-separated word so FTS5 treats punctuation such as
+    # the dash in a phone number literally; adjacent phrases are ANDed.
+    words = [w for w in term.split() if len(w) >= MIN_TRIGRAM_LENGTH]
+    if not words:
+        return _search_prefix(term, limit)
+    match = ' '.join('"{}"'.format(w.replace('"', '""')) for w in words)
+    statement = text(f"""
+        SELECT patients.* FROM {FTS_TABLE}
+        JOIN patients ON patients.patient_id = {FTS_TABLE}.rowid
+        WHERE {FTS_TABLE} MATCH :match
+        ORDER BY {FTS_TABLE}.rank
+        LIMIT :limit
+    """)
+    return Patient.query.from_statement(statement).params(match=match, limit=limit).all()
+
+
+def _search_mysql(term, limit):
+    tokens = _tokens(term)
+    if not tokens:
+        return []
+    match = ' '.join(f'+{t}*' for t in tokens)
+    statement = text("""
+        SELECT * FROM patients
+        WHERE MATCH(name, phone) AGAINST (:match IN BOOLEAN MODE)
+        ORDER BY MATCH(name, phone) AGAINST (:match IN BOOLEAN MODE) DESC
+        LIMIT :limit
+    """)
+    return Patient.query.from_statement(statement).params(match=match, limit=limit).all()
+
+
+def escape_like(term):
+    """Return ``term`` with the ``LIKE`` wildcards escaped (use with ``escape='\\'``)."""
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def starts_with(column, prefix):
+    """Return a case-insensitive prefix match on ``column`` that can seek its index.
+
+    MySQL's default collation is case-insensitive already; SQLite seeks the
+    ``*_nocase`` indexes, provided the rows are ordered by :func:`name_order`.
+    """
+    return column.like(escape_like(prefix) + '%', escape='\\')
+
+
+def name_order(column):
+    """Return the case-insensitive ordering of ``column`` that its index keeps."""
+    dialect = db.session.get_bind(mapper=column.class_.__mapper__).dialect.name
+    return column.collate('NOCASE') if dialect == 'sqlite' else column
+
+
+def _search_prefix(term, limit):
+    return Patient.query.filter(starts_with(Patient.name, term)) \
+        .order_by(name_order(Patient.name)).limit(limit).all()
+
+
+def _search_scan(term, limit):
+    return Patient.query.filter(
+        Patient.name.ilike(f'%{term}%') | Patient.phone.ilike(f'%{term}%')
+    ).order_by(Patient.name).limit(limit).all()
+
+
+def search_patients(term, limit=None):
+    """Return up to ``limit`` patients matching ``term``, best match first.
+
+    A purely numeric term is also treated as a patient ID, and an exact ID
+    match is always listed first.
+    """
+    term = term.strip()
+    if limit is None:
+        limit = current_app.config.get('SEARCH_LIMIT', 50)
+    if not term:
+        return []
+
+    dialect = db.session.get_bind(mapper=Patient.__mapper__).dialect.name
+    if dialect == 'sqlite':
+        results = _search_sqlite(term, limit)
+    elif dialect == 'mysql':
+        results = _search_mysql(term, limit)
+    else:
+        results = _search_scan(term, limit)
+
+    if term.isdigit():
+        exact = db.session.get(Patient, int(term))
+        if exact is not None:
+            results = [exact] + [p for p in results if p is not exact][:limit - 1]
+    return results
@@ -0,0 +1,208 @@
+"""Slow-query log with captured query plans.
+
+Opt in with ``SLOW_QUERY_MS``. ``init_app(app)`` then times every
+statement on the app's engines, and each one that takes at least that long
+is written as one JSON line to ``SLOW_QUERY_LOG`` (``-`` for stderr), a
+file rotated at ``SLOW_QUERY_LOG_MAX_BYTES`` with
+``SLOW_QUERY_LOG_BACKUPS`` old copies kept. A record holds:
+
+* the statement and its normalised ``shape``, with literals replaced by
+  ``?`` and ``IN`` lists collapsed, so repeats of one query group together;
+* the parameters, redacted to their types so no patient data is logged;
+* the endpoint, method and URL rule of the request that ran it, if any;
+* the database's plan for it (``EXPLAIN QUERY PLAN`` on SQLite, ``EXPLAIN``
+  on MySQL), taken on the same connection right after the statement ran.
+  Set ``SLOW_QUERY_EXPLAIN=0`` to skip it. Inserts, ``executemany``
+  batches, streamed results and statements on other databases are logged
+  without a plan.
+
+:func:`summarize` groups a log (and its rotated copies) by shape; it backs
+the ``slow-queries`` command.
+"""
+
+import json
+import logging
+import logging.handlers
+import os
+import re
+import sys
+import time
+from datetime import datetime, timezone
+
+from flask import has_request_context, request
+from sqlalchemy import event
+
+from models import db
+
+
+EXPLAIN = {'sqlite': 'EXPLAIN QUERY PLAN ', 'mysql': 'EXPLAIN '}
+EXPLAINABLE = ('select', 'with', 'update', 'delete')
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN \((?:\?, )*\?\)', re.IGNORECASE)
+_SPACE = re.compile(r'\s+')
+
+
+def shape(statement):
+    """Return ``statement`` with literals and parameter lists normalised away."""
+    statement = _STRING.sub('?', statement)
+    statement = _NUMBER.sub('?', statement)
+    statement = _SPACE.sub(' ', statement).strip()
+    return _IN_LIST.sub('IN (...)', statement)
+
+
+def _redact_value(value):
+    return None if value is None else f'<{type(value).__name__}>'
+
+
+def redact(parameters):
+    """Return ``parameters`` with every value replaced by its type name."""
+    if isinstance(parameters, dict):
+        return {key: _redact_value(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_redact_value(value) for value in parameters]
+    return _redact_value(parameters)
+
+
+def _open_handler(path, max_bytes, backups):
+    if path == '-':
+        return logging.StreamHandler(sys.stderr)
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    return logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups,
+                                                encoding='utf-8', delay=True)
+
+
+class SlowQueryLog:
+    """Times the statements of one app's engines and records the slow ones."""
+
+    def __init__(self, threshold_ms, handler, explain=True):
+        self.threshold = threshold_ms / 1000
+        self.handler = handler
+        self.handler.setFormatter(logging.Formatter('%(message)s'))
+        self.explain = explain
+
+    def instrument(self, engine):
+        event.listen(engine, 'before_cursor_execute', self._before)
+        event.listen(engine, 'after_cursor_execute', self._after)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('_slowlog_start', []).append(time.perf_counter())
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('_slowlog_start')
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        if elapsed >= self.threshold:
+            self.record(conn, statement, parameters, context, executemany, elapsed)
+
+    def record(self, conn, statement, parameters, context, executemany, elapsed):
+        entry = {
+            'at': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+            'ms': round(elapsed * 1000, 3),
+            'database': conn.dialect.name,
+            'shape': shape(statement),
+            'statement': statement,
+            'parameters': redact(parameters[0] if executemany and parameters else parameters),
+            'executemany': len(parameters) if executemany else None,
+            'endpoint': None,
+            'method': None,
+            'rule': None,
+            'plan': None,
+        }
+        if has_request_context():
+            # The URL rule rather than the path, which may carry ids.
+            rule = request.url_rule.rule if request.url_rule else None
+            entry.update(endpoint=request.endpoint, method=request.method, rule=rule)
+        if self.explain and not executemany and self._explainable(conn, statement, context):
+            entry['plan'] = self._plan(conn, statement, parameters)
+        self.handler.handle(logging.makeLogRecord({
+            'name': 'hospital.slow_queries', 'levelno': logging.WARNING, 'levelname': 'WARNING',
+            'msg': json.dumps(entry, default=str),
+        }))
+
+    def _explainable(self, conn, statement, context):
+        if conn.dialect.name not in EXPLAIN:
+            return False
+        if context is not None and (context.execution_options.get('stream_results')
+                                    or context.execution_options.get('yield_per')):
+            # A streamed result still owns the connection on MySQL.
+            return False
+        return statement.lstrip().split(None, 1)[0].lower() in EXPLAINABLE
+
+    def _plan(self, conn, statement, parameters):
+        # A raw DB-API cursor, so the EXPLAIN is neither timed nor logged.
+        cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            cursor.execute(EXPLAIN[conn.dialect.name] + statement, parameters)
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        except Exception as e:
+            return {'error': str(e)}
+        finally:
+            cursor.close()
+
+
+def get_log(app):
+    """Return the app's :class:`SlowQueryLog`, or ``None`` when it is off."""
+    return app.extensions.get('slowlog')
+
+
+def init_app(app):
+    """Log ``app``'s slow statements when ``SLOW_QUERY_MS`` is set."""
+    threshold = app.config.get('SLOW_QUERY_MS')
+    if threshold is None:
+        return None
+    handler = _open_handler(app.config.get('SLOW_QUERY_LOG', 'logs/slow_queries.jsonl'),
+                            app.config.get('SLOW_QUERY_LOG_MAX_BYTES', 10 * 1024 * 1024),
+                            app.config.get('SLOW_QUERY_LOG_BACKUPS', 5))
+    log = SlowQueryLog(threshold, handler, app.config.get('SLOW_QUERY_EXPLAIN', True))
+    with app.app_context():
+        for engine in db.engines.values():
+            log.instrument(engine)
+    app.extensions['slowlog'] = log
+    return log
+
+
+def log_files(path):
+    """Return ``path`` and its rotated copies that exist, oldest first."""
+    rotated = []
+    number = 1
+    while os.path.exists(f'{path}.{number}'):
+        rotated.append(f'{path}.{number}')
+        number += 1
+    return list(reversed(rotated)) + ([path] if os.path.exists(path) else [])
+
+
+def summarize(paths):
+    """Group the records in ``paths`` by shape, most total time first.
+
+    Each group has the shape, count, total, mean and max milliseconds, the
+    endpoints it ran under and the plan of its slowest run.
+    """
+    groups = {}
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                group = groups.setdefault(entry['shape'], {
+                    'shape': entry['shape'], 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                    'endpoints': set(), 'plan': None,
+                })
+                group['count'] += 1
+                group['total_ms'] += entry['ms']
+                if entry['ms'] >= group['max_ms']:
+                    group['max_ms'] = entry['ms']
+                    group['plan'] = entry.get('plan')
+                group['endpoints'].add(entry.get('endpoint') or '-')
+    summary = sorted(groups.values(), key=lambda group: group['total_ms'], reverse=True)
+    for group in summary:
+        group['total_ms'] = round(group['total_ms'], 3)
+        group['mean_ms'] = round(group['total_ms'] / group['count'], 3)
+        group['endpoints'] = sorted(group['endpoints'])
+    return summary
@@ -0,0 +1,44 @@
+// Typeahead inputs backed by the /api/*/lookup JSON endpoints.
+//
+// Each visible text input carries data-lookup (the endpoint URL) and
+// data-target (the id of the hidden input that is actually submitted).
+// Suggestions are shown through the input's <datalist>; picking one copies
+// its id into the hidden input.
+document.querySelectorAll('input.typeahead').forEach(function (input) {
+    var list = document.getElementById(input.getAttribute('list'));
+    var target = document.getElementById(input.dataset.target);
+    var lookup = input.dataset.lookup;
+    var options = {};
+    var timer = null;
+
+    function choose() {
+        var id = options[input.value];
+        target.value = id || '';
+        input.setCustomValidity(id ? '' : 'Please choose from the suggestions');
+    }
+
+    input.addEventListener('input', function () {
+        choose();
+        clearTimeout(timer);
+        var q = input.value.trim();
+        if (!q || options[input.value]) {
+            return;
+        }
+        timer = setTimeout(function () {
+            var url = lookup + (lookup.indexOf('?') < 0 ? '?' : '&') + 'q=' + encodeURIComponent(q);
+            fetch(url, {credentials: 'same-origin'})
+                .then(function (response) { return response.json(); })
+                .then(function (data) {
+                    options = {};
+                    list.innerHTML = '';
+                    data.results.forEach(function (item) {
+                        options[item.name] = item.id;
+                        var option = document.createElement('option');
+                        option.value = item.name;
+                        list.appendChild(option);
+                    });
+                    choose();
+                });
+        }, 200);
+    });
+});
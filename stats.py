@@ -0,0 +1,110 @@
+"""Dashboard and home page counters.
+
+All four headline numbers are fetched in one statement of scalar subqueries
+(each one an index-only count) and kept in a short-TTL cache per app. Session
+events drop the cached numbers as soon as this process commits a change that
+could move them; other worker processes pick the change up when their TTL
+runs out.
+"""
+
+import threading
+import time
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, func, select
+
+from models import db, Patient, Doctor, Appointment, Bill
+
+
+COUNTED_MODELS = (Patient, Doctor, Appointment, Bill)
+
+# Attributes whose change moves a counter when a row is updated in place.
+STATUS_ATTRIBUTES = {Appointment: 'status', Bill: 'status'}
+
+
+class CounterCache:
+    """Holds the latest counters until they expire or are invalidated."""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._values = None
+        self._expires_at = 0
+
+    def get(self, loader):
+        with self._lock:
+            if self._values is not None and time.monotonic() < self._expires_at:
+                return dict(self._values)
+        values = loader()
+        with self._lock:
+            self._values = values
+            self._expires_at = time.monotonic() + self.ttl
+        return dict(values)
+
+    def invalidate(self):
+        with self._lock:
+            self._values = None
+
+
+def _load_counts():
+    def count(model, *criteria):
+        return select(func.count()).select_from(model).where(*criteria).scalar_subquery()
+
+    row = db.session.execute(select(
+        count(Patient).label('patients'),
+        count(Doctor).label('doctors'),
+        count(Appointment, Appointment.status == 'scheduled').label('appointments'),
+        count(Bill, Bill.status == 'pending').label('bills_pending'),
+    )).one()
+    return dict(row._mapping)
+
+
+def get_cache():
+    """Return the counter cache for the current app."""
+    cache = current_app.extensions.get('stats_cache')
+    if cache is None:
+        cache = CounterCache(current_app.config.get('STATS_CACHE_TTL', 30))
+        current_app.extensions['stats_cache'] = cache
+    return cache
+
+
+def get_stats():
+    """Return patients, doctors, scheduled appointments and pending bills."""
+    return get_cache().get(_load_counts)
+
+
+def _touches_counters(session):
+    for obj in session.new | session.deleted:
+        if isinstance(obj, COUNTED_MODELS):
+            return True
+    for obj in session.dirty:
+        attribute = STATUS_ATTRIBUTES.get(type(obj))
+        if attribute and db.inspect(obj).attrs[attribute].history.has_changes():
+            return True
+    return False
+
+
+@event.listens_for(db.session, 'before_flush')
+def _mark_before_flush(session, flush_context, instances):
+    if _touches_counters(session):
+        session.info['stats_dirty'] = True
+
+
+@event.listens_for(db.session, 'do_orm_execute')
+def _mark_bulk_statement(orm_execute_state):
+    if orm_execute_state.is_select:
+        return
+    mapper = orm_execute_state.bind_arguments.get('mapper')
+    if mapper is not None and mapper.class_ in COUNTED_MODELS:
+        orm_execute_state.session.info['stats_dirty'] = True
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_after_commit(session):
+    if session.info.pop('stats_dirty', False) and has_app_context():
+        get_cache().invalidate()
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _forget_after_rollback(session):
+    session.info.pop('stats_dirty', None)
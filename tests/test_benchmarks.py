@@ -0,0 +1,63 @@
+"""Tests for the route benchmark suite."""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.routes import build_dataset, compare, percentile, run_routes, uncovered_endpoints
+
+
+def _document(p95_ms, queries, peak_kib):
+    return {'results': {'small': {'patients': {'p95_ms': p95_ms, 'queries': queries, 'peak_kib': peak_kib}}}}
+
+
+class TestPercentile:
+    """Tests for percentile()."""
+
+    def test_nearest_rank(self):
+        """Test percentiles pick the nearest ranked sample."""
+        values = list(range(1, 101))
+        assert percentile(values, 50) == 50
+        assert percentile(values, 95) == 95
+        assert percentile([7], 95) == 7
+
+
+class TestCompare:
+    """Tests for regression detection."""
+
+    def test_no_regression_within_tolerance(self):
+        """Test small latency noise is not reported."""
+        assert compare(_document(10.5, 2, 300), _document(10.0, 2, 300)) == []
+
+    def test_latency_regression(self):
+        """Test a large p95 increase is reported."""
+        regressions = compare(_document(20.0, 2, 300), _document(10.0, 2, 300))
+        assert regressions == ['small/patients: p95 10.0 -> 20.0 ms']
+
+    def test_tiny_latency_change_ignored(self):
+        """Test a large relative change below MIN_DELTA_MS is ignored."""
+        assert compare(_document(0.6, 2, 300), _document(0.3, 2, 300)) == []
+
+    def test_query_and_memory_regressions(self):
+        """Test extra queries and memory growth are reported."""
+        regressions = compare(_document(10.0, 3, 1000), _document(10.0, 2, 300))
+        assert 'small/patients: queries 2 -> 3' in regressions
+        assert 'small/patients: peak memory 300 -> 1000 KiB' in regressions
+
+    def test_new_routes_are_not_regressions(self):
+        """Test routes missing from the baseline are skipped."""
+        assert compare(_document(10.0, 2, 300), {'results': {}}) == []
+
+
+class TestRunRoutes:
+    """Smoke test of the full suite on a tiny dataset."""
+
+    def test_every_route_runs(self, tmp_path):
+        """Test every route is covered and none of them fails."""
+        app, ids = build_dataset(str(tmp_path / 'bench.db'), patients=60, doctors=3)
+        assert uncovered_endpoints(app, ids) == []
+        results = run_routes(app, ids, iterations=2, warmup=0)
+        failures = {name: r['status'] for name, r in results.items() if r['status'] >= 400}
+        assert failures == {}
+        assert results['view_patient']['queries'] >= 1
+        assert results['patients']['p95_ms'] >= results['patients']['p50_ms']
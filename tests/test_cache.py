@@ -0,0 +1,129 @@
+"""Tests for the versioned fragment and query cache."""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from flask import Flask
+from sqlalchemy import update
+
+from models import db, Doctor, Patient
+from cache import LocalCache, cached, cached_fragment, get_backend, make_backend
+
+
+@pytest.fixture
+def app():
+    """Create test application with one doctor."""
+    application = Flask(__name__)
+    application.config['TESTING'] = True
+    application.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    application.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    db.init_app(application)
+
+    with application.app_context():
+        db.create_all()
+        db.session.add(Doctor(name='Dr. Test', specialty='General', phone='555-0001'))
+        db.session.commit()
+        yield application
+        db.drop_all()
+
+
+class Loader:
+    """Counts how often a cached value is computed."""
+
+    def __init__(self, value='value'):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+class TestLocalCache:
+    """Tests for the in-process backend."""
+
+    def test_evicts_least_recently_used(self):
+        """Test the cache never holds more than max_size entries."""
+        cache = LocalCache(max_size=2)
+        cache.set('a', 1, 60)
+        cache.set('b', 2, 60)
+        cache.get('a')
+        cache.set('c', 3, 60)
+        assert cache.get('b') is None
+        assert cache.get('a') == 1
+
+    def test_entries_expire(self):
+        """Test entries past their timeout are misses."""
+        cache = LocalCache()
+        cache.set('a', 1, 0)
+        assert cache.get('a') is None
+
+    def test_versions(self):
+        """Test namespace versions start at zero and increase."""
+        cache = LocalCache()
+        assert cache.version('doctors') == 0
+        cache.bump('doctors')
+        assert cache.version('doctors') == 1
+
+    def test_make_backend(self):
+        """Test the backend is chosen from the URL."""
+        assert isinstance(make_backend(None), LocalCache)
+        with pytest.raises(ValueError):
+            make_backend('memcached://localhost')
+
+
+class TestCached:
+    """Tests for cached() and version bumps."""
+
+    def test_hit_skips_loader(self, app):
+        """Test the loader runs once per key."""
+        loader = Loader()
+        assert cached('doctors', ('x',), loader) == 'value'
+        assert cached('doctors', ('x',), loader) == 'value'
+        assert loader.calls == 1
+        cached('doctors', ('y',), loader)
+        assert loader.calls == 2
+
+    def test_fragment_is_markup(self, app):
+        """Test fragments come back as safe markup."""
+        html = cached_fragment('doctors', ('f',), lambda: '<b>Dr</b>')
+        assert html.__html__() == '<b>Dr</b>'
+
+    @pytest.mark.parametrize('change', ['insert', 'update', 'delete', 'bulk'])
+    def test_doctor_changes_bump_version(self, app, change):
+        """Test every kind of doctor change invalidates the namespace."""
+        before = get_backend().version('doctors')
+        loader = Loader()
+        cached('doctors', ('x',), loader)
+        doctor = Doctor.query.first()
+        if change == 'insert':
+            db.session.add(Doctor(name='Dr. New', specialty='General', phone='555-0002'))
+        elif change == 'update':
+            doctor.name = 'Dr. Renamed'
+        elif change == 'delete':
+            db.session.delete(doctor)
+        else:
+            db.session.execute(update(Doctor).values(available=False))
+        db.session.commit()
+        assert get_backend().version('doctors') == before + 1
+        cached('doctors', ('x',), loader)
+        assert loader.calls == 2
+
+    def test_rollback_keeps_version(self, app):
+        """Test a rolled back change does not invalidate anything."""
+        before = get_backend().version('doctors')
+        Doctor.query.first().name = 'Dr. Never'
+        db.session.flush()
+        db.session.rollback()
+        db.session.commit()
+        assert get_backend().version('doctors') == before
+
+    def test_other_models_keep_version(self, app):
+        """Test changes to unrelated models leave the namespace alone."""
+        before = get_backend().version('doctors')
+        db.session.add(Patient(name='P', age=1, gender='Male', phone='1'))
+        db.session.commit()
+        assert get_backend().version('doctors') == before
@@ -0,0 +1,109 @@
+"""Tests for the synthetic data generator."""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from flask import Flask
+from datetime import date
+from sqlalchemy import func, select
+
+from models import db, Patient, Doctor, Appointment, Bill, Prescription
+from datagen import generate
+
+
+END = date(2026, 6, 30)
+
+
+@pytest.fixture
+def app():
+    """Create test application."""
+    application = Flask(__name__)
+    application.config['TESTING'] = True
+    application.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    application.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    db.init_app(application)
+
+    with application.app_context():
+        db.create_all()
+        yield application
+        db.drop_all()
+
+
+def _rows(*columns):
+    return db.session.execute(select(*columns).order_by(*columns)).all()
+
+
+class TestGenerate:
+    """Tests for generate()."""
+
+    def test_counts(self, app):
+        """Test the requested volumes are written and reported."""
+        counts = generate(patients=300, doctors=10, appointments=600, years=1, seed=1, end_date=END, batch_size=50)
+        assert counts['patients'] == Patient.query.count() == 300
+        assert counts['doctors'] == Doctor.query.count() == 10
+        assert counts['appointments'] == Appointment.query.count()
+        assert 550 <= counts['appointments'] <= 600
+        assert counts['bills'] == Bill.query.count() > 0
+        assert counts['prescriptions'] == Prescription.query.count() > 0
+
+    def test_reproducible(self, app):
+        """Test the same seed produces the same data."""
+        generate(patients=50, doctors=5, appointments=100, seed=7, end_date=END)
+        first = (_rows(Patient.name, Patient.phone),
+                 _rows(Appointment.doctor_id, Appointment.date, Appointment.time, Appointment.status))
+        db.drop_all()
+        db.create_all()
+        generate(patients=50, doctors=5, appointments=100, seed=7, end_date=END)
+        second = (_rows(Patient.name, Patient.phone),
+                  _rows(Appointment.doctor_id, Appointment.date, Appointment.time, Appointment.status))
+        assert first == second
+
+    def test_realistic_distributions(self, app):
+        """Test doctor load is skewed and past visits are mostly completed."""
+        generate(patients=500, doctors=20, appointments=3000, years=1, seed=3, end_date=END)
+        loads = sorted(db.session.execute(
+            select(func.count()).select_from(Appointment).group_by(Appointment.doctor_id)
+        ).scalars(), reverse=True)
+        assert loads[0] > 3 * loads[len(loads) // 2]
+
+        past = Appointment.query.filter(Appointment.date < END)
+        completed = past.filter_by(status='completed').count()
+        assert completed / past.count() > 0.75
+        assert Appointment.query.filter(Appointment.date > END, Appointment.status == 'completed').count() == 0
+        assert Bill.query.filter_by(status='paid').count() > Bill.query.filter_by(status='pending').count()
+
+    def test_slots_are_consistent(self, app):
+        """Test no slot is booked twice and slot_held follows the status."""
+        generate(patients=100, doctors=3, appointments=2000, years=0.5, seed=5, end_date=END)
+        duplicates = db.session.execute(
+            select(Appointment.doctor_id, Appointment.date, Appointment.time)
+            .group_by(Appointment.doctor_id, Appointment.date, Appointment.time)
+            .having(func.count() > 1)
+        ).all()
+        assert duplicates == []
+        assert Appointment.query.filter_by(status='cancelled').filter(Appointment.slot_held.isnot(None)).count() == 0
+        assert Appointment.query.filter(Appointment.status != 'cancelled', Appointment.slot_held.is_(None)).count() == 0
+
+    def test_appends_to_existing_data(self, app):
+        """Test generated ids continue after existing rows."""
+        db.session.add(Doctor(name='Dr. Existing', specialty='General', phone='555-0001'))
+        db.session.commit()
+        generate(patients=10, doctors=2, appointments=0, seed=1, end_date=END)
+        assert Doctor.query.count() == 3
+        assert Appointment.query.count() == 0
+
+    def test_reuses_doctors_with_existing_appointments(self, app):
+        """Test a second run against existing doctors never reuses a held slot."""
+        generate(patients=50, doctors=2, appointments=400, years=0.1, seed=1, end_date=END, batch_size=50)
+        before = Appointment.query.count()
+        generate(patients=0, doctors=0, appointments=400, years=0.1, seed=2, end_date=END, batch_size=50)
+        assert Appointment.query.count() > before
+        duplicates = db.session.execute(
+            select(Appointment.doctor_id, Appointment.date, Appointment.time)
+            .where(Appointment.slot_held.is_(True))
+            .group_by(Appointment.doctor_id, Appointment.date, Appointment.time).having(func.count() > 1)
+        ).all()
+        assert duplicates == []
@@ -0,0 +1,175 @@
+"""Tests for duplicate patient detection."""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from flask import Flask
+
+from models import db, Patient
+from querybudget import count_queries
+from dedupe import (BlockingIndex, backfill_keys, blocking_keys, existing_index, find_clusters,
+                    find_duplicates, name_key, phone_key, soundex)
+
+
+@pytest.fixture
+def app():
+    """Create test application."""
+    application = Flask(__name__)
+    application.config['TESTING'] = True
+    application.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    application.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    db.init_app(application)
+
+    with application.app_context():
+        db.create_all()
+
+    yield application
+
+    with application.app_context():
+        db.drop_all()
+
+
+def add_patients(*rows):
+    patients = [Patient(name=name, age=age, gender='Female', phone=phone) for name, age, phone in rows]
+    db.session.add_all(patients)
+    db.session.commit()
+    return [p.patient_id for p in patients]
+
+
+class TestBlockingKeys:
+    """Tests for the key functions."""
+
+    def test_soundex(self):
+        """Test the standard Soundex examples."""
+        assert soundex('Robert') == soundex('Rupert') == 'R163'
+        assert soundex('Ashcraft') == 'A261'
+        assert soundex('Tymczak') == 'T522'
+        assert soundex('Lee') == 'L000'
+
+    def test_name_key_ignores_order_spelling_and_middle_names(self):
+        """Test variants of one name share a key."""
+        assert name_key('Jon Smyth') == name_key('Smith, John') == name_key('John Q. Smith')
+        assert name_key('José Núñez') == name_key('Jose Nunez')
+        assert name_key('Jon Smyth') != name_key('Mary Smith')
+        assert name_key('123') is None
+
+    def test_phone_key_normalises_formatting(self):
+        """Test formatting and a country code do not change the key."""
+        assert phone_key('555-100-1001') == phone_key('(555) 100 1001') == phone_key('+1 555 100 1001')
+        assert phone_key('555-1001') == '5551001'
+        assert phone_key('12-34') is None
+
+    def test_keys_are_kept_on_insert_and_update(self, app):
+        """Test the mapper events maintain the stored keys."""
+        with app.app_context():
+            patient_id, = add_patients(('Alice Williams', 35, '555-1001'))
+            patient = db.session.get(Patient, patient_id)
+            assert (patient.phone_key, patient.name_key, patient.age_band) == ('5551001', 'A420 W452', 7)
+
+            patient.age = 41
+            patient.phone = '555-2002'
+            db.session.commit()
+            assert (patient.phone_key, patient.age_band) == ('5552002', 8)
+
+
+class TestFindDuplicates:
+    """Tests for find_duplicates()."""
+
+    def test_matches_on_phone_or_name_and_age(self, app):
+        """Test phone matches and name matches in neighbouring age bands are found."""
+        with app.app_context():
+            same_phone, near_age, far_age, other = add_patients(
+                ('Someone Else', 70, '555-1001'),
+                ('Alicia Wiliams', 39, '555-9999'),
+                ('Alice Williams', 60, '555-8888'),
+                ('Bob Martinez', 35, '555-7777'),
+            )
+            matches = find_duplicates('Alice Williams', '(555) 1001', 35)
+            assert [p.patient_id for p in matches] == [same_phone, near_age]
+
+    def test_strongest_match_first(self, app):
+        """Test a patient matching on phone and name comes before single matches."""
+        with app.app_context():
+            name_only, both = add_patients(('Alice Williams', 35, '555-9999'), ('Alice Williams', 36, '555-1001'))
+            assert [p.patient_id for p in find_duplicates('Alice Williams', '555-1001', 35)] == [both, name_only]
+
+    def test_exclude_and_no_keys(self, app):
+        """Test the excluded patient is left out and keyless details match nothing."""
+        with app.app_context():
+            patient_id, = add_patients(('Alice Williams', 35, '555-1001'))
+            assert find_duplicates('Alice Williams', '555-1001', 35, exclude=patient_id) == []
+            with count_queries() as counter:
+                assert find_duplicates('', '12', 35) == []
+            assert counter.count == 0
+
+    def test_lookup_uses_the_indexes(self, app):
+        """Test both branches of the lookup are index searches."""
+        with app.app_context():
+            plan = db.session.execute(db.text(
+                "EXPLAIN QUERY PLAN SELECT patient_id FROM patients "
+                "WHERE phone_key = '5551001' OR (name_key = 'A420 W452' AND age_band IN (6, 7, 8))"
+            )).all()
+            details = ' '.join(row[-1] for row in plan)
+            assert 'ix_patients_phone_key' in details
+            assert 'ix_patients_name_key_age_band' in details
+            assert 'SCAN patients' not in details
+
+
+class TestBlockingIndex:
+    """Tests for batch checks."""
+
+    def test_existing_index_is_one_query(self, app):
+        """Test checking many rows costs a single query."""
+        with app.app_context():
+            patient_id, = add_patients(('Alice Williams', 35, '555-1001'))
+            rows = [blocking_keys('Alice Williams', '555-0000', 36), blocking_keys('Bob', '555-1001', 10),
+                    blocking_keys('Carol', '555-3333', 50)]
+            with count_queries() as counter:
+                index = existing_index(rows)
+            assert counter.count == 1
+            assert [index.matches(keys) for keys in rows] == [[patient_id], [patient_id], []]
+
+    def test_existing_index_skips_distant_ages(self, app):
+        """Test a common name is only loaded in the neighbouring age bands."""
+        with app.app_context():
+            near, _ = add_patients(('Alice Williams', 40, '555-1001'), ('Alice Williams', 80, '555-2002'))
+            index = existing_index([blocking_keys('Alice Williams', '555-0000', 36)])
+            assert [item for items in index.by_name.values() for item in items] == [near]
+
+    def test_matches_are_unique(self):
+        """Test an item matching on both keys is returned once."""
+        index = BlockingIndex()
+        keys = blocking_keys('Alice Williams', '555-1001', 35)
+        index.add('a', keys)
+        assert index.matches(keys) == ['a']
+
+
+class TestClusters:
+    """Tests for find_clusters() and the key backfill."""
+
+    def test_clusters_are_transitive(self, app):
+        """Test patients linked through a shared phone and a shared name form one cluster."""
+        with app.app_context():
+            a, b, c, d, e = add_patients(
+                ('Alice Williams', 35, '555-1001'),
+                ('A. Williams', 36, '555-1001'),
+                ('Alicia Wiliams', 37, '555-2002'),
+                ('Bob Martinez', 45, '555-3003'),
+                ('Bobby Martinez', 47, '555-4004'),
+            )
+            add_patients(('Carol Lee', 50, '555-5005'), ('Alice Williams', 80, '555-6006'))
+            assert find_clusters(batch_size=2) == [[a, b, c], [d, e]]
+
+    def test_backfill_keys(self, app):
+        """Test rows written without keys get them."""
+        with app.app_context():
+            db.session.execute(db.insert(Patient), [
+                {'name': 'Alice Williams', 'age': 35, 'gender': 'Female', 'phone': '555-1001'},
+                {'name': 'Bob Martinez', 'age': 45, 'gender': 'Male', 'phone': '555-1002'},
+            ])
+            assert backfill_keys(db.session.connection(), batch_size=1) == 2
+            db.session.commit()
+            assert [p.phone_key for p in Patient.query.order_by(Patient.patient_id)] == ['5551001', '5551002']
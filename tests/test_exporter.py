@@ -0,0 +1,99 @@
+"""Tests for streaming exports."""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import csv
+import io
+import json
+import pytest
+from flask import Flask
+from datetime import date, datetime
+
+from models import db, Patient, Doctor, Appointment, Bill, Prescription
+from exporter import build_export_query, iter_export
+
+
+@pytest.fixture
+def app():
+    """Create test application with bills, appointments and prescriptions."""
+    application = Flask(__name__)
+    application.config['TESTING'] = True
+    application.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    application.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    db.init_app(application)
+
+    with application.app_context():
+        db.create_all()
+        db.session.add_all([
+            Doctor(name='Dr. Test', specialty='General', phone='555-0001'),
+            Patient(name='Test Patient', age=30, gender='Male', phone='555-1234'),
+        ])
+        db.session.commit()
+        db.session.add_all([
+            Bill(patient_id=1, amount=10.0, status='paid', date=datetime(2025, 1, 1, 9, 30)),
+            Bill(patient_id=1, amount=20.0, status='pending', date=datetime(2025, 1, 31, 23, 59)),
+            Bill(patient_id=1, amount=30.0, status='pending', date=datetime(2025, 2, 1, 0, 0)),
+            Appointment(patient_id=1, doctor_id=1, date=date(2025, 1, 5), time='09:00', status='completed'),
+            Prescription(patient_id=1, doctor_id=1, medicine='Ibuprofen', dosage='Daily',
+                         date=datetime(2025, 1, 5, 10, 0)),
+        ])
+        db.session.commit()
+
+    yield application
+
+    with application.app_context():
+        db.drop_all()
+
+
+def export_csv(kind, **filters):
+    text = ''.join(iter_export(build_export_query(kind, **filters), 'csv'))
+    return list(csv.DictReader(io.StringIO(text)))
+
+
+class TestExport:
+    """Tests for export queries and encoders."""
+
+    def test_csv_bills(self, app):
+        """Test bills export with patient names and ISO dates."""
+        with app.app_context():
+            rows = export_csv('bills')
+            assert [r['amount'] for r in rows] == ['10.0', '20.0', '30.0']
+            assert rows[0]['patient_name'] == 'Test Patient'
+            assert rows[0]['date'] == '2025-01-01T09:30:00'
+
+    def test_date_range_is_inclusive(self, app):
+        """Test the end date includes the whole day."""
+        with app.app_context():
+            rows = export_csv('bills', start=date(2025, 1, 1), end=date(2025, 1, 31))
+            assert [r['bill_id'] for r in rows] == ['1', '2']
+
+    def test_status_filter(self, app):
+        """Test filtering by status."""
+        with app.app_context():
+            rows = export_csv('bills', status='pending')
+            assert [r['bill_id'] for r in rows] == ['2', '3']
+
+    def test_status_filter_rejected_for_prescriptions(self, app):
+        """Test prescriptions cannot be filtered by status."""
+        with app.app_context():
+            with pytest.raises(ValueError):
+                build_export_query('prescriptions', status='paid')
+
+    def test_jsonl_appointments(self, app):
+        """Test JSON Lines output of appointments."""
+        with app.app_context():
+            text = ''.join(iter_export(build_export_query('appointments'), 'jsonl'))
+            row = json.loads(text.splitlines()[0])
+            assert row['doctor_name'] == 'Dr. Test'
+            assert row['date'] == '2025-01-05'
+
+    def test_chunked_output(self, app, monkeypatch):
+        """Test rows are emitted in several chunks rather than one blob."""
+        import exporter
+        monkeypatch.setattr(exporter, 'CHUNK_ROWS', 1)
+        with app.app_context():
+            chunks = list(iter_export(build_export_query('bills'), 'csv'))
+            assert len(chunks) == 4
@@ -0,0 +1,163 @@
+"""Tests for the streaming patient importer."""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import io
+import json
+import pytest
+from flask import Flask
+
+from models import db, Patient
+from querybudget import count_queries
+from importer import import_patients, detect_format, validate_row
+
+
+@pytest.fixture
+def app():
+    """Create test application."""
+    application = Flask(__name__)
+    application.config['TESTING'] = True
+    application.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    application.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    db.init_app(application)
+
+    with application.app_context():
+        db.create_all()
+
+    yield application
+
+    with application.app_context():
+        db.drop_all()
+
+
+def csv_stream(rows):
+    lines = ['name,age,gender,phone,address'] + rows
+    return io.StringIO('\n'.join(lines) + '\n')
+
+
+class TestValidateRow:
+    """Tests for validate_row()."""
+
+    def test_valid_row(self):
+        """Test a good row is converted to column values."""
+        values = validate_row({'name': ' Alice ', 'age': '35', 'gender': 'Female', 'phone': '555-1001', 'address': ''})
+        assert values == {'name': 'Alice', 'age': 35, 'gender': 'Female', 'phone': '555-1001', 'address': None}
+
+    @pytest.mark.parametrize('row, message', [
+        ({'age': '35', 'gender': 'Female', 'phone': '555'}, 'name is required'),
+        ({'name': 'A', 'age': 'old', 'gender': 'Female', 'phone': '555'}, 'age must be a whole number'),
+        ({'name': 'A', 'age': '-1', 'gender': 'Female', 'phone': '555'}, 'age must not be negative'),
+        ({'name': 'A', 'age': '3', 'gender': 'Female', 'phone': '5' * 16}, 'phone is longer than 15'),
+        ({'name': 'A', 'age': True, 'gender': 'Female', 'phone': '555'}, 'age must be a whole number'),
+        ({'name': 'A', 'age': 33.9, 'gender': 'Female', 'phone': '555'}, 'age must be a whole number'),
+        ({'name': 'A\ufffd', 'age': '3', 'gender': 'Female', 'phone': '555'}, 'name is not valid UTF-8'),
+    ])
+    def test_invalid_rows(self, row, message):
+        """Test model constraints are enforced."""
+        with pytest.raises(ValueError, match=message):
+            validate_row(row)
+
+
+class TestImportPatients:
+    """Tests for import_patients()."""
+
+    def test_csv_import_reports_bad_rows(self, app):
+        """Test good rows are inserted and bad rows reported by line."""
+        stream = csv_stream([
+            'Alice,35,Female,555-1001,1 Main St',
+            'Bob,abc,Male,555-1002,',
+            'Carol,40,Female,555-1003,',
+        ])
+        with app.app_context():
+            report = import_patients(stream, 'csv')
+            assert report.inserted == 2
+            assert report.errors == [(3, 'age must be a whole number')]
+            assert sorted(p.name for p in Patient.query) == ['Alice', 'Carol']
+            assert Patient.query.filter_by(name='Alice').first().reg_date is not None
+
+    def test_jsonl_import(self, app):
+        """Test JSON Lines input, including an unparsable line."""
+        lines = [
+            json.dumps({'name': 'Alice', 'age': 35, 'gender': 'Female', 'phone': '555-1001'}),
+            '{not json',
+            '',
+            json.dumps({'name': 'Bob', 'age': 45, 'gender': 'Male', 'phone': '555-1002'}),
+        ]
+        with app.app_context():
+            report = import_patients(io.StringIO('\n'.join(lines)), 'jsonl')
+            assert report.inserted == 2
+            assert report.errors[0][0] == 2
+
+    def test_undecodable_and_nul_rows_are_reported(self, app):
+        """Test bytes that are not UTF-8 and NUL bytes reject their own line only."""
+        data = (b'name,age,gender,phone,address\nAlice,35,Female,555-1001,\n'
+                b'Ren\xe9,40,Male,555-1002,\nBo\x00b,41,Male,555-1003,\nCarol,40,Female,555-1004,\n')
+        stream = io.TextIOWrapper(io.BytesIO(data), encoding='utf-8', errors='replace', newline='')
+        with app.app_context():
+            report = import_patients(stream, 'csv')
+            assert sorted(p.name for p in Patient.query) == ['Alice', 'Carol']
+            assert report.errors == [(3, 'name is not valid UTF-8'), (4, 'name contains a NUL byte')]
+
+    def test_unparsable_csv_line_is_reported(self, app):
+        """Test a line the csv module rejects is reported and the run goes on."""
+        stream = csv_stream(['Alice,35,Female,555-1001,', 'B' * 200000 + ',40,Male,555-1002,',
+                             'Carol,40,Female,555-1004,'])
+        with app.app_context():
+            report = import_patients(stream, 'csv')
+            assert report.inserted == 2
+            assert report.errors[0][0] == 3
+            assert report.errors[0][1].startswith('invalid CSV')
+
+    def test_strict_stream_keeps_rows_read_so_far(self, app):
+        """Test a decode error on a strict stream stops the run without losing the pending batch."""
+        # More than one read's worth of good rows comes before the bad byte.
+        rows = ''.join(f'Patient {i},30,Male,555-{i:04},\n' for i in range(500)).encode()
+        data = b'name,age,gender,phone,address\n' + rows + b'Ren\xe9,40,Male,555-1002,\n'
+        stream = io.TextIOWrapper(io.BytesIO(data), encoding='utf-8', newline='')
+        with app.app_context():
+            report = import_patients(stream, 'csv')
+            assert report.inserted == Patient.query.count() > 0
+            assert report.error_count == 1
+            assert 'not valid UTF-8' in report.errors[0][1]
+
+    def test_one_round_trip_per_batch(self, app):
+        """Test rows are inserted with one statement per batch."""
+        stream = csv_stream([f'Patient {i},30,Male,555-0000,' for i in range(25)])
+        with app.app_context():
+            with count_queries() as counter:
+                report = import_patients(stream, 'csv', batch_size=10)
+            inserts = [s for s in counter.statements if s.startswith('INSERT INTO patients')]
+            assert report.inserted == 25
+            assert len(inserts) == 3
+
+    def test_duplicates_are_reported(self, app):
+        """Test rows like an existing patient or an earlier row are reported with keys stored."""
+        with app.app_context():
+            db.session.add(Patient(name='Alice Williams', age=35, gender='Female', phone='555-1001'))
+            db.session.commit()
+            stream = csv_stream([
+                'Alicia Wiliams,36,Female,555-9999,',
+                'Bob Martinez,45,Male,555-2002,',
+                'Robert Martinez,45,Male,(555) 2002,',
+            ])
+            report = import_patients(stream, 'csv')
+            assert report.inserted == 3
+            assert report.duplicates == [(2, 'Alicia Wiliams', 'patient #1'),
+                                         (4, 'Robert Martinez', 'line 3')]
+            assert Patient.query.filter_by(name='Bob Martinez').one().phone_key == '5552002'
+
+    def test_skip_duplicates(self, app):
+        """Test likely duplicates are left out when asked."""
+        with app.app_context():
+            stream = csv_stream(['Alice Williams,35,Female,555-1001,', 'Alice Williams,35,Female,555-1001,'])
+            report = import_patients(stream, 'csv', skip_duplicates=True)
+            assert (report.inserted, report.skipped, report.duplicate_count) == (1, 1, 1)
+            assert Patient.query.count() == 1
+
+    def test_detect_format(self):
+        """Test the format is taken from the file extension."""
+        assert detect_format('patients.CSV') == 'csv'
+        assert detect_format('patients.jsonl') == 'jsonl'
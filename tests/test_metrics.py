@@ -0,0 +1,90 @@
+"""Tests for request and SQL metrics."""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import logging
+import pytest
+from flask import Flask
+
+import metrics
+from models import db, Patient
+
+
+@pytest.fixture
+def app():
+    """Create test application with metrics installed."""
+    application = Flask(__name__)
+    application.config['TESTING'] = True
+    application.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    application.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    db.init_app(application)
+    metrics.init_app(application)
+
+    @application.route('/patients-count')
+    def patients_count():
+        Patient.query.count()
+        Patient.query.first()
+        return 'ok'
+
+    with application.app_context():
+        db.create_all()
+
+    yield application
+
+    with application.app_context():
+        db.drop_all()
+
+
+class TestMetrics:
+    """Tests for the metrics hooks and endpoint."""
+
+    def test_records_latency_and_sql(self, app):
+        """Test a request shows up in the histogram and SQL counters."""
+        client = app.test_client()
+        client.get('/patients-count')
+        client.get('/patients-count')
+
+        text = client.get('/metrics').get_data(as_text=True)
+        assert 'hms_http_request_duration_seconds_count{endpoint="patients_count",method="GET"} 2' in text
+        assert 'hms_http_request_duration_seconds_bucket{endpoint="patients_count",method="GET",le="+Inf"} 2' in text
+        assert 'hms_http_requests_total{endpoint="patients_count",method="GET",status="200"} 2' in text
+        assert 'hms_sql_statements_total{endpoint="patients_count"} 4' in text
+        assert 'hms_sql_duration_seconds_total{endpoint="patients_count"}' in text
+
+    def test_unmatched_requests(self, app):
+        """Test 404s are grouped under one label."""
+        client = app.test_client()
+        client.get('/no-such-page')
+        text = client.get('/metrics').get_data(as_text=True)
+        assert 'hms_http_requests_total{endpoint="unmatched",method="GET",status="404"} 1' in text
+
+    def test_token_required_when_configured(self, app):
+        """Test the endpoint is protected by METRICS_TOKEN when set."""
+        app.config['METRICS_TOKEN'] = 'secret'
+        client = app.test_client()
+        assert client.get('/metrics').status_code == 401
+        assert client.get('/metrics', headers={'Authorization': 'Bearer secret'}).status_code == 200
+
+    def test_slow_request_log(self, app, caplog):
+        """Test slow requests are logged with their statements."""
+        app.config['SLOW_REQUEST_MS'] = 0
+        with caplog.at_level(logging.WARNING, logger='hospital.slow_requests'):
+            app.test_client().get('/patients-count')
+        assert 'Slow request GET /patients-count' in caplog.text
+        assert 'FROM patients' in caplog.text
+
+
+class TestHistogram:
+    """Tests for the Histogram helper."""
+
+    def test_cumulative_buckets(self):
+        """Test observations land in every bucket at or above them."""
+        hist = metrics.Histogram(buckets=(0.1, 1.0))
+        hist.observe(0.05)
+        hist.observe(0.5)
+        hist.observe(5)
+        assert hist.counts == [1, 2]
+        assert hist.count == 3
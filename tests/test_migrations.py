@@ -0,0 +1,196 @@
+"""Tests for the schema migration runner."""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from flask import Flask
+from sqlalchemy import inspect
+
+from models import db, Patient
+from migrations import upgrade, current_version, MIGRATIONS
+
+
+@pytest.fixture
+def app():
+    """Create test application with an empty database."""
+    application = Flask(__name__)
+    application.config['TESTING'] = True
+    application.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    application.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    db.init_app(application)
+
+    yield application
+
+    with application.app_context():
+        db.drop_all()
+
+
+def index_names(table):
+    return {ix['name'] for ix in inspect(db.engine).get_indexes(table)}
+
+
+class TestUpgrade:
+    """Tests for upgrade()."""
+
+    def test_fresh_database(self, app):
+        """Test upgrading an empty database creates tables and indexes."""
+        with app.app_context():
+            applied = upgrade()
+            assert applied == [m[0] for m in MIGRATIONS]
+            assert current_version() == MIGRATIONS[-1][0]
+            assert 'ix_appointments_doctor_id_date' in index_names('appointments')
+            assert 'ix_bills_status' in index_names('bills')
+            assert 'ix_prescriptions_patient_id' in index_names('prescriptions')
+            assert 'ix_appointments_patient_id_date_time' in index_names('appointments')
+            assert 'ix_bills_patient_id_date' in index_names('bills')
+            assert 'ix_prescriptions_patient_id_date' in index_names('prescriptions')
+            assert 'ix_patients_name_nocase' in index_names('patients')
+            assert {'ix_doctors_name_nocase', 'ix_doctors_specialty_nocase'} <= index_names('doctors')
+
+    def test_upgrade_is_idempotent(self, app):
+        """Test a second upgrade applies nothing."""
+        with app.app_context():
+            upgrade()
+            assert upgrade() == []
+
+    def test_existing_database_gets_indexes(self, app):
+        """Test a database created before indexes existed is brought up to date."""
+        with app.app_context():
+            db.create_all()
+            for table in ('appointments', 'bills', 'prescriptions'):
+                for name in index_names(table):
+                    db.session.execute(db.text(f'DROP INDEX {name}'))
+            db.session.add(Patient(name='Existing', age=40, gender='Male', phone='555-0000'))
+            db.session.commit()
+
+            upgrade()
+
+            assert 'ix_appointments_status' in index_names('appointments')
+            assert 'ix_bills_date' in index_names('bills')
+            assert Patient.query.count() == 1
+
+    def test_existing_database_gets_search_index(self, app):
+        """Test existing patients become searchable after upgrading."""
+        from search import search_patients, FTS_TABLE
+
+        with app.app_context():
+            db.create_all()
+            db.session.execute(db.text(f'DROP TABLE {FTS_TABLE}'))
+            for trigger in ('ai', 'ad', 'au'):
+                db.session.execute(db.text(f'DROP TRIGGER {FTS_TABLE}_{trigger}'))
+            db.session.add(Patient(name='Existing Patient', age=40, gender='Male', phone='555-0000'))
+            db.session.commit()
+
+            upgrade()
+
+            assert [p.name for p in search_patients('existing')] == ['Existing Patient']
+
+    def test_existing_double_bookings_survive_upgrade(self, app):
+        """Test pre-existing double bookings keep only the earliest slot holder."""
+        from datetime import date
+        from models import Doctor, Appointment
+
+        with app.app_context():
+            db.create_all()
+            db.session.execute(db.text('DROP TABLE appointments'))
+            db.session.execute(db.text(
+                'CREATE TABLE appointments (appoint_id INTEGER PRIMARY KEY, patient_id INTEGER NOT NULL, '
+                'doctor_id INTEGER NOT NULL, date DATE NOT NULL, time VARCHAR(10) NOT NULL, status VARCHAR(20))'
+            ))
+            db.session.add(Doctor(name='Dr. Test', specialty='General', phone='555-0001'))
+            db.session.add(Patient(name='Existing', age=40, gender='Male', phone='555-0000'))
+            for status in ('scheduled', 'scheduled', 'cancelled'):
+                db.session.execute(db.text(
+                    "INSERT INTO appointments (patient_id, doctor_id, date, time, status) "
+                    "VALUES (1, 1, '2025-01-01', '09:00', :status)"
+                ), {'status': status})
+            db.session.commit()
+
+            upgrade()
+
+            held = [a.appoint_id for a in Appointment.query.filter(Appointment.slot_held.is_(True))]
+            assert held == [1]
+
+    def test_existing_rows_get_modification_stamps(self, app):
+        """Test rows predating updated_at are stamped with their creation time."""
+        from datetime import datetime
+        from models import Bill
+
+        with app.app_context():
+            db.create_all()
+            db.session.execute(db.text('DROP TABLE bills'))
+            db.session.execute(db.text(
+                'CREATE TABLE bills (bill_id INTEGER PRIMARY KEY, patient_id INTEGER NOT NULL, '
+                'amount FLOAT NOT NULL, date DATETIME, status VARCHAR(20))'
+            ))
+            db.session.add(Patient(name='Existing', age=40, gender='Male', phone='555-0000'))
+            db.session.execute(db.text(
+                "INSERT INTO bills (patient_id, amount, date, status) VALUES (1, 10.0, '2025-01-01 10:00:00', 'paid')"
+            ))
+            db.session.commit()
+
+            upgrade()
+
+            assert Bill.query.one().updated_at == datetime(2025, 1, 1, 10, 0)
+            assert Patient.query.one().updated_at is not None
+
+    def test_existing_doctors_get_modification_stamps(self, app):
+        """Test doctors predating updated_at are stamped."""
+        from models import Doctor
+
+        with app.app_context():
+            db.create_all()
+            db.session.execute(db.text('DROP TABLE doctors'))
+            db.session.execute(db.text(
+                'CREATE TABLE doctors (doctor_id INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL, '
+                'specialty VARCHAR(100) NOT NULL, phone VARCHAR(15) NOT NULL, available BOOLEAN)'
+            ))
+            db.session.execute(db.text(
+                "INSERT INTO doctors (name, specialty, phone, available) VALUES ('Dr. Old', 'General', '555', 1)"
+            ))
+            db.session.commit()
+
+            upgrade()
+
+            assert Doctor.query.one().updated_at is not None
+
+    def test_existing_bills_are_totalled(self, app):
+        """Test the upgrade backfills daily totals from existing bills."""
+        from datetime import date, datetime
+        from models import Bill, BillDailyTotal
+
+        with app.app_context():
+            db.create_all()
+            db.session.execute(db.text('DROP TABLE bill_daily_totals'))
+            db.session.add(Patient(name='Existing', age=40, gender='Male', phone='555-0000'))
+            db.session.commit()
+            db.session.execute(db.insert(Bill), [
+                {'patient_id': 1, 'amount': 10.0, 'date': datetime(2025, 1, 1, 9), 'status': 'paid'},
+                {'patient_id': 1, 'amount': 5.0, 'date': datetime(2025, 1, 1, 15), 'status': 'paid'},
+            ])
+            db.session.commit()
+
+            upgrade()
+
+            total = BillDailyTotal.query.one()
+            assert (total.day, total.status, total.bill_count, total.amount) == (date(2025, 1, 1), 'paid', 2, 15.0)
+
+    def test_existing_patients_get_blocking_keys(self, app):
+        """Test patients predating duplicate detection get keys and indexes."""
+        with app.app_context():
+            db.create_all()
+            for name in ('ix_patients_phone_key', 'ix_patients_name_key_age_band'):
+                db.session.execute(db.text(f'DROP INDEX {name}'))
+            db.session.execute(db.text(
+                "INSERT INTO patients (name, age, gender, phone) VALUES ('Alice Williams', 35, 'Female', '555-1001')"
+            ))
+            db.session.commit()
+
+            upgrade()
+
+            patient = Patient.query.one()
+            assert (patient.phone_key, patient.name_key, patient.age_band) == ('5551001', 'A420 W452', 7)
+            assert {'ix_patients_phone_key', 'ix_patients_name_key_age_band'} <= index_names('patients')
@@ -0,0 +1,109 @@
+"""Tests for keyset pagination."""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from flask import Flask
+from datetime import date, timedelta
+
+from models import db, Patient, Doctor, Appointment
+from pagination import keyset_paginate, encode_cursor, decode_cursor
+
+
+@pytest.fixture
+def app():
+    """Create test application."""
+    application = Flask(__name__)
+    application.config['TESTING'] = True
+    application.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    application.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    db.init_app(application)
+
+    with application.app_context():
+        db.create_all()
+        doctor = Doctor(name='Dr. Test', specialty='General', phone='555-0001')
+        db.session.add(doctor)
+        for i in range(7):
+            db.session.add(Patient(name=f'Patient {i}', age=30, gender='Male', phone='555-1234'))
+        db.session.commit()
+        # Several appointments share a date so the id tie-breaker matters.
+        for i in range(7):
+            db.session.add(Appointment(patient_id=i + 1, doctor_id=doctor.doctor_id,
+                                       date=date(2025, 1, 1) + timedelta(days=i // 3),
+                                       time=['09:00', '10:00', '11:00'][i % 3]))
+        db.session.commit()
+
+    yield application
+
+    with application.app_context():
+        db.drop_all()
+
+
+PATIENT_ORDER = [(Patient.patient_id, False)]
+APPOINTMENT_ORDER = [(Appointment.date, True), (Appointment.appoint_id, True)]
+
+
+class TestCursor:
+    """Tests for cursor encoding."""
+
+    def test_round_trip(self):
+        """Test a cursor decodes back to typed values."""
+        token = encode_cursor([date(2025, 3, 4), 12])
+        assert decode_cursor(token, APPOINTMENT_ORDER) == [date(2025, 3, 4), 12]
+
+    def test_invalid_cursor(self):
+        """Test malformed cursors are rejected."""
+        with pytest.raises(ValueError):
+            decode_cursor('not-a-cursor', APPOINTMENT_ORDER)
+        with pytest.raises(ValueError):
+            decode_cursor(encode_cursor([1]), APPOINTMENT_ORDER)
+
+    def test_decodable_cursor_with_bad_values(self):
+        """Test well-formed JSON holding values of the wrong shape is rejected."""
+        for values in ([[1], 2], [None, 2], ['2025-03-04', {'a': 1}], ['2025-03-04', 'x']):
+            with pytest.raises(ValueError):
+                decode_cursor(encode_cursor(values), APPOINTMENT_ORDER)
+
+
+class TestKeysetPaginate:
+    """Tests for keyset_paginate."""
+
+    def test_first_page(self, app):
+        """Test the first page has a next cursor but no previous cursor."""
+        with app.app_context():
+            page = keyset_paginate(Patient.query, PATIENT_ORDER, per_page=3)
+            assert [p.patient_id for p in page] == [1, 2, 3]
+            assert page.has_next
+            assert not page.has_prev
+
+    def test_walk_forward_and_back(self, app):
+        """Test walking all pages forward then back yields stable pages."""
+        with app.app_context():
+            pages = []
+            page = keyset_paginate(Appointment.query, APPOINTMENT_ORDER, per_page=3)
+            pages.append([a.appoint_id for a in page])
+            while page.has_next:
+                page = keyset_paginate(Appointment.query, APPOINTMENT_ORDER, after=page.next_cursor, per_page=3)
+                pages.append([a.appoint_id for a in page])
+
+            assert pages == [[7, 6, 5], [4, 3, 2], [1]]
+            assert page.has_prev
+
+            back = keyset_paginate(Appointment.query, APPOINTMENT_ORDER, before=page.prev_cursor, per_page=3)
+            assert [a.appoint_id for a in back] == [4, 3, 2]
+            assert back.has_prev and back.has_next
+
+            first = keyset_paginate(Appointment.query, APPOINTMENT_ORDER, before=back.prev_cursor, per_page=3)
+            assert [a.appoint_id for a in first] == [7, 6, 5]
+            assert not first.has_prev
+
+    def test_single_page(self, app):
+        """Test a result that fits on one page has no cursors."""
+        with app.app_context():
+            page = keyset_paginate(Patient.query, PATIENT_ORDER, per_page=50)
+            assert len(page) == 7
+            assert not page.has_next
+            assert not page.has_prev
@@ -0,0 +1,90 @@
+"""Tests for query counting and query budgets."""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from flask import Flask
+
+from models import db, Patient
+from querybudget import count_queries, query_budget, QueryBudgetExceeded
+
+
+@pytest.fixture
+def app():
+    """Create test application."""
+    application = Flask(__name__)
+    application.config['TESTING'] = True
+    application.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    application.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    db.init_app(application)
+
+    with application.app_context():
+        db.create_all()
+        db.session.add(Patient(name='Test Patient', age=30, gender='Male', phone='555-1234'))
+        db.session.commit()
+
+    yield application
+
+    with application.app_context():
+        db.drop_all()
+
+
+class TestCountQueries:
+    """Tests for the count_queries context manager."""
+
+    def test_counts_statements(self, app):
+        """Test each executed statement is counted."""
+        with app.app_context():
+            with count_queries() as counter:
+                Patient.query.all()
+                Patient.query.count()
+            assert counter.count == 2
+            assert 'patients' in counter.statements[0]
+
+    def test_nested_counters(self, app):
+        """Test nested counters both see inner statements."""
+        with app.app_context():
+            with count_queries() as outer:
+                Patient.query.all()
+                with count_queries() as inner:
+                    Patient.query.all()
+            assert outer.count == 2
+            assert inner.count == 1
+
+
+class TestQueryBudget:
+    """Tests for the query_budget decorator."""
+
+    def test_within_budget(self, app):
+        """Test a view within its budget returns normally."""
+        @query_budget(1)
+        def view():
+            return len(Patient.query.all())
+
+        with app.app_context():
+            assert view() == 1
+
+    def test_over_budget_raises(self, app):
+        """Test a view over its budget raises when enforcement is on."""
+        @query_budget(1)
+        def view():
+            Patient.query.all()
+            return Patient.query.count()
+
+        with app.app_context():
+            with pytest.raises(QueryBudgetExceeded):
+                view()
+
+    def test_not_enforced_outside_testing(self, app):
+        """Test the budget is ignored when enforcement is off."""
+        app.config['QUERY_BUDGET_ENFORCE'] = False
+
+        @query_budget(0)
+        def view():
+            return Patient.query.count()
+
+        with app.app_context():
+            assert view() == 1
@@ -0,0 +1,125 @@
+"""Tests for read-replica routing, with two SQLite files as primary and replica."""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import time
+import pytest
+from flask import g
+from sqlalchemy import create_engine, insert
+from werkzeug.security import generate_password_hash
+
+from models import db, User, Patient
+from app import create_app
+from replicas import STICKY_KEY, replica_binds, replica_keys
+
+
+@pytest.fixture
+def app(tmp_path):
+    """Create an app whose replica holds different patients from the primary."""
+    replica_url = f"sqlite:///{tmp_path / 'replica.db'}"
+    application = create_app({
+        'TESTING': True,
+        'SECRET_KEY': 'test-secret',
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'primary.db'}",
+        'REPLICA_URLS': [replica_url],
+        'REPLICA_STICKY_SECONDS': 5,
+    })
+
+    with application.app_context():
+        db.create_all()
+        db.session.add(User(username='admin', password=generate_password_hash('pw'), role='admin'))
+        db.session.add(Patient(name='Primary Patient', age=30, gender='Male', phone='555-0001'))
+        db.session.commit()
+
+    replica = create_engine(replica_url)
+    db.metadata.create_all(replica)
+    with replica.begin() as conn:
+        conn.execute(insert(Patient.__table__).values(name='Replica Patient', age=40, gender='Female',
+                                                      phone='555-0002'))
+    replica.dispose()
+
+    yield application
+
+    with application.app_context():
+        db.drop_all()
+        for engine in db.engines.values():
+            engine.dispose()
+    # Flask-SQLAlchemy keeps an empty metadata per bind key on the shared
+    # ``db``; drop it so apps built by other tests, which have no replica
+    # bind, can still create_all().
+    db.metadatas.pop('replica_1', None)
+
+
+@pytest.fixture
+def client(app):
+    """Create a client logged in as admin."""
+    client = app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'pw'})
+    return client
+
+
+class TestRouting:
+    """Tests for which database a request reads from."""
+
+    def test_read_only_views_use_replica(self, client):
+        """Test list pages read from the replica."""
+        response = client.get('/patients')
+        assert b'Replica Patient' in response.data
+        assert b'Primary Patient' not in response.data
+
+    def test_other_views_use_primary(self, client):
+        """Test views that are not read-only read from the primary."""
+        response = client.get('/patients/edit/1')
+        assert b'Primary Patient' in response.data
+
+    def test_read_your_writes(self, app, client):
+        """Test a user's own commit pins their reads to the primary for a while."""
+        response = client.post('/patients/add', data={
+            'name': 'New Patient', 'age': '25', 'gender': 'Female', 'phone': '555-0003', 'address': '',
+        }, follow_redirects=True)
+        assert b'New Patient' in response.data
+
+        other = app.test_client()
+        other.post('/login', data={'username': 'admin', 'password': 'pw'})
+        assert b'New Patient' not in other.get('/patients').data
+
+        with client.session_transaction() as session:
+            session[STICKY_KEY] = time.time() - 1
+        assert b'Replica Patient' in client.get('/patients').data
+
+    def test_write_in_read_only_request_uses_primary(self, app):
+        """Test a flush inside a read-only request goes to, and stays on, the primary."""
+        with app.test_request_context():
+            g.read_only = True
+            assert Patient.query.one().name == 'Replica Patient'
+            db.session.add(Patient(name='Written', age=1, gender='Male', phone='555-0004'))
+            db.session.flush()
+            assert g.read_only is False
+            assert Patient.query.count() == 2
+            db.session.rollback()
+
+    def test_outside_requests_use_primary(self, app):
+        """Test CLI and scripts always use the primary."""
+        with app.app_context():
+            assert Patient.query.one().name == 'Primary Patient'
+
+
+class TestConfig:
+    """Tests for replica configuration."""
+
+    def test_replica_binds(self):
+        """Test each URL becomes a numbered bind with its engine options."""
+        binds = replica_binds(['sqlite:///a.db', 'mysql+pymysql://r2/db'], lambda url: {'echo': url[0] == 'm'})
+        assert binds == {
+            'replica_1': {'url': 'sqlite:///a.db', 'echo': False},
+            'replica_2': {'url': 'mysql+pymysql://r2/db', 'echo': True},
+        }
+        assert replica_keys({None: 1, 'replica_1': 2, 'archive': 3}) == ['replica_1']
+
+    def test_schema_is_only_created_on_primary(self, app):
+        """Test no model belongs to a replica bind, so create_all leaves replicas alone."""
+        assert list(app.config['SQLALCHEMY_BINDS']) == ['replica_1']
+        with app.app_context():
+            assert not db.metadatas.get('replica_1', db.MetaData()).tables
@@ -0,0 +1,145 @@
+"""Tests for the incrementally maintained billing totals."""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from flask import Flask
+from datetime import date, datetime
+
+from models import db, Patient, Bill, BillDailyTotal
+from revenue import rebuild, revenue_report
+
+
+@pytest.fixture
+def app():
+    """Create test application with one patient."""
+    application = Flask(__name__)
+    application.config['TESTING'] = True
+    application.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    application.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    db.init_app(application)
+
+    with application.app_context():
+        db.create_all()
+        db.session.add(Patient(name='Test Patient', age=30, gender='Male', phone='555-1234'))
+        db.session.commit()
+        yield application
+        db.drop_all()
+
+
+def bill(amount, day, status='pending'):
+    b = Bill(patient_id=1, amount=amount, date=datetime.combine(day, datetime.min.time().replace(hour=10)),
+             status=status)
+    db.session.add(b)
+    db.session.commit()
+    return b
+
+
+def totals():
+    return {(t.day, t.status): (t.bill_count, round(t.amount, 2))
+            for t in BillDailyTotal.query.all() if t.bill_count}
+
+
+class TestIncrementalTotals:
+    """Tests that bill changes keep the daily totals current."""
+
+    def test_insert(self, app):
+        """Test new bills are added to their day and status."""
+        bill(100.0, date(2025, 3, 1))
+        bill(50.0, date(2025, 3, 1))
+        bill(20.0, date(2025, 3, 2), status='paid')
+        assert totals() == {
+            (date(2025, 3, 1), 'pending'): (2, 150.0),
+            (date(2025, 3, 2), 'paid'): (1, 20.0),
+        }
+
+    def test_default_date_and_status(self, app):
+        """Test bills relying on column defaults are counted today as pending."""
+        db.session.add(Bill(patient_id=1, amount=10.0))
+        db.session.commit()
+        assert totals() == {(datetime.utcnow().date(), 'pending'): (1, 10.0)}
+
+    def test_pay_moves_between_statuses(self, app):
+        """Test paying a bill moves it from pending to paid."""
+        b = bill(100.0, date(2025, 3, 1))
+        b.status = 'paid'
+        db.session.commit()
+        assert totals() == {(date(2025, 3, 1), 'paid'): (1, 100.0)}
+
+    def test_amount_change_and_delete(self, app):
+        """Test amount edits and deletions adjust the totals."""
+        b = bill(100.0, date(2025, 3, 1))
+        bill(30.0, date(2025, 3, 1))
+        b.amount = 80.0
+        db.session.commit()
+        assert totals() == {(date(2025, 3, 1), 'pending'): (2, 110.0)}
+        db.session.delete(b)
+        db.session.commit()
+        assert totals() == {(date(2025, 3, 1), 'pending'): (1, 30.0)}
+
+    def test_rollback_leaves_totals(self, app):
+        """Test a rolled back bill never reaches the totals."""
+        db.session.add(Bill(patient_id=1, amount=10.0, date=datetime(2025, 3, 1)))
+        db.session.flush()
+        db.session.rollback()
+        assert totals() == {}
+
+    def test_rebuild_matches_incremental(self, app):
+        """Test a backfill reproduces the incrementally kept totals."""
+        for day, amount, status in ((1, 10.0, 'paid'), (1, 5.5, 'pending'), (2, 7.25, 'paid'), (15, 3.0, 'paid')):
+            bill(amount, date(2025, 3, day), status)
+        expected = totals()
+        BillDailyTotal.query.delete()
+        db.session.commit()
+        assert rebuild() == 4
+        assert totals() == expected
+
+    def test_rebuild_range(self, app):
+        """Test a ranged rebuild only touches its days."""
+        bill(10.0, date(2025, 3, 1))
+        bill(20.0, date(2025, 3, 2))
+        db.session.execute(db.text('UPDATE bills SET amount = 99 WHERE bill_id = 2'))
+        db.session.commit()
+        rebuild(date(2025, 3, 2), date(2025, 3, 2))
+        assert totals() == {
+            (date(2025, 3, 1), 'pending'): (1, 10.0),
+            (date(2025, 3, 2), 'pending'): (1, 99.0),
+        }
+
+
+class TestRevenueReport:
+    """Tests for revenue_report()."""
+
+    @pytest.fixture
+    def bills(self, app):
+        bill(100.0, date(2024, 12, 31), 'paid')
+        bill(40.0, date(2025, 1, 5), 'paid')
+        bill(60.0, date(2025, 1, 20))
+        bill(25.0, date(2025, 2, 1), 'paid')
+
+    def test_monthly(self, bills):
+        """Test months combine billed, collected and outstanding amounts."""
+        report = revenue_report(period='month')
+        assert [r['period'] for r in report] == ['2024-12', '2025-01', '2025-02']
+        january = report[1]
+        assert (january['bills'], january['billed'], january['collected'], january['outstanding']) == (2, 100.0, 40.0, 60.0)
+        assert (january['paid_bills'], january['pending_bills']) == (1, 1)
+
+    def test_yearly_with_range(self, bills):
+        """Test yearly totals respect the date range."""
+        report = revenue_report(start=date(2025, 1, 1), period='year')
+        assert report == [{'period': '2025', 'bills': 3, 'billed': 125.0, 'collected': 65.0,
+                           'outstanding': 60.0, 'paid_bills': 2, 'pending_bills': 1}]
+
+    def test_daily(self, bills):
+        """Test daily rows come out in date order."""
+        assert [r['period'] for r in revenue_report(period='day')] == \
+            ['2024-12-31', '2025-01-05', '2025-01-20', '2025-02-01']
+
+    def test_unknown_period(self, app):
+        """Test an unknown period is rejected."""
+        with pytest.raises(ValueError):
+            revenue_report(period='week')
@@ -0,0 +1,161 @@
+"""Tests for appointment slot conflicts and availability search."""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from flask import Flask
+from datetime import date, timedelta
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Patient, Doctor, Appointment
+from scheduling import SLOT_TIMES, SlotIndex, is_slot_free, next_free_slots, available_doctors
+
+
+TOMORROW = date.today() + timedelta(days=1)
+
+
+@pytest.fixture
+def app():
+    """Create test application with two doctors and a patient."""
+    application = Flask(__name__)
+    application.config['TESTING'] = True
+    application.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    application.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    db.init_app(application)
+
+    with application.app_context():
+        db.create_all()
+        db.session.add_all([
+            Doctor(name='Dr. One', specialty='Cardiology', phone='555-0001'),
+            Doctor(name='Dr. Two', specialty='Cardiology', phone='555-0002'),
+            Doctor(name='Dr. Three', specialty='Pediatrics', phone='555-0003'),
+            Patient(name='Test Patient', age=30, gender='Male', phone='555-1234'),
+        ])
+        db.session.commit()
+
+    yield application
+
+    with application.app_context():
+        db.drop_all()
+
+
+def book(doctor_id, day, time, status='scheduled'):
+    appointment = Appointment(patient_id=1, doctor_id=doctor_id, date=day, time=time, status=status)
+    db.session.add(appointment)
+    db.session.commit()
+    return appointment
+
+
+class TestSlotConstraint:
+    """Tests for the database slot uniqueness guarantee."""
+
+    def test_double_booking_rejected(self, app):
+        """Test the database refuses a second live booking for a slot."""
+        with app.app_context():
+            book(1, TOMORROW, '09:00')
+            with pytest.raises(IntegrityError):
+                book(1, TOMORROW, '09:00')
+            db.session.rollback()
+
+    def test_cancelling_frees_slot(self, app):
+        """Test a cancelled booking no longer holds its slot."""
+        with app.app_context():
+            first = book(1, TOMORROW, '09:00')
+            first.status = 'cancelled'
+            db.session.commit()
+            assert is_slot_free(1, TOMORROW, '09:00')
+            book(1, TOMORROW, '09:00')
+            assert not is_slot_free(1, TOMORROW, '09:00')
+
+    def test_legacy_double_booking_can_be_updated(self, app):
+        """Test a duplicate left without the slot by migration 4 can still change status."""
+        with app.app_context():
+            book(1, TOMORROW, '09:00')
+            duplicate = book(1, TOMORROW, '09:00', status='cancelled')
+            db.session.execute(db.text('UPDATE appointments SET status = :s WHERE appoint_id = :id'),
+                               {'s': 'scheduled', 'id': duplicate.appoint_id})
+            db.session.commit()
+
+            duplicate.status = 'completed'
+            db.session.commit()
+            assert duplicate.slot_held is None
+
+    def test_rescheduling_reclaims_slot(self, app):
+        """Test moving a cancelled booking back to scheduled holds the slot again."""
+        with app.app_context():
+            appointment = book(1, TOMORROW, '09:00', status='cancelled')
+            assert appointment.slot_held is None
+            appointment.status = 'scheduled'
+            db.session.commit()
+            assert appointment.slot_held is True
+
+    def test_other_doctor_same_slot(self, app):
+        """Test different doctors can be booked for the same time."""
+        with app.app_context():
+            book(1, TOMORROW, '09:00')
+            book(2, TOMORROW, '09:00')
+            assert Appointment.query.count() == 2
+
+
+class TestSlotIndex:
+    """Tests for SlotIndex."""
+
+    def test_lookup(self):
+        """Test taken slots are found and duplicates are ignored."""
+        index = SlotIndex()
+        index.add(1, TOMORROW, '10:00')
+        index.add(1, TOMORROW, '09:00')
+        index.add(1, TOMORROW, '10:00')
+        assert index.is_taken(1, TOMORROW, '09:00')
+        assert index.is_taken(1, TOMORROW, '10:00')
+        assert not index.is_taken(1, TOMORROW, '09:30')
+        assert not index.is_taken(2, TOMORROW, '09:00')
+
+    def test_load_skips_cancelled(self, app):
+        """Test loading ignores cancelled bookings and other days."""
+        with app.app_context():
+            book(1, TOMORROW, '09:00')
+            book(1, TOMORROW, '09:30', status='cancelled')
+            book(1, TOMORROW + timedelta(days=5), '10:00')
+            index = SlotIndex.load([1], TOMORROW, TOMORROW)
+            assert index.is_taken(1, TOMORROW, '09:00')
+            assert not index.is_taken(1, TOMORROW, '09:30')
+            assert not index.is_taken(1, TOMORROW + timedelta(days=5), '10:00')
+
+
+class TestNextFreeSlots:
+    """Tests for next_free_slots()."""
+
+    def test_skips_booked_slots(self, app):
+        """Test booked slots are skipped for a single doctor."""
+        with app.app_context():
+            book(1, TOMORROW, '09:00')
+            book(1, TOMORROW, '09:30')
+            slots = next_free_slots(available_doctors(doctor_id=1), start=TOMORROW, limit=2)
+            assert [(d.doctor_id, day, t) for d, day, t in slots] == [
+                (1, TOMORROW, '10:00'), (1, TOMORROW, '10:30')
+            ]
+
+    def test_specialty_search(self, app):
+        """Test a specialty search returns the earliest slot across its doctors."""
+        with app.app_context():
+            book(1, TOMORROW, '09:00')
+            slots = next_free_slots(available_doctors(specialty='Cardiology'), start=TOMORROW, limit=2)
+            assert [(d.name, t) for d, _, t in slots] == [('Dr. Two', '09:00'), ('Dr. One', '09:30')]
+
+    def test_full_days_roll_over(self, app):
+        """Test the search continues into the next day once a day is full."""
+        with app.app_context():
+            for time in SLOT_TIMES:
+                book(3, TOMORROW, time)
+            slots = next_free_slots(available_doctors(doctor_id=3), start=TOMORROW, limit=1)
+            assert slots[0][1:] == (TOMORROW + timedelta(days=1), SLOT_TIMES[0])
+
+    def test_never_in_the_past(self, app):
+        """Test a start date in the past is moved to today."""
+        with app.app_context():
+            slots = next_free_slots(available_doctors(doctor_id=1), start=date(2000, 1, 1), limit=1)
+            assert slots[0][1] >= date.today()
@@ -0,0 +1,120 @@
+"""Tests for indexed patient search."""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from flask import Flask
+
+from models import db, Patient
+from querybudget import count_queries
+from search import name_order, search_patients, starts_with
+
+
+@pytest.fixture
+def app():
+    """Create test application with a few patients."""
+    application = Flask(__name__)
+    application.config['TESTING'] = True
+    application.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    application.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    db.init_app(application)
+
+    with application.app_context():
+        db.create_all()
+        db.session.add_all([
+            Patient(name='Alice Williams', age=35, gender='Female', phone='555-1001'),
+            Patient(name='Bob Martinez', age=45, gender='Male', phone='555-1002'),
+            Patient(name='Alicia Keys', age=28, gender='Female', phone='555-2003'),
+            Patient(name='Williams Brown', age=52, gender='Male', phone='555-3004'),
+        ])
+        db.session.commit()
+
+    yield application
+
+    with application.app_context():
+        db.drop_all()
+
+
+def names(patients):
+    return [p.name for p in patients]
+
+
+class TestSearchPatients:
+    """Tests for search_patients()."""
+
+    def test_substring_match(self, app):
+        """Test any part of a name matches, case-insensitively."""
+        with app.app_context():
+            assert set(names(search_patients('lic'))) == {'Alice Williams', 'Alicia Keys'}
+            assert set(names(search_patients('WILLIAMS'))) == {'Alice Williams', 'Williams Brown'}
+
+    def test_all_words_must_match(self, app):
+        """Test multiple words are combined with AND."""
+        with app.app_context():
+            assert names(search_patients('alice williams')) == ['Alice Williams']
+
+    def test_phone_match(self, app):
+        """Test phone numbers are searchable, including punctuation."""
+        with app.app_context():
+            assert names(search_patients('555-2003')) == ['Alicia Keys']
+
+    def test_short_term_uses_prefix(self, app):
+        """Test terms too short for trigrams fall back to a name prefix."""
+        with app.app_context():
+            assert names(search_patients('Bo')) == ['Bob Martinez']
+            assert names(search_patients('wi')) == ['Williams Brown']
+
+    def test_prefix_seeks_the_name_index(self, app):
+        """Test the prefix fallback is a range seek on the case-insensitive index, not a scan."""
+        with app.app_context():
+            query = Patient.query.filter(starts_with(Patient.name, 'wi')).order_by(name_order(Patient.name))
+            statement = query.statement.compile(db.engine, compile_kwargs={'literal_binds': True})
+            plan = ' '.join(row[-1] for row in db.session.execute(db.text(f'EXPLAIN QUERY PLAN {statement}')))
+            assert 'USING INDEX ix_patients_name_nocase (name>? AND name<?)' in plan
+            assert 'TEMP B-TREE' not in plan
+
+    def test_prefix_escapes_wildcards(self, app):
+        """Test % and _ in a term match themselves."""
+        with app.app_context():
+            db.session.add(Patient(name='A_b', age=1, gender='Male', phone='555-0000'))
+            db.session.commit()
+            assert names(search_patients('A_')) == ['A_b']
+            assert search_patients('%') == []
+
+    def test_limit(self, app):
+        """Test results are capped at the limit."""
+        with app.app_context():
+            assert len(search_patients('555', limit=2)) == 2
+
+    def test_id_match_listed_first(self, app):
+        """Test a numeric term returns the patient with that ID first."""
+        with app.app_context():
+            results = search_patients('3')
+            assert results[0].patient_id == 3
+
+    def test_single_query(self, app):
+        """Test a text search is answered by one statement."""
+        with app.app_context():
+            with count_queries() as counter:
+                search_patients('williams')
+            assert counter.count == 1
+
+    def test_index_follows_updates_and_deletes(self, app):
+        """Test the index is kept in sync with the patients table."""
+        with app.app_context():
+            patient = Patient.query.filter_by(name='Bob Martinez').first()
+            patient.name = 'Robert Martinez'
+            db.session.commit()
+            assert search_patients('Bob') == []
+            assert names(search_patients('Robert')) == ['Robert Martinez']
+
+            db.session.delete(patient)
+            db.session.commit()
+            assert search_patients('Martinez') == []
+
+            db.session.add(Patient(name='Zed Newcomer', age=20, gender='Male', phone='555-9999'))
+            db.session.commit()
+            assert names(search_patients('newcomer')) == ['Zed Newcomer']
@@ -0,0 +1,137 @@
+"""Tests for the slow-query log."""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+import pytest
+from flask import Flask
+
+import slowlog
+from models import db, Patient
+
+
+@pytest.fixture
+def app(tmp_path):
+    """Create test application logging every statement."""
+    application = Flask(__name__)
+    application.config['TESTING'] = True
+    application.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    application.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    application.config['SLOW_QUERY_MS'] = 0
+    application.config['SLOW_QUERY_LOG'] = str(tmp_path / 'slow.jsonl')
+
+    db.init_app(application)
+    slowlog.init_app(application)
+
+    @application.route('/by-phone/<phone>')
+    def by_phone(phone):
+        return str(Patient.query.filter_by(phone=phone).count())
+
+    with application.app_context():
+        db.create_all()
+
+    yield application
+
+    with application.app_context():
+        db.drop_all()
+
+
+def read_log(app):
+    with open(app.config['SLOW_QUERY_LOG'], encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+class TestShape:
+    """Tests for statement normalisation and redaction."""
+
+    def test_literals_and_in_lists_are_normalised(self):
+        """Test statements differing only in values share a shape."""
+        assert slowlog.shape("SELECT * FROM t\n  WHERE a = 'x''y' AND b IN (?, ?, ?) LIMIT 10") == \
+            slowlog.shape("SELECT * FROM t WHERE a = 'z' AND b IN (?) LIMIT 20") == \
+            'SELECT * FROM t WHERE a = ? AND b IN (...) LIMIT ?'
+
+    def test_identifiers_keep_their_digits(self):
+        """Test numbers inside names are not replaced."""
+        assert slowlog.shape('SELECT anon_1.x FROM anon_1') == 'SELECT anon_1.x FROM anon_1'
+
+    def test_redact(self):
+        """Test values are replaced by their types."""
+        assert slowlog.redact(('555-1001', 35, None)) == ['<str>', '<int>', None]
+        assert slowlog.redact({'name': 'Alice'}) == {'name': '<str>'}
+
+
+class TestSlowQueryLog:
+    """Tests for the engine hooks."""
+
+    def test_records_route_redacted_parameters_and_plan(self, app):
+        """Test a slow statement is logged with its request and EXPLAIN plan."""
+        app.test_client().get('/by-phone/555-1001')
+
+        entry = [e for e in read_log(app) if 'FROM patients' in e['statement']][-1]
+        assert entry['endpoint'] == 'by_phone'
+        assert (entry['method'], entry['rule']) == ('GET', '/by-phone/<phone>')
+        assert entry['parameters'] == ['<str>']
+        assert '555-1001' not in json.dumps(entry)
+        assert any('patients' in row['detail'] for row in entry['plan'])
+        assert entry['ms'] >= 0
+
+    def test_inserts_and_batches_have_no_plan(self, app):
+        """Test statements that cannot be explained usefully are logged without one."""
+        with app.app_context():
+            db.session.execute(db.insert(Patient), [
+                {'name': 'Alice', 'age': 35, 'gender': 'Female', 'phone': '555-1001'},
+                {'name': 'Bob', 'age': 45, 'gender': 'Male', 'phone': '555-1002'},
+            ])
+            db.session.commit()
+
+        entry = [e for e in read_log(app) if e['statement'].startswith('INSERT INTO patients')][-1]
+        assert entry['executemany'] == 2
+        assert entry['plan'] is None
+        assert entry['endpoint'] is None
+
+    def test_explain_does_not_disturb_results(self, app):
+        """Test the statement's own rows are intact after its plan is taken."""
+        with app.app_context():
+            db.session.add_all([Patient(name=f'P{i}', age=30, gender='Male', phone=f'555-000{i}')
+                                for i in range(3)])
+            db.session.commit()
+            assert [p.name for p in Patient.query.order_by(Patient.patient_id)] == ['P0', 'P1', 'P2']
+
+    def test_off_by_default(self, tmp_path):
+        """Test nothing is hooked up without SLOW_QUERY_MS."""
+        application = Flask(__name__)
+        application.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        application.config['SLOW_QUERY_LOG'] = str(tmp_path / 'off.jsonl')
+        db.init_app(application)
+        assert slowlog.init_app(application) is None
+        assert slowlog.get_log(application) is None
+        with application.app_context():
+            db.session.execute(db.text('SELECT 1'))
+        assert not os.path.exists(tmp_path / 'off.jsonl')
+
+
+class TestSummarize:
+    """Tests for the log summary."""
+
+    def test_groups_by_shape_across_rotated_files(self, tmp_path):
+        """Test records are grouped by shape, most total time first."""
+        path = str(tmp_path / 'slow.jsonl')
+
+        def write(name, *entries):
+            with open(name, 'w', encoding='utf-8') as f:
+                for entry in entries:
+                    f.write(json.dumps(entry) + '\n')
+
+        write(path + '.1', {'shape': 'A', 'ms': 100.0, 'endpoint': 'x', 'plan': [{'detail': 'SCAN a'}]})
+        write(path, {'shape': 'A', 'ms': 50.0, 'endpoint': None},
+              {'shape': 'B', 'ms': 120.0, 'endpoint': 'y'})
+
+        assert slowlog.log_files(path) == [path + '.1', path]
+        first, second = slowlog.summarize(slowlog.log_files(path))
+        assert (first['shape'], first['count'], first['total_ms'], first['max_ms'], first['mean_ms']) == \
+            ('A', 2, 150.0, 100.0, 75.0)
+        assert first['endpoints'] == ['-', 'x']
+        assert first['plan'] == [{'detail': 'SCAN a'}]
+        assert (second['shape'], second['count']) == ('B', 1)
@@ -0,0 +1,120 @@
+"""Tests for the cached dashboard counters."""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from flask import Flask
+from datetime import date
+from sqlalchemy import update
+
+from models import db, Patient, Doctor, Appointment, Bill
+from querybudget import count_queries
+from stats import get_stats, get_cache
+
+
+@pytest.fixture
+def app():
+    """Create test application with a little data."""
+    application = Flask(__name__)
+    application.config['TESTING'] = True
+    application.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    application.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    db.init_app(application)
+
+    with application.app_context():
+        db.create_all()
+        doctor = Doctor(name='Dr. Test', specialty='General', phone='555-0001')
+        patient = Patient(name='Test Patient', age=30, gender='Male', phone='555-1234')
+        db.session.add_all([doctor, patient])
+        db.session.commit()
+        db.session.add_all([
+            Appointment(patient_id=patient.patient_id, doctor_id=doctor.doctor_id, date=date.today(), time='09:00', status='scheduled'),
+            Appointment(patient_id=patient.patient_id, doctor_id=doctor.doctor_id, date=date.today(), time='10:00', status='completed'),
+            Bill(patient_id=patient.patient_id, amount=10.0, status='pending'),
+            Bill(patient_id=patient.patient_id, amount=20.0, status='paid'),
+        ])
+        db.session.commit()
+
+    yield application
+
+    with application.app_context():
+        db.drop_all()
+
+
+class TestStats:
+    """Tests for get_stats()."""
+
+    def test_counts_in_one_query(self, app):
+        """Test all counters come back from a single statement."""
+        with app.app_context():
+            with count_queries() as counter:
+                stats = get_stats()
+            assert counter.count == 1
+            assert stats == {'patients': 1, 'doctors': 1, 'appointments': 1, 'bills_pending': 1}
+
+    def test_cached_between_calls(self, app):
+        """Test a second call is served from the cache."""
+        with app.app_context():
+            get_stats()
+            with count_queries() as counter:
+                get_stats()
+            assert counter.count == 0
+
+    def test_insert_invalidates(self, app):
+        """Test committing a new patient refreshes the counters."""
+        with app.app_context():
+            get_stats()
+            db.session.add(Patient(name='Another', age=20, gender='Female', phone='555-0002'))
+            db.session.commit()
+            assert get_stats()['patients'] == 2
+
+    def test_status_change_invalidates(self, app):
+        """Test a status change on an appointment refreshes the counters."""
+        with app.app_context():
+            get_stats()
+            appointment = Appointment.query.filter_by(status='scheduled').first()
+            appointment.status = 'cancelled'
+            db.session.commit()
+            assert get_stats()['appointments'] == 0
+
+    def test_unrelated_change_keeps_cache(self, app):
+        """Test editing a patient's name does not drop the cache."""
+        with app.app_context():
+            get_stats()
+            patient = Patient.query.first()
+            patient.name = 'Renamed'
+            db.session.commit()
+            with count_queries() as counter:
+                get_stats()
+            assert counter.count == 0
+
+    def test_bulk_update_invalidates(self, app):
+        """Test a set-based UPDATE through the session refreshes the counters."""
+        with app.app_context():
+            get_stats()
+            db.session.execute(update(Bill).where(Bill.status == 'pending').values(status='paid'))
+            db.session.commit()
+            assert get_stats()['bills_pending'] == 0
+
+    def test_rollback_keeps_cache(self, app):
+        """Test a rolled back change leaves the cached counters alone."""
+        with app.app_context():
+            get_stats()
+            db.session.add(Patient(name='Rolled Back', age=20, gender='Female', phone='555-0003'))
+            db.session.flush()
+            db.session.rollback()
+            with count_queries() as counter:
+                assert get_stats()['patients'] == 1
+            assert counter.count == 0
+
+    def test_ttl_expiry(self, app):
+        """Test counters are reloaded once the TTL has passed."""
+        with app.app_context():
+            get_cache().ttl = 0
+            get_stats()
+            with count_queries() as counter:
+                get_stats()
+            assert counter.count == 1
@@ -0,0 +1,136 @@
+"""Tests for the patient timeline and summary."""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from flask import Flask
+from sqlalchemy import event
+from datetime import date, datetime
+
+from models import db, Patient, Doctor, Appointment, Bill, Prescription
+from pagination import keyset_paginate
+from querybudget import count_queries
+from timeline import summary_columns, timeline_query
+
+
+@pytest.fixture
+def app():
+    """Create test application with a patient who has some history."""
+    application = Flask(__name__)
+    application.config['TESTING'] = True
+    application.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    application.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    db.init_app(application)
+
+    with application.app_context():
+        db.create_all()
+        db.session.add_all([
+            Patient(name='Chronic Patient', age=60, gender='Female', phone='555-0001'),
+            Patient(name='Other Patient', age=30, gender='Male', phone='555-0002'),
+            Doctor(name='Dr. House', specialty='General', phone='555-0100'),
+        ])
+        db.session.commit()
+        db.session.add_all([
+            Appointment(patient_id=1, doctor_id=1, date=date(2025, 3, 1), time='09:00', status='completed'),
+            Prescription(patient_id=1, doctor_id=1, medicine='Aspirin', dosage='Daily',
+                         date=datetime(2025, 3, 1, 9, 30)),
+            Bill(patient_id=1, amount=80.0, date=datetime(2025, 3, 1, 9, 45), status='paid'),
+            Appointment(patient_id=1, doctor_id=1, date=date(2025, 4, 1), time='14:00'),
+            Bill(patient_id=1, amount=20.0, date=datetime(2025, 4, 1, 14, 0)),
+            Appointment(patient_id=2, doctor_id=1, date=date(2025, 5, 1), time='10:00'),
+        ])
+        db.session.commit()
+        yield application
+        db.drop_all()
+
+
+def entries(page):
+    return [(row.kind, row.item_id) for row in page]
+
+
+class TestTimeline:
+    """Tests for timeline_query()."""
+
+    def test_newest_first_across_kinds(self, app):
+        """Test all three kinds interleave by time, newest first, for one patient only."""
+        query, order_by = timeline_query(1)
+        page = keyset_paginate(query, order_by, per_page=10)
+        assert entries(page) == [
+            ('bill', 2), ('appointment', 2),
+            ('bill', 1), ('prescription', 1), ('appointment', 1),
+        ]
+        first = page.items[0]
+        assert (first.at, first.amount, first.status) == (datetime(2025, 4, 1, 14, 0), 20.0, 'pending')
+        assert page.items[3].doctor == 'Dr. House'
+        assert (page.items[3].title, page.items[3].detail) == ('Aspirin', 'Daily')
+        assert page.items[4].at == datetime(2025, 3, 1, 9, 0)
+
+    def test_keyset_pages(self, app):
+        """Test paging by cursor visits every entry once, including same-time ties."""
+        query, order_by = timeline_query(1)
+        seen, after = [], None
+        while True:
+            page = keyset_paginate(query, order_by, after=after, per_page=2)
+            seen.extend(entries(page))
+            if not page.has_next:
+                break
+            after = page.next_cursor
+        assert len(seen) == len(set(seen)) == 5
+        assert seen[:2] == [('bill', 2), ('appointment', 2)]
+
+        back = keyset_paginate(query, order_by, before=page.prev_cursor, per_page=2)
+        assert entries(back) == seen[2:4]
+
+    def test_one_query_per_page(self, app):
+        """Test a page of the timeline is a single statement."""
+        query, order_by = timeline_query(1)
+        with count_queries() as counter:
+            keyset_paginate(query, order_by, per_page=2)
+        assert counter.count == 1
+
+    def test_each_kind_seeks_its_own_index(self, app):
+        """Test the cursor and limit reach each kind, so a page never sorts the whole history."""
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append((statement, parameters))
+
+        query, order_by = timeline_query(1)
+        first = keyset_paginate(query, order_by, per_page=2)
+        event.listen(db.engine, 'before_cursor_execute', capture)
+        try:
+            keyset_paginate(query, order_by, after=first.next_cursor, per_page=2)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', capture)
+
+        statement, parameters = statements[-1]
+        assert statement.count('LIMIT') == 4
+        rows = db.session.connection().exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters)
+        plan = ' '.join(row[-1] for row in rows)
+        for index in ('ix_appointments_patient_id_date_time', 'ix_prescriptions_patient_id_date',
+                      'ix_bills_patient_id_date'):
+            assert f'{index} (patient_id=? AND date<' in plan
+
+
+class TestSummary:
+    """Tests for summary_columns()."""
+
+    def test_summary(self, app):
+        """Test counts, balances and last visit come from one statement."""
+        with count_queries() as counter:
+            row = db.session.execute(db.select(*summary_columns(1))).one()
+        assert counter.count == 1
+        assert row._asdict() == {
+            'appointments': 2, 'scheduled': 1, 'prescriptions': 1, 'bills': 2,
+            'billed': 100.0, 'outstanding': 20.0, 'last_visit': date(2025, 3, 1),
+        }
+
+    def test_empty_history(self, app):
+        """Test a patient without history gets zeros."""
+        db.session.add(Patient(name='New', age=1, gender='Male', phone='555-0003'))
+        db.session.commit()
+        row = db.session.execute(db.select(*summary_columns(3))).one()
+        assert (row.appointments, row.billed, row.outstanding, row.last_visit) == (0, 0.0, 0.0, None)
@@ -0,0 +1,146 @@
+"""Tests for set-based status transitions."""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from flask import Flask
+from datetime import date, datetime
+
+from models import db, Patient, Doctor, Appointment, Bill, BillDailyTotal
+from revenue import rebuild
+import transitions
+
+
+@pytest.fixture
+def app():
+    """Create test application with a patient and a doctor."""
+    application = Flask(__name__)
+    application.config['TESTING'] = True
+    application.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    application.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    db.init_app(application)
+
+    with application.app_context():
+        db.create_all()
+        db.session.add(Patient(name='Test Patient', age=30, gender='Male', phone='555-1234'))
+        db.session.add(Doctor(name='Dr. Test', specialty='General', phone='555-0000'))
+        db.session.commit()
+        yield application
+        db.drop_all()
+
+
+def appointments(*statuses):
+    rows = [Appointment(patient_id=1, doctor_id=1, date=date(2025, 3, 1), time=f'{9 + i:02d}:00', status=status)
+            for i, status in enumerate(statuses)]
+    db.session.add_all(rows)
+    db.session.commit()
+    return [row.appoint_id for row in rows]
+
+
+def statuses(model):
+    return [row.status for row in model.query.order_by(model.__mapper__.primary_key[0])]
+
+
+class TestAppointmentTransitions:
+    """Tests for bulk appointment transitions."""
+
+    def test_only_scheduled_rows_change(self, app):
+        """Test the status precondition leaves finished appointments alone."""
+        ids = appointments('scheduled', 'cancelled', 'scheduled', 'completed')
+        assert transitions.apply(Appointment, 'complete', Appointment.appoint_id.in_(ids)) == 2
+        db.session.commit()
+        assert statuses(Appointment) == ['completed', 'cancelled', 'completed', 'completed']
+
+    def test_cancel_releases_slot(self, app):
+        """Test cancelled appointments give up their slot and get a new stamp."""
+        ids = appointments('scheduled')
+        stamp = db.session.get(Appointment, ids[0]).updated_at
+        transitions.apply(Appointment, 'cancel', Appointment.appoint_id.in_(ids))
+        db.session.commit()
+        appointment = db.session.get(Appointment, ids[0])
+        assert appointment.slot_held is None
+        assert appointment.updated_at > stamp
+        db.session.add(Appointment(patient_id=1, doctor_id=1, date=date(2025, 3, 1), time='09:00'))
+        db.session.commit()
+
+    def test_complete_legacy_double_booking(self, app):
+        """Test completing a duplicate that does not hold its slot leaves slot_held NULL."""
+        first, duplicate = appointments('scheduled', 'cancelled')
+        db.session.execute(db.text("UPDATE appointments SET status = 'scheduled', time = '09:00' "
+                                   "WHERE appoint_id = :id"), {'id': duplicate})
+        db.session.commit()
+
+        assert transitions.apply(Appointment, 'complete', Appointment.appoint_id.in_([first, duplicate])) == 2
+        db.session.commit()
+        assert statuses(Appointment) == ['completed', 'completed']
+        assert db.session.get(Appointment, duplicate).slot_held is None
+
+    def test_filter(self, app):
+        """Test a filter selects rows without listing ids."""
+        appointments('scheduled', 'scheduled')
+        db.session.add(Appointment(patient_id=1, doctor_id=1, date=date(2025, 4, 1), time='09:00'))
+        db.session.commit()
+        assert transitions.apply(Appointment, 'cancel', Appointment.date < date(2025, 3, 2),
+                                 Appointment.doctor_id == 1) == 2
+        assert transitions.apply(Appointment, 'cancel', Appointment.doctor_id == 2) == 0
+
+
+class TestBillTransitions:
+    """Tests for bulk bill payment."""
+
+    def test_pay_keeps_totals(self, app):
+        """Test paying bills in bulk leaves the daily totals equal to a rebuild."""
+        db.session.add_all([
+            Bill(patient_id=1, amount=10.0, date=datetime(2025, 3, 1, 9)),
+            Bill(patient_id=1, amount=20.0, date=datetime(2025, 3, 1, 11)),
+            Bill(patient_id=1, amount=5.0, date=datetime(2025, 3, 2, 9), status='paid'),
+            Bill(patient_id=1, amount=7.0, date=datetime(2025, 3, 3, 9)),
+        ])
+        db.session.commit()
+
+        assert transitions.apply(Bill, 'pay', Bill.bill_id.in_([1, 2, 3])) == 2
+        db.session.commit()
+        assert statuses(Bill) == ['paid', 'paid', 'paid', 'pending']
+
+        def snapshot():
+            return sorted((t.day, t.status, t.bill_count, t.amount)
+                          for t in BillDailyTotal.query.all() if t.bill_count)
+        incremental = snapshot()
+        rebuild()
+        assert incremental == snapshot()
+        assert (date(2025, 3, 1), 'paid', 2, 30.0) in incremental
+
+    def test_nothing_to_pay(self, app):
+        """Test an empty selection issues no update."""
+        assert transitions.apply(Bill, 'pay', Bill.bill_id.in_([42])) == 0
+
+    def test_actions(self):
+        """Test the actions offered per model."""
+        assert transitions.actions(Appointment) == ['complete', 'cancel']
+        assert transitions.actions(Bill) == ['pay']
+
+    @pytest.mark.filterwarnings('error::sqlalchemy.exc.SAWarning')
+    def test_pay_without_returning(self, app, monkeypatch):
+        """Test databases without UPDATE ... RETURNING recompute the touched days."""
+        db.session.add_all([
+            Bill(patient_id=1, amount=10.0, date=datetime(2025, 3, 1, 9)),
+            Bill(patient_id=1, amount=20.0, date=datetime(2025, 3, 1, 11)),
+        ])
+        db.session.commit()
+        monkeypatch.setattr(db.engine.dialect, 'update_returning', False)
+        assert transitions.apply(Bill, 'pay', Bill.bill_id == 1) == 1
+        db.session.commit()
+        totals = {(t.status): (t.bill_count, t.amount) for t in BillDailyTotal.query.all() if t.bill_count}
+        assert totals == {'paid': (1, 10.0), 'pending': (1, 20.0)}
+
+    def test_version_guard(self, app):
+        """Test apply_one refuses a stale version and reports the current state."""
+        db.session.add(Bill(patient_id=1, amount=10.0))
+        db.session.commit()
+        assert transitions.apply_one(Bill, 'pay', 1, version=2) == ('pending', 1)
+        assert transitions.apply_one(Bill, 'pay', 1, version=1) is None
+        assert transitions.apply_one(Bill, 'pay', 1) == ('paid', 2)
+        assert transitions.apply_one(Bill, 'pay', 7) == (None, None)
@@ -0,0 +1,134 @@
+"""Tests for the cached Flask-Login user loader."""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from flask import Flask, session
+from werkzeug.security import generate_password_hash
+
+from models import db, User
+from querybudget import count_queries
+import usercache
+from usercache import CachedUser, UserCache, get_cache, load_user
+
+
+@pytest.fixture
+def app():
+    """Create test application with one user."""
+    application = Flask(__name__)
+    application.config['TESTING'] = True
+    application.config['SECRET_KEY'] = 'test-secret'
+    application.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    application.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    db.init_app(application)
+
+    with application.app_context():
+        db.create_all()
+        db.session.add(User(username='admin', password=generate_password_hash('admin123'), role='admin'))
+        db.session.commit()
+
+    yield application
+
+    with application.app_context():
+        db.drop_all()
+
+
+def _user():
+    return User.query.filter_by(username='admin').first()
+
+
+class TestUserCache:
+    """Tests for the LRU/TTL store."""
+
+    def test_evicts_least_recently_used(self):
+        """Test the cache never holds more than max_size entries."""
+        cache = UserCache(max_size=2, ttl=60)
+        for user_id in (1, 2):
+            cache.put({'id': user_id})
+        cache.get(1)
+        cache.put({'id': 3})
+        assert cache.get(2) is None
+        assert cache.get(1) == {'id': 1}
+        assert cache.get(3) == {'id': 3}
+
+    def test_entries_expire(self):
+        """Test entries are dropped once their TTL has passed."""
+        cache = UserCache(max_size=10, ttl=0)
+        cache.put({'id': 1})
+        assert cache.get(1) is None
+
+
+class TestLoadUser:
+    """Tests for load_user."""
+
+    def test_cached_user_needs_no_query(self, app):
+        """Test a remembered user loads without touching the database."""
+        with app.test_request_context():
+            user = _user()
+            usercache.remember(user)
+            with count_queries() as counter:
+                loaded = load_user(str(user.id))
+            assert counter.count == 0
+            assert isinstance(loaded, CachedUser)
+            assert loaded.username == 'admin'
+            assert loaded.role == 'admin'
+            assert loaded.get_id() == str(user.id)
+
+    def test_session_snapshot_checks_version_only(self, app):
+        """Test another worker rebuilds the user from the session snapshot."""
+        with app.test_request_context():
+            user = _user()
+            usercache.remember(user)
+            app.extensions.pop('user_cache')
+            with count_queries() as counter:
+                loaded = load_user(user.id)
+            assert counter.count == 1
+            assert 'version' in counter.statements[0]
+            assert loaded.role == 'admin'
+            assert get_cache().get(user.id) is not None
+
+    def test_cold_load_populates_session(self, app):
+        """Test a user with no snapshot is loaded and remembered."""
+        with app.test_request_context():
+            user_id = _user().id
+            loaded = load_user(user_id)
+            assert loaded.username == 'admin'
+            assert session[usercache.SESSION_KEY]['id'] == user_id
+
+    def test_update_evicts_local_entry(self, app):
+        """Test committing a change to a user drops it from the cache."""
+        with app.test_request_context():
+            user = _user()
+            usercache.remember(user)
+            user.role = 'receptionist'
+            db.session.commit()
+            assert get_cache().get(user.id) is None
+            assert load_user(user.id).role == 'receptionist'
+
+    def test_stale_snapshot_is_reloaded(self, app):
+        """Test a snapshot with an old version is not trusted."""
+        with app.test_request_context():
+            user = _user()
+            usercache.remember(user)
+            old_version = session[usercache.SESSION_KEY]['version']
+            user.role = 'doctor'
+            db.session.commit()
+            assert user.version == old_version + 1
+            # Simulate another worker: empty cache, stale session snapshot.
+            app.extensions.pop('user_cache')
+            session[usercache.SESSION_KEY] = dict(session[usercache.SESSION_KEY], version=old_version, role='admin')
+            assert load_user(user.id).role == 'doctor'
+
+    def test_deleted_user_is_logged_out(self, app):
+        """Test a user removed from the database loads as None."""
+        with app.test_request_context():
+            user = _user()
+            user_id = user.id
+            usercache.remember(user)
+            db.session.delete(user)
+            db.session.commit()
+            assert load_user(user_id) is None
+            assert usercache.SESSION_KEY not in session
@@ -0,0 +1,168 @@
+"""Patient timeline and summary.
+
+A patient's appointments, prescriptions and bills are read as one
+``UNION ALL`` of three per-patient selects. The doctor's name comes from a
+join in each select. The timeline is ordered newest first on ``(at, kind,
+item_id)`` and paged with the keyset helpers in :mod:`pagination`. Each
+select applies the cursor and the page size itself, walking its table's
+``(patient_id, date)`` index, so a page reads at most three pages' worth
+of rows and a patient with ten years of history costs one short query per
+page, like a new patient does.
+
+:func:`summary_columns` gives the counts and balances shown above the
+timeline as scalar subqueries. The detail view adds them to the statement
+that reads its ETag stamps, so the whole header is one aggregate query.
+"""
+
+import operator
+
+from sqlalchemy import String, and_, cast, column, func, literal, null, or_, select, type_coerce, union_all
+
+from models import db, Doctor, Appointment, Bill, Prescription
+
+
+KINDS = ('appointment', 'prescription', 'bill')
+
+
+def _appointment_at(dialect):
+    """Return an appointment's date and time as one DATETIME-compatible value."""
+    if dialect == 'mysql':
+        return func.timestamp(Appointment.date, Appointment.time)
+    # SQLite keeps DATETIME columns as 'YYYY-MM-DD HH:MM:SS.ffffff' text;
+    # build the same text so appointments sort and seek alongside bills.
+    return func.strftime('%Y-%m-%d %H:%M:%S.000000', cast(Appointment.date, String) + ' ' + Appointment.time)
+
+
+def _none(type_):
+    # A fresh NULL per column: select() would fold repeats of one object.
+    return cast(null(), type_)
+
+
+COLUMNS = ('at', 'kind', 'item_id', 'doctor', 'title', 'detail', 'amount', 'status')
+
+
+def _labelled(*expressions):
+    # Every branch names its columns, so the subqueries wrapping them keep
+    # each one apart (the NULL placeholders would otherwise share a name).
+    return [expression.label(name) for expression, name in zip(expressions, COLUMNS)]
+
+
+# Keyset ordering of the timeline, by result column name.
+ORDER_BY = [(column('at', db.DateTime), True), (column('kind', String), True), (column('item_id', db.Integer), True)]
+
+
+def _seek(kind, at, item_id, values, backwards):
+    """Return the condition for one branch's rows past the cursor ``values``."""
+    cursor_at, cursor_kind, cursor_id = values
+    past = operator.gt if backwards else operator.lt
+    if kind == cursor_kind:
+        return or_(past(at, cursor_at), and_(at == cursor_at, past(item_id, cursor_id)))
+    # At the cursor's instant the kinds sort by name, so a kind that sorts
+    # past the cursor's also takes rows at exactly that time.
+    if past(kind, cursor_kind):
+        return at >= cursor_at if backwards else at <= cursor_at
+    return past(at, cursor_at)
+
+
+class TimelineQuery:
+    """The timeline in the shape :func:`pagination.keyset_paginate` expects.
+
+    The seek and the limit are applied inside each branch of the union, in
+    the order of the branch's ``(patient_id, date)`` index, so a page reads
+    at most ``limit`` rows from each table.
+    """
+
+    def __init__(self, patient_id):
+        self.patient_id = patient_id
+        self.dialect = db.session.get_bind(mapper=Appointment.__mapper__).dialect.name
+        self.values = None
+        self.backwards = False
+        self.ordering = ()
+        self.count = None
+
+    def seek(self, values, backwards):
+        self.values, self.backwards = values, backwards
+        return self
+
+    def order_by(self, *ordering):
+        self.ordering = ordering
+        return self
+
+    def limit(self, count):
+        self.count = count
+        return self
+
+    def _branch(self, statement, kind, at, item_id, day, day_of, ordering):
+        if self.values is not None:
+            # The plain range on the indexed date column bounds the scan;
+            # _seek() then picks the exact rows.
+            bound = day_of(self.values[0])
+            statement = statement.where(day >= bound if self.backwards else day <= bound,
+                                        _seek(kind, at, item_id, self.values, self.backwards))
+        statement = statement.order_by(*(c.asc() if self.backwards else c.desc() for c in ordering))
+        if self.count is not None:
+            statement = statement.limit(self.count)
+        return select(statement.subquery())
+
+    def all(self):
+        """Return the page's rows.
+
+        Each row has ``at``, ``kind``, ``item_id``, ``doctor``, ``title``,
+        ``detail``, ``amount`` and ``status``.
+        """
+        patient_id = self.patient_id
+        appointment_at = type_coerce(_appointment_at(self.dialect), db.DateTime)
+        appointments = select(*_labelled(
+            appointment_at, literal('appointment', String), Appointment.appoint_id, Doctor.name,
+            _none(String), _none(String), _none(db.Float), Appointment.status,
+        )).outerjoin(Doctor, Doctor.doctor_id == Appointment.doctor_id).where(Appointment.patient_id == patient_id)
+        prescriptions = select(*_labelled(
+            Prescription.date, literal('prescription', String), Prescription.presc_id, Doctor.name,
+            Prescription.medicine, Prescription.dosage, _none(db.Float), _none(String),
+        )).outerjoin(Doctor, Doctor.doctor_id == Prescription.doctor_id).where(Prescription.patient_id == patient_id)
+        bills = select(*_labelled(
+            Bill.date, literal('bill', String), Bill.bill_id, _none(String), _none(String), _none(String),
+            Bill.amount, Bill.status,
+        )).where(Bill.patient_id == patient_id)
+
+        timeline = union_all(
+            self._branch(appointments, 'appointment', appointment_at, Appointment.appoint_id,
+                         Appointment.date, lambda at: at.date(),
+                         [Appointment.date, Appointment.time, Appointment.appoint_id]),
+            self._branch(prescriptions, 'prescription', Prescription.date, Prescription.presc_id,
+                         Prescription.date, lambda at: at, [Prescription.date, Prescription.presc_id]),
+            self._branch(bills, 'bill', Bill.date, Bill.bill_id,
+                         Bill.date, lambda at: at, [Bill.date, Bill.bill_id]),
+        ).subquery('timeline')
+        statement = select(timeline).order_by(*self.ordering)
+        if self.count is not None:
+            statement = statement.limit(self.count)
+        return db.session.execute(statement).all()
+
+
+def timeline_query(patient_id):
+    """Return a query of the patient's timeline rows plus the keyset ordering to page it by."""
+    return TimelineQuery(patient_id), ORDER_BY
+
+
+def summary_columns(patient_id):
+    """Return labelled scalar subqueries summarising the patient's history."""
+    def count(model, *criteria):
+        return select(func.count()).select_from(model) \
+            .where(model.patient_id == patient_id, *criteria).scalar_subquery()
+
+    def total(*criteria):
+        return select(func.coalesce(func.sum(Bill.amount), 0.0)) \
+            .where(Bill.patient_id == patient_id, *criteria).scalar_subquery()
+
+    return [
+        count(Appointment).label('appointments'),
+        count(Appointment, Appointment.status == 'scheduled').label('scheduled'),
+        count(Prescription).label('prescriptions'),
+        count(Bill).label('bills'),
+        total().label('billed'),
+        total(Bill.status == 'pending').label('outstanding'),
+        select(func.max(Appointment.date)).where(Appointment.patient_id == patient_id,
+                                                 Appointment.status == 'completed')
+        .scalar_subquery().label('last_visit'),
+    ]
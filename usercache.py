@@ -0,0 +1,145 @@
+"""Cached user loading for Flask-Login.
+
+Loading the logged-in user used to cost a primary-key query on every
+request. Instead a small snapshot of the user (id, username, role,
+doctor_id and the row's ``version``) is kept in two places:
+
+* a bounded LRU cache per process, trusted for ``USER_CACHE_TTL`` seconds;
+* the signed session cookie, so a worker that has never seen this user can
+  rebuild the snapshot after checking only the ``version`` column.
+
+Every UPDATE of a ``users`` row bumps ``version``. Changes committed in this
+process evict the cached entry straight away; other processes notice the new
+version when their entry's TTL runs out, so a role change reaches every
+worker within one TTL.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, has_app_context, session
+from flask_login import UserMixin
+from sqlalchemy import event, select
+
+from models import db, User
+
+
+SESSION_KEY = '_user_snapshot'
+
+SNAPSHOT_FIELDS = ('id', 'username', 'role', 'doctor_id', 'version')
+
+
+class CachedUser(UserMixin):
+    """Read-only stand-in for :class:`User` built from a snapshot."""
+
+    def __init__(self, snapshot):
+        for field in SNAPSHOT_FIELDS:
+            setattr(self, field, snapshot[field])
+
+    def __repr__(self):
+        return f'<CachedUser {self.username}>'
+
+
+class UserCache:
+    """Bounded LRU of user snapshots with a time-to-live."""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            snapshot, expires_at = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return snapshot
+
+    def put(self, snapshot):
+        with self._lock:
+            self._entries[snapshot['id']] = (snapshot, time.monotonic() + self.ttl)
+            self._entries.move_to_end(snapshot['id'])
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def evict(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+
+def get_cache():
+    """Return the user cache of the current app."""
+    cache = current_app.extensions.get('user_cache')
+    if cache is None:
+        cache = UserCache(current_app.config.get('USER_CACHE_SIZE', 1024),
+                          current_app.config.get('USER_CACHE_TTL', 60))
+        current_app.extensions['user_cache'] = cache
+    return cache
+
+
+def snapshot_of(user):
+    return {field: getattr(user, field) for field in SNAPSHOT_FIELDS}
+
+
+def remember(user):
+    """Cache ``user`` and embed its snapshot in the session (call on login)."""
+    snapshot = snapshot_of(user)
+    get_cache().put(snapshot)
+    session[SESSION_KEY] = snapshot
+
+
+def forget():
+    """Drop the session snapshot (call on logout)."""
+    session.pop(SESSION_KEY, None)
+
+
+def load_user(user_id):
+    """``user_loader`` that avoids the database whenever it safely can."""
+    user_id = int(user_id)
+    cache = get_cache()
+
+    snapshot = cache.get(user_id)
+    if snapshot is not None:
+        return CachedUser(snapshot)
+
+    snapshot = session.get(SESSION_KEY)
+    if snapshot and snapshot.get('id') == user_id:
+        version = db.session.execute(select(User.version).where(User.id == user_id)).scalar()
+        if version == snapshot.get('version'):
+            cache.put(snapshot)
+            return CachedUser(snapshot)
+
+    user = db.session.get(User, user_id)
+    if user is None:
+        forget()
+        return None
+    remember(user)
+    return CachedUser(snapshot_of(user))
+
+
+@event.listens_for(db.session, 'before_flush')
+def _collect_changed_users(session, flush_context, instances):
+    changed = [obj.id for obj in session.dirty | session.deleted if isinstance(obj, User) and obj.id]
+    if changed:
+        session.info.setdefault('users_changed', set()).update(changed)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _evict_changed_users(session):
+    changed = session.info.pop('users_changed', None)
+    if changed and has_app_context():
+        cache = get_cache()
+        for user_id in changed:
+            cache.evict(user_id)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _forget_changed_users(session):
+    session.info.pop('users_changed', None)